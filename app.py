@@ -18,7 +18,6 @@ st.set_page_config(
 # ===== IMPORTS ESTÁNDAR =====
 import pandas as pd
 import numpy as np
-import tempfile
 import os
 import zipfile
 import math
@@ -30,9 +29,10 @@ import plotly.graph_objects as go
 import plotly.figure_factory as ff
 from plotly.subplots import make_subplots
 from io import BytesIO, StringIO
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
 import base64
+import hashlib
 import warnings
 import requests
 import xml.etree.ElementTree as ET
@@ -51,6 +51,29 @@ from modules.ia_integration import (
     client as groq_client,
     GROQ_API_KEY
 )
+from modules.malla_hexagonal import MallaHexagonal
+from modules.planificador_pastoreo import PlanificadorRotacion
+from modules.balance_forrajero import curva_estacional, simular_balance, resumir_balance
+from modules.extractor_gee import ExtractorIndicesGEE, INDICES_ESPECTRALES
+from modules.cache_satelital import CacheIndicesSatelitales, hash_geometria
+from modules.ejecutor_gee import EjecutorGEE
+from modules.historial_indices import HistorialIndices, actualizar_historial
+from modules.raster_local import RasterMultiespectral, RasterSubido, ruta_permitida, RASTERIO_AVAILABLE
+from modules.sesion_gee import SesionGEE, es_error_credenciales
+from modules.lector_kml import leer_kml
+from modules.lector_comprimidos import leer_shapefile_zip, abrir_kml_de_kmz
+from modules.lector_catastro import FORMATOS_CATASTRO, es_catastro, inspeccionar_catastro, leer_catastro
+from modules.parcela import parcela_de
+from modules.area_geodesica import area_total_ha
+from modules.activos_reporte import AlmacenActivos, huella_resultados
+from modules.renderizador_graficos import RenderizadorGraficos
+from modules.cache_informes import CacheInformes
+from modules.zonificacion import (
+    SuperficieInterpolada,
+    estadisticas_zonales,
+    delinear_sublotes,
+    sublotes_como_registros
+)
 
 # ===== IMPORTACIONES GOOGLE EARTH ENGINE =====
 try:
@@ -76,37 +99,37 @@ from scipy.interpolate import griddata
 from matplotlib.colors import LinearSegmentedColormap
 
 # ===== INICIALIZACIÓN DE GOOGLE EARTH ENGINE =====
+GEE_PROYECTO = 'ee-mawucano25'
+
+@st.cache_resource(show_spinner=False)
+def sesion_gee():
+    """Sesión de Earth Engine única por proceso, compartida por todas las pestañas y usuarios."""
+    return SesionGEE(GEE_PROYECTO, ee_modulo=ee)
+
 def inicializar_gee():
+    """Inicializa (o verifica) la sesión compartida; solo la primera pestaña paga la latencia."""
     if not GEE_AVAILABLE:
         return False
-    try:
-        gee_secret = os.environ.get('GEE_SERVICE_ACCOUNT')
-        if gee_secret:
-            try:
-                credentials_info = json.loads(gee_secret.strip())
-                credentials = ee.ServiceAccountCredentials(
-                    credentials_info['client_email'],
-                    key_data=json.dumps(credentials_info)
-                )
-                ee.Initialize(credentials, project='ee-mawucano25')
-                st.session_state.gee_authenticated = True
-                st.session_state.gee_project = 'ee-mawucano25'
-                return True
-            except Exception as e:
-                print(f"⚠️ Error con Service Account: {str(e)}")
-        try:
-            ee.Initialize(project='ee-mawucano25')
-            st.session_state.gee_authenticated = True
-            st.session_state.gee_project = 'ee-mawucano25'
-            return True
-        except Exception as e:
-            print(f"⚠️ Error inicialización local: {str(e)}")
-        st.session_state.gee_authenticated = False
-        return False
-    except Exception as e:
-        st.session_state.gee_authenticated = False
-        print(f"❌ Error crítico GEE: {str(e)}")
-        return False
+    return sesion_gee().asegurar()
+
+def mostrar_estado_gee():
+    """Indicador del estado de la sesión compartida de Earth Engine."""
+    if not GEE_AVAILABLE:
+        return
+    estado = sesion_gee().estado()
+    if estado['conectado']:
+        st.success(f"✅ GEE Conectado ({estado['metodo']})")
+        detalle = f"Proyecto {estado['proyecto']}"
+        if estado['segundos_desde_verificacion'] is not None:
+            detalle += f" · verificado hace {estado['segundos_desde_verificacion']:.0f} s"
+        st.caption(detalle)
+    elif estado['error']:
+        st.warning("⚠️ GEE no disponible, se usarán índices simulados")
+        with st.expander("Detalle de la conexión GEE"):
+            st.caption(estado['error'])
+            if st.button("🔄 Reintentar conexión", key='reintentar_gee'):
+                sesion_gee().invalidar()
+                st.rerun()
 
 # ===== LIBRERÍAS PARA REPORTES =====
 try:
@@ -256,6 +279,29 @@ class MetodologiaVerra:
             'tipo_vegetacion': tipo_bosque
         }
 
+    def calcular_carbono_array(self, ndvi: np.ndarray, tipo_bosque: str, precipitacion: float) -> np.ndarray:
+        """Carbono total (ton C/ha) de calcular_carbono_hectarea evaluado sobre un array de NDVI."""
+        ndvi = np.asarray(ndvi, dtype=float)
+        factores_veg = self.factores_vegetacion.get(tipo_bosque,
+            {'factor_biomasa': 1.0, 'factor_suelo': 1.0, 'factor_madera': 1.0})
+        es_cultivo = tipo_bosque in ['vid', 'cultivo', 'agricola']
+        if es_cultivo:
+            factor_precip = min(1.3, max(0.7, precipitacion / 1500))
+            tramos = [30 + (ndvi - 0.7) * 50, 20 + (ndvi - 0.5) * 60, 10 + (ndvi - 0.3) * 50]
+            base = 5 + ndvi * 30
+        else:
+            factor_precip = min(2.0, max(0.5, precipitacion / 1500))
+            tramos = [150 + (ndvi - 0.7) * 300, 80 + (ndvi - 0.5) * 350, 30 + (ndvi - 0.3) * 250]
+            base = 5 + ndvi * 100
+        agb_ton_ha = np.select([ndvi > 0.7, ndvi > 0.5, ndvi > 0.3], tramos, default=base) * factor_precip
+        agb_ton_ha *= factores_veg['factor_biomasa'] * {'vid': 0.9, 'cultivo': 0.8}.get(tipo_bosque, 1.0)
+        carbono_agb = agb_ton_ha * self.factores['conversion_carbono']
+        ratio_raiz = self.factores['ratio_raiz'] * (0.7 if es_cultivo else 1.0)
+        carbono_li = self.factores['acumulacion_hojarasca'] * (0.3 if es_cultivo else 1.0) * self.factores['conversion_carbono']
+        carbono_soc = self.factores['carbono_suelo'] * factores_veg['factor_suelo']
+        return (carbono_agb * (1 + ratio_raiz + self.factores['proporcion_madera_muerta'] * factores_veg['factor_madera'])
+                + carbono_li + carbono_soc)
+
 # ===============================
 # 🦋 ANÁLISIS DE BIODIVERSIDAD (con nuevos ecosistemas)
 # ===============================
@@ -423,13 +469,16 @@ class AnalisisForrajero:
             'alto': {'ndvi_min': 0.5, 'ndvi_max': 1.0, 'factor': 1.0}
         }
 
-    def estimar_disponibilidad_forrajera(self, ndvi: float, tipo_sistema: str, area_ha: float) -> Dict:
+    def _categoria_productividad(self, ndvi: float) -> str:
         if ndvi < 0.2:
-            categoria_productividad = 'bajo'
+            return 'bajo'
         elif ndvi > 0.5:
-            categoria_productividad = 'alto'
+            return 'alto'
         else:
-            categoria_productividad = 'medio'
+            return 'medio'
+
+    def estimar_disponibilidad_forrajera(self, ndvi: float, tipo_sistema: str, area_ha: float) -> Dict:
+        categoria_productividad = self._categoria_productividad(ndvi)
         
         params = self.parametros_forrajeros.get(tipo_sistema, self.parametros_forrajeros['pastizal_natural'])
         productividad_base = params['productividad_kg_ms_ha'][categoria_productividad]
@@ -448,6 +497,21 @@ class AnalisisForrajero:
             'densidad_forraje_kg_m3': params['densidad_forraje']
         }
 
+    def productividad_array(self, ndvi: np.ndarray, tipo_sistema: str):
+        """
+        estimar_disponibilidad_forrajera por píxel: productividad (kg MS/ha) y
+        tasa de crecimiento (kg MS/ha/día). Sin el ruido de ±10%, que en
+        cobertura total promedia 1.
+        """
+        ndvi = np.asarray(ndvi, dtype=float)
+        params = self.parametros_forrajeros.get(tipo_sistema, self.parametros_forrajeros['pastizal_natural'])
+        categorias = [ndvi < 0.2, ndvi > 0.5]
+        productividad = np.select(categorias, [params['productividad_kg_ms_ha']['bajo'], params['productividad_kg_ms_ha']['alto']],
+                                  default=params['productividad_kg_ms_ha']['medio']) * (0.5 + ndvi * 0.5)
+        tasa = np.select(categorias, [params['tasa_crecimiento_diario']['bajo'], params['tasa_crecimiento_diario']['alto']],
+                         default=params['tasa_crecimiento_diario']['medio'])
+        return productividad, tasa
+
     def calcular_equivalentes_vaca(self, forraje_aprovechable_kg_ms: float, dias_permanencia: int = 1) -> Dict:
         consumo_ev_diario = self.consumo_animal['equivalente_vaca']
         ev_por_dia = forraje_aprovechable_kg_ms / consumo_ev_diario
@@ -479,15 +543,128 @@ class AnalisisForrajero:
             'num_ev': num_ev
         }
 
-    def dividir_lote_en_sublotes(self, area_total_ha: float, disponibilidad_forrajera_kg_ms_ha: float, heterogeneidad: float = 0.3) -> List[Dict]:
+    def simular_incertidumbre(self, ndvi_muestras: List[float], tipo_sistema: str, area_ha: float, num_ev: float = None,
+                              dias_permanencia: int = 30, replicas: int = 5000, semilla: int = None) -> Dict:
+        """
+        Réplicas Monte Carlo de la cadena estimar_disponibilidad_forrajera ->
+        calcular_equivalentes_vaca / calcular_dias_permanencia, todas en una sola
+        pasada sobre arrays. El NDVI medio se remuestrea (bootstrap) de los puntos y
+        la productividad lleva el mismo ±10% de variación. Devuelve P10/P50/P90.
+        """
+        rng = np.random.default_rng(semilla)
+        params = self.parametros_forrajeros.get(tipo_sistema, self.parametros_forrajeros['pastizal_natural'])
+        ndvi = np.asarray(ndvi_muestras, dtype=float)
+        ndvi_medio = ndvi[rng.integers(0, len(ndvi), size=(replicas, len(ndvi)))].mean(axis=1)
+        productividad_base = np.select(
+            [ndvi_medio < 0.2, ndvi_medio > 0.5],
+            [params['productividad_kg_ms_ha']['bajo'], params['productividad_kg_ms_ha']['alto']],
+            default=params['productividad_kg_ms_ha']['medio']
+        )
+        productividad = productividad_base * (0.5 + ndvi_medio * 0.5) * rng.uniform(0.9, 1.1, replicas)
+        aprovechable = productividad * area_ha * params['eficiencia_aprovechamiento']
+        consumo_ev_diario = self.consumo_animal['equivalente_vaca']
+        ev_para_periodo = aprovechable / (consumo_ev_diario * dias_permanencia)
+        ev_recomendado = ev_para_periodo * 0.8
+        if num_ev is None:
+            num_ev = max(float(np.median(ev_recomendado)), 1.0)
+        dias_recomendados = np.minimum(30, np.floor(aprovechable / (num_ev * consumo_ev_diario) * 1.2))
+
+        def bandas(valores):
+            p10, p50, p90 = np.percentile(valores, [10, 50, 90])
+            return {'p10': round(float(p10), 2), 'p50': round(float(p50), 2), 'p90': round(float(p90), 2)}
+
+        return {
+            'replicas': replicas,
+            'num_ev': round(float(num_ev), 2),
+            'dias_permanencia': dias_permanencia,
+            'ndvi_medio': bandas(ndvi_medio),
+            'productividad_kg_ms_ha': bandas(productividad),
+            'forraje_aprovechable_kg_ms': bandas(aprovechable),
+            'ev_para_periodo': bandas(ev_para_periodo),
+            'ev_recomendado': bandas(ev_recomendado),
+            'dias_recomendados': bandas(dias_recomendados)
+        }
+
+    def calcular_rodeo_mixto(self, sublotes: List[Dict], cabezas: Dict[str, float], dias_permanencia: int = 30) -> Dict:
+        """
+        Rodeo con cabezas por categoría de consumo_animal: EV equivalentes, consumo
+        diario y días de pastoreo en cada sublote, y la pregunta inversa (cuántas
+        cabezas entran para dias_permanencia con el margen de seguridad del 20%),
+        todo como operaciones sobre la matriz sublotes × categorías.
+        """
+        categorias = [c for c in self.consumo_animal if c != 'equivalente_vaca']
+        consumo = np.array([self.consumo_animal[c] for c in categorias], dtype=float)
+        n_cabezas = np.array([float(cabezas.get(c, 0)) for c in categorias])
+        aprovechable = np.array([s['forraje_aprovechable_kg_ms'] for s in sublotes], dtype=float)
+        consumo_diario = float(n_cabezas @ consumo)
+        margen_seguridad = 0.8
+        capacidad_kg = aprovechable * margen_seguridad / dias_permanencia
+
+        df = pd.DataFrame({
+            'sublote_id': [s['sublote_id'] for s in sublotes],
+            'forraje_aprovechable_kg_ms': aprovechable
+        })
+        if consumo_diario > 0:
+            dias_basico = aprovechable / consumo_diario
+            df['dias_basico'] = np.round(dias_basico, 1)
+            df['dias_recomendados'] = np.minimum(30, np.floor(dias_basico * 1.2)).astype(int)
+            # Mismo rodeo escalado: cuántas veces entra la composición indicada
+            escala = capacidad_kg / consumo_diario
+            for c, h in zip(categorias, n_cabezas):
+                if h > 0:
+                    df[f'{c}_rodeo_escalado'] = np.floor(escala * h).astype(int)
+        # Capacidad si el sublote se ocupa con una sola categoría
+        capacidad = np.floor(capacidad_kg[:, None] / consumo[None, :]).astype(int)
+        for j, c in enumerate(categorias):
+            df[f'{c}_max'] = capacidad[:, j]
+
+        return {
+            'cabezas': dict(zip(categorias, n_cabezas.astype(int).tolist())),
+            'total_cabezas': int(n_cabezas.sum()),
+            'ev_equivalentes': round(consumo_diario / self.consumo_animal['equivalente_vaca'], 2),
+            'consumo_diario_kg': round(consumo_diario, 2),
+            'dias_permanencia': dias_permanencia,
+            'dias_lote': round(float(aprovechable.sum() / consumo_diario), 1) if consumo_diario > 0 else None,
+            'sublotes': df
+        }
+
+    def curvas_respuesta_ev(self, forraje_aprovechable_kg_ms: float, valores_ev, valores_dias) -> Dict[str, pd.DataFrame]:
+        """
+        calcular_dias_permanencia y calcular_equivalentes_vaca evaluados sobre
+        todo el rango de EV y de días en una sola llamada vectorizada.
+        """
+        consumo_ev_diario = self.consumo_animal['equivalente_vaca']
+        ev = np.maximum(np.asarray(valores_ev, dtype=float), 1e-9)
+        dias = np.maximum(np.asarray(valores_dias, dtype=float), 1)
+        dias_basico = forraje_aprovechable_kg_ms / (ev * consumo_ev_diario)
+        dias_ajustado = dias_basico * 1.2
+        ev_para_periodo = forraje_aprovechable_kg_ms / (consumo_ev_diario * dias)
+        return {
+            'dias_vs_ev': pd.DataFrame({
+                'num_ev': ev,
+                'dias_basico': np.round(dias_basico, 1),
+                'dias_ajustado': np.round(dias_ajustado, 1),
+                'dias_recomendados': np.minimum(30, np.floor(dias_ajustado)).astype(int)
+            }),
+            'ev_vs_dias': pd.DataFrame({
+                'dias': dias.astype(int),
+                'ev_para_periodo': np.round(ev_para_periodo, 2),
+                'ev_recomendado': np.round(ev_para_periodo * 0.8, 2)
+            })
+        }
+
+    def numero_sublotes(self, area_total_ha: float) -> int:
         if area_total_ha < 10:
-            num_sublotes = 2
+            return 2
         elif area_total_ha < 50:
-            num_sublotes = 3
+            return 3
         elif area_total_ha < 100:
-            num_sublotes = 4
+            return 4
         else:
-            num_sublotes = min(6, int(area_total_ha / 20))
+            return min(6, int(area_total_ha / 20))
+
+    def dividir_lote_en_sublotes(self, area_total_ha: float, disponibilidad_forrajera_kg_ms_ha: float, heterogeneidad: float = 0.3) -> List[Dict]:
+        num_sublotes = self.numero_sublotes(area_total_ha)
         sublotes = []
         area_por_sublote = area_total_ha / num_sublotes
         for i in range(num_sublotes):
@@ -505,6 +682,29 @@ class AnalisisForrajero:
             })
         return sublotes
 
+    def calcular_sublotes_zonales(self, superficie, zonas, tipo_sistema: str):
+        """
+        Productividad, forraje aprovechable y carbono por sublote a partir de la
+        superficie interpolada (ponderados por área). Devuelve el GeoDataFrame de
+        sublotes y la lista de registros que consume generar_recomendaciones_rotacion.
+        """
+        params = self.parametros_forrajeros.get(tipo_sistema, self.parametros_forrajeros['pastizal_natural'])
+        gdf_sublotes = estadisticas_zonales(superficie, zonas, params['eficiencia_aprovechamiento'])
+        if 'forraje_aprovechable_kg_ms' not in gdf_sublotes.columns:
+            return gdf_sublotes, []
+        return gdf_sublotes, sublotes_como_registros(gdf_sublotes)
+
+    def delinear_sublotes(self, superficie, num_sublotes: int, tipo_sistema: str):
+        """
+        Delinea sublotes contiguos agrupando la superficie interpolada de
+        productividad y NDVI. Misma salida que calcular_sublotes_zonales.
+        """
+        params = self.parametros_forrajeros.get(tipo_sistema, self.parametros_forrajeros['pastizal_natural'])
+        gdf_sublotes = delinear_sublotes(superficie, num_sublotes, params['eficiencia_aprovechamiento'])
+        if 'forraje_aprovechable_kg_ms' not in gdf_sublotes.columns:
+            return gdf_sublotes, []
+        return gdf_sublotes, sublotes_como_registros(gdf_sublotes)
+
     def generar_recomendaciones_rotacion(self, sublotes: List[Dict], num_ev_total: float) -> Dict:
         forraje_total_aprovechable = sum(s['forraje_aprovechable_kg_ms'] for s in sublotes)
         consumo_diario_total = num_ev_total * self.consumo_animal['equivalente_vaca']
@@ -532,6 +732,100 @@ class AnalisisForrajero:
             'intensidad_rotacion': self._clasificar_intensidad_rotacion(dias_ciclo)
         }
 
+    def barrer_escenarios_rotacion(self, sublotes: List[Dict], valores_ev, factores_descanso=(3,), descansos_minimos=(21,)) -> pd.DataFrame:
+        """
+        Evalúa generar_recomendaciones_rotacion para todas las combinaciones de
+        carga (EV), factor de descanso y descanso mínimo en una sola operación
+        vectorizada sobre la matriz escenarios × sublotes.
+        """
+        if not sublotes:
+            return pd.DataFrame()
+        forraje = np.array([s['forraje_aprovechable_kg_ms'] for s in sublotes], dtype=float)
+        ev, factor, minimo = (a.ravel() for a in np.meshgrid(
+            np.asarray(valores_ev, dtype=float), np.asarray(factores_descanso, dtype=float),
+            np.asarray(descansos_minimos, dtype=float), indexing='ij'))
+        ev = np.maximum(ev, 1e-9)
+        consumo_diario_total = ev * self.consumo_animal['equivalente_vaca']
+        # Mismas reglas que generar_recomendaciones_rotacion, con escenarios en filas y sublotes en columnas
+        dias_en_sublote = np.floor(forraje[None, :] / consumo_diario_total[:, None] * 0.8)
+        dias_uso = np.maximum(3, dias_en_sublote)
+        dias_descanso = np.maximum(minimo[:, None], dias_en_sublote * factor[:, None])
+        dias_ciclo = (dias_uso + dias_descanso).mean(axis=1)
+        intensidad = np.select(
+            [dias_ciclo < 30, dias_ciclo < 60],
+            [self._clasificar_intensidad_rotacion(0), self._clasificar_intensidad_rotacion(30)],
+            default=self._clasificar_intensidad_rotacion(60)
+        )
+        return pd.DataFrame({
+            'num_ev': ev,
+            'factor_descanso': factor,
+            'descanso_minimo': minimo.astype(int),
+            'consumo_diario_total_kg': np.round(consumo_diario_total, 2),
+            'dias_rotacion_total': np.round(forraje.sum() / consumo_diario_total, 1),
+            'dias_uso_total': dias_uso.sum(axis=1).astype(int),
+            'dias_descanso_promedio': np.round(dias_descanso.mean(axis=1), 1),
+            'dias_ciclo_promedio': np.round(dias_ciclo, 1),
+            'intensidad_rotacion': intensidad
+        })
+
+    def _stock_y_crecimiento_sublotes(self, sublotes: List[Dict], tipo_sistema: str):
+        """
+        Stock inicial (forraje aprovechable), crecimiento diario aprovechable según la
+        categoría de NDVI de cada sublote y techo de productividad alta del sistema.
+        """
+        params = self.parametros_forrajeros.get(tipo_sistema, self.parametros_forrajeros['pastizal_natural'])
+        eficiencia = params['eficiencia_aprovechamiento']
+        areas = np.array([s['area_ha'] for s in sublotes], dtype=float)
+        categorias = [self._categoria_productividad(s.get('ndvi_medio', 0.35)) for s in sublotes]
+        stock_inicial = np.array([s['forraje_aprovechable_kg_ms'] for s in sublotes], dtype=float)
+        crecimiento = np.array([params['tasa_crecimiento_diario'][c] for c in categorias]) * areas * eficiencia
+        stock_maximo = params['productividad_kg_ms_ha']['alto'] * areas * eficiencia
+        return stock_inicial, crecimiento, stock_maximo
+
+    def planificar_temporada(self, sublotes: List[Dict], rodeos_ev: List[float], tipo_sistema: str,
+                             descanso_minimo: int = 21, ocupacion_maxima: int = 7, fraccion_remanente: float = 0.2,
+                             dias: int = 365, fecha_inicio=None, factor_estacional=None, latitud: float = -34.0) -> Dict:
+        """
+        Calendario de pastoreo día a día para uno o más rodeos sobre los sublotes.
+        El crecimiento sigue la curva estacional del sistema salvo que se indique
+        otro factor_estacional.
+        """
+        stock_inicial, crecimiento, stock_maximo = self._stock_y_crecimiento_sublotes(sublotes, tipo_sistema)
+        if factor_estacional is None:
+            factor_estacional = curva_estacional(tipo_sistema, dias, fecha_inicio, latitud)
+        planificador = PlanificadorRotacion(
+            stock_inicial_kg=stock_inicial,
+            crecimiento_diario_kg=crecimiento,
+            stock_maximo_kg=stock_maximo,
+            descanso_minimo=descanso_minimo,
+            ocupacion_maxima=ocupacion_maxima,
+            fraccion_remanente=fraccion_remanente,
+            consumo_ev_diario=self.consumo_animal['equivalente_vaca']
+        )
+        return planificador.planificar(rodeos_ev, dias=dias, fecha_inicio=fecha_inicio, factor_estacional=factor_estacional,
+                                       ids_sublotes=[s['sublote_id'] for s in sublotes])
+
+    def simular_balance_forrajero(self, sublotes: List[Dict], tipo_sistema: str, carga_ev, dias: int = 365,
+                                  fecha_inicio=None, fraccion_remanente: float = 0.2, latitud: float = -34.0) -> Dict:
+        """
+        Balance diario de stock, crecimiento estacional y consumo por sublote.
+        `carga_ev` es el total de EV (repartido por área, pastoreo continuo), un
+        valor por sublote o una matriz sublotes × días de EV presentes.
+        """
+        stock_inicial, crecimiento, stock_maximo = self._stock_y_crecimiento_sublotes(sublotes, tipo_sistema)
+        fecha_inicio = fecha_inicio or date.today()
+        carga_ev = np.asarray(carga_ev, dtype=float)
+        if carga_ev.ndim == 0:
+            areas = np.array([s['area_ha'] for s in sublotes], dtype=float)
+            carga_ev = carga_ev * areas / areas.sum()
+        factor = curva_estacional(tipo_sistema, dias, fecha_inicio, latitud)
+        balance = simular_balance(stock_inicial, crecimiento, stock_maximo,
+                                  carga_ev * self.consumo_animal['equivalente_vaca'], factor,
+                                  np.maximum(stock_maximo, stock_inicial) * fraccion_remanente, dias)
+        resumen = resumir_balance(balance, [s['sublote_id'] for s in sublotes], fecha_inicio)
+        resumen['factor_estacional'] = factor
+        return resumen
+
     def _generar_recomendacion_sublote(self, productividad: float) -> str:
         if productividad > 1.2:
             return "Alta productividad - Considerar manejo intensivo con pastoreo rotativo"
@@ -594,23 +888,18 @@ class SistemaMapas:
         if gdf is None or gdf.empty:
             return []
         try:
-            poligono = gdf.geometry.iloc[0]
-            bounds = gdf.total_bounds
-            minx, miny, maxx, maxy = bounds
-            area_ha = calcular_superficie(gdf)
-            num_puntos = min(densidad, max(400, int(area_ha * 1.5)))
-            puntos = []
+            parcela = parcela_de(gdf)
+            minx, miny, maxx, maxy = parcela.bounds
+            num_puntos = min(densidad, max(400, int(parcela.area_ha * 1.5)))
             lado = int(np.sqrt(num_puntos))
             dx = (maxx - minx) / lado
             dy = (maxy - miny) / lado
-            for i in range(lado):
-                for j in range(lado):
-                    lon = minx + (i + 0.5) * dx
-                    lat = miny + (j + 0.5) * dy
-                    punto = Point(lon, lat)
-                    if poligono.contains(punto):
-                        puntos.append({'lat': lat, 'lon': lon, 'x_norm': i / lado, 'y_norm': j / lado})
-            return puntos
+            ii, jj = np.meshgrid(np.arange(lado), np.arange(lado), indexing='ij')
+            lons = minx + (ii.ravel() + 0.5) * dx
+            lats = miny + (jj.ravel() + 0.5) * dy
+            dentro = parcela.contiene(lons, lats)
+            return [{'lat': lat, 'lon': lon, 'x_norm': i / lado, 'y_norm': j / lado}
+                    for lat, lon, i, j in zip(lats[dentro], lons[dentro], ii.ravel()[dentro], jj.ravel()[dentro])]
         except Exception as e:
             print(f"Error generando malla: {str(e)}")
             return []
@@ -1018,6 +1307,142 @@ class Visualizaciones:
         fig.update_xaxes(title_text="Métrica", row=1, col=1)
         return fig
 
+    @staticmethod
+    def crear_grafico_escenarios_rotacion(df_escenarios: pd.DataFrame):
+        if df_escenarios is None or df_escenarios.empty:
+            fig = go.Figure()
+            fig.update_layout(title='No hay escenarios de rotación', height=400)
+            return fig
+        fig = make_subplots(rows=1, cols=2, subplot_titles=('Días de uso por pasada', 'Ciclo promedio (uso + descanso)'), horizontal_spacing=0.12)
+        colores = ['#8B4513', '#10b981', '#3b82f6', '#8b5cf6', '#f59e0b', '#ef4444']
+        reglas = df_escenarios[['factor_descanso', 'descanso_minimo']].drop_duplicates().itertuples(index=False)
+        for i, (factor, minimo) in enumerate(reglas):
+            df_regla = df_escenarios[(df_escenarios['factor_descanso'] == factor) & (df_escenarios['descanso_minimo'] == minimo)]
+            nombre = f"Descanso {factor:g}× (mín. {minimo} d)"
+            color = colores[i % len(colores)]
+            fig.add_trace(go.Scatter(x=df_regla['num_ev'], y=df_regla['dias_uso_total'], mode='lines+markers', name=nombre,
+                                     legendgroup=nombre, line=dict(color=color),
+                                     hovertemplate='%{x:.0f} EV<br>%{y} días de uso<extra></extra>'), row=1, col=1)
+            fig.add_trace(go.Scatter(x=df_regla['num_ev'], y=df_regla['dias_ciclo_promedio'], mode='lines+markers', name=nombre,
+                                     legendgroup=nombre, showlegend=False, line=dict(color=color),
+                                     customdata=df_regla['intensidad_rotacion'],
+                                     hovertemplate='%{x:.0f} EV<br>Ciclo: %{y:.1f} días<br>%{customdata}<extra></extra>'), row=1, col=2)
+        # Bandas de intensidad de rotación (mismos cortes que _clasificar_intensidad_rotacion)
+        fig.add_hrect(y0=0, y1=30, fillcolor='#ef4444', opacity=0.08, line_width=0, row=1, col=2)
+        fig.add_hrect(y0=30, y1=60, fillcolor='#f59e0b', opacity=0.08, line_width=0, row=1, col=2)
+        fig.add_hrect(y0=60, y1=max(90, df_escenarios['dias_ciclo_promedio'].max()), fillcolor='#10b981', opacity=0.08, line_width=0, row=1, col=2)
+        fig.update_layout(height=450, title_text='Escenarios de Carga y Rotación', hovermode='closest')
+        fig.update_xaxes(title_text='Equivalentes Vaca (EV)', row=1, col=1)
+        fig.update_xaxes(title_text='Equivalentes Vaca (EV)', row=1, col=2)
+        fig.update_yaxes(title_text='Días', row=1, col=1)
+        fig.update_yaxes(title_text='Días', row=1, col=2)
+        return fig
+
+    @staticmethod
+    def crear_grafico_calendario_pastoreo(df_movimientos: pd.DataFrame):
+        if df_movimientos is None or df_movimientos.empty:
+            fig = go.Figure()
+            fig.update_layout(title='No hay movimientos planificados', height=400)
+            return fig
+        df_plot = df_movimientos.copy()
+        df_plot['Sublote'] = df_plot['sublote_id'].astype(str)
+        df_plot['Rodeo'] = 'Rodeo ' + df_plot['rodeo'].astype(str)
+        df_plot['fin'] = pd.to_datetime(df_plot['fecha_salida']) + pd.Timedelta(days=1)
+        fig = px.timeline(df_plot, x_start='fecha_entrada', x_end='fin', y='Sublote', color='Rodeo',
+                          hover_data={'dias': True, 'fin': False})
+        fig.update_yaxes(categoryorder='category ascending', title_text='Sublote')
+        fig.update_layout(height=max(400, 18 * df_plot['Sublote'].nunique()), title_text='Calendario de Pastoreo')
+        return fig
+
+    @staticmethod
+    def crear_grafico_balance_forrajero(df_diario: pd.DataFrame):
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                            subplot_titles=('Stock de forraje del lote (ton MS)', 'Flujos diarios (kg MS/día)'))
+        fig.add_trace(go.Scatter(x=df_diario['fecha'], y=df_diario['stock_kg'] / 1000, name='Stock',
+                                 fill='tozeroy', line=dict(color='#15803d')), row=1, col=1)
+        fig.add_trace(go.Scatter(x=df_diario['fecha'], y=df_diario['crecimiento_kg'], name='Crecimiento',
+                                 line=dict(color='#65a30d')), row=2, col=1)
+        fig.add_trace(go.Scatter(x=df_diario['fecha'], y=df_diario['consumo_kg'], name='Consumo',
+                                 line=dict(color='#b45309')), row=2, col=1)
+        fig.add_trace(go.Bar(x=df_diario['fecha'], y=df_diario['deficit_kg'], name='Déficit',
+                             marker_color='#dc2626'), row=2, col=1)
+        fig.update_layout(height=600, hovermode='x unified', bargap=0)
+        return fig
+
+    @staticmethod
+    def crear_grafico_calculadora_ev(curvas: Dict[str, pd.DataFrame], ev_inicial: float = 50, dias_inicial: int = 30):
+        """Curvas días↔EV con deslizadores de Plotly que mueven el punto en el navegador, sin rerun."""
+        df_ev, df_dias = curvas['dias_vs_ev'], curvas['ev_vs_dias']
+        fig = make_subplots(rows=1, cols=2, horizontal_spacing=0.12,
+                            subplot_titles=('Días de permanencia según EV', 'EV admisibles según días'))
+        fig.add_trace(go.Scatter(x=df_ev['num_ev'], y=df_ev['dias_ajustado'], name='Días ajustados',
+                                 line=dict(color='#8B4513')), row=1, col=1)
+        fig.add_trace(go.Scatter(x=df_ev['num_ev'], y=df_ev['dias_recomendados'], name='Días recomendados',
+                                 line=dict(color='#32CD32', shape='hv')), row=1, col=1)
+        fig.add_trace(go.Scatter(x=df_dias['dias'], y=df_dias['ev_para_periodo'], name='EV para el período',
+                                 line=dict(color='#CD853F')), row=1, col=2)
+        fig.add_trace(go.Scatter(x=df_dias['dias'], y=df_dias['ev_recomendado'], name='EV recomendado',
+                                 line=dict(color='#006400')), row=1, col=2)
+
+        i_ev = int(np.abs(df_ev['num_ev'].to_numpy() - ev_inicial).argmin())
+        i_dias = int(np.abs(df_dias['dias'].to_numpy() - dias_inicial).argmin())
+
+        def punto_ev(i):
+            fila = df_ev.iloc[i]
+            return [fila['num_ev']], [fila['dias_recomendados']], [f"{fila['num_ev']:.0f} EV → {int(fila['dias_recomendados'])} días"]
+
+        def punto_dias(i):
+            fila = df_dias.iloc[i]
+            return [fila['dias']], [fila['ev_recomendado']], [f"{int(fila['dias'])} días → {fila['ev_recomendado']:.1f} EV"]
+
+        for (x, y, texto), col in ((punto_ev(i_ev), 1), (punto_dias(i_dias), 2)):
+            fig.add_trace(go.Scatter(x=x, y=y, text=texto, mode='markers+text', textposition='top right',
+                                     marker=dict(size=12, color='#dc2626'), showlegend=False), row=1, col=col)
+        traza_ev, traza_dias = len(fig.data) - 2, len(fig.data) - 1
+
+        def pasos(n, punto, traza):
+            pasos_slider = []
+            for i in range(n):
+                x, y, texto = punto(i)
+                pasos_slider.append(dict(method='restyle', label=str(int(x[0])),
+                                         args=[{'x': [x], 'y': [y], 'text': [texto]}, [traza]]))
+            return pasos_slider
+
+        fig.update_layout(
+            height=520,
+            sliders=[
+                dict(active=i_ev, steps=pasos(len(df_ev), punto_ev, traza_ev), x=0, len=0.45, y=-0.12,
+                     currentvalue=dict(prefix='EV: '), pad=dict(t=30)),
+                dict(active=i_dias, steps=pasos(len(df_dias), punto_dias, traza_dias), x=0.55, len=0.45, y=-0.12,
+                     currentvalue=dict(prefix='Días: '), pad=dict(t=30))
+            ],
+            legend=dict(orientation='h', y=1.15)
+        )
+        fig.update_xaxes(title_text='EV', row=1, col=1)
+        fig.update_yaxes(title_text='Días', row=1, col=1)
+        fig.update_xaxes(title_text='Días de permanencia', row=1, col=2)
+        fig.update_yaxes(title_text='EV', row=1, col=2)
+        return fig
+
+    @staticmethod
+    def crear_grafico_serie_indices(df_serie: pd.DataFrame):
+        fig = go.Figure()
+        if 'NDVI_media' in df_serie.columns:
+            superior = df_serie['NDVI_media'] + df_serie['NDVI_desv']
+            inferior = df_serie['NDVI_media'] - df_serie['NDVI_desv']
+            fig.add_trace(go.Scatter(x=pd.concat([df_serie['fecha'], df_serie['fecha'][::-1]]),
+                                     y=pd.concat([superior, inferior[::-1]]), fill='toself', fillcolor='rgba(22,163,74,0.15)',
+                                     line=dict(width=0), hoverinfo='skip', name='NDVI ± desvío'))
+        colores = {'NDVI': '#16a34a', 'NDWI': '#2563eb', 'NDRE': '#9333ea', 'MSAVI': '#ca8a04', 'EVI': '#dc2626'}
+        for indice, color in colores.items():
+            if f'{indice}_media' in df_serie.columns:
+                fig.add_trace(go.Scatter(x=df_serie['fecha'], y=df_serie[f'{indice}_media'], mode='lines+markers',
+                                         marker=dict(size=4), line=dict(color=color, width=2 if indice == 'NDVI' else 1),
+                                         name=indice, visible=True if indice == 'NDVI' else 'legendonly'))
+        fig.update_layout(title='Serie temporal de índices del lote', height=450, hovermode='x unified',
+                          yaxis_title='Valor del índice', xaxis_title='Fecha de escena')
+        return fig
+
     @staticmethod
     def crear_metricas_kpi(carbono_total: float, co2_total: float, shannon: float, area: float):
         html = f"""
@@ -1047,25 +1472,115 @@ class Visualizaciones:
         return html
 
 # ===============================
-# 📄 GENERADOR DE REPORTES
+# 🖼️ ACTIVOS GRÁFICOS DE LOS INFORMES
 # ===============================
-class GeneradorReportes:
-    def __init__(self, resultados, gdf, sistema_mapas=None):
+@st.cache_resource
+def almacen_activos():
+    """Almacén de PNG de informes compartido por todas las sesiones del proceso."""
+    return AlmacenActivos()
+
+@st.cache_resource
+def renderizador_graficos():
+    """Navegador de kaleido del proceso (se abre con el primer informe y queda caliente)."""
+    return RenderizadorGraficos(pestanas=4)
+
+# Factor de escala de las imágenes de los informes (calidad vs. tiempo de renderizado)
+ESCALAS_IMAGEN = {1: 'Borrador', 2: 'Normal', 3: 'Alta'}
+
+class ActivosReporte:
+    """
+    Gráficos (Plotly) y mapas estáticos de un resultado como PNG. Se
+    renderizan una vez por resultado y los mismos bytes se entregan al PDF,
+    al DOCX y al informe con IA. Los que fallan quedan en `fallidos` solo
+    para esta instancia: el informe siguiente los vuelve a intentar.
+    """
+    # Nombre -> (ancho, alto) en píxeles antes de escalar
+    GRAFICOS = {'carbono': (800, 500), 'biodiv': (800, 800), 'comparativo': (1000, 700), 'forrajero': (1000, 700)}
+    MAPAS = [('carbono', 'Carbono (ton C/ha)'), ('ndvi', 'NDVI'), ('ndwi', 'NDWI'),
+             ('biodiversidad', 'Biodiversidad (Shannon)'), ('forraje', 'Productividad Forrajera (kg MS/ha)')]
+
+    def __init__(self, resultados, gdf, sistema_mapas=None, almacen=None, escala=2):
         self.resultados = resultados
         self.gdf = gdf
         self.sistema_mapas = sistema_mapas
-        self.buffer_pdf = BytesIO()
-        self.buffer_docx = BytesIO()
+        self.almacen = almacen or almacen_activos()
+        self.escala = escala
+        self.huella = huella_resultados(resultados, gdf)
+        self.fallidos = {}
+
+    def _nombre(self, tipo, nombre):
+        return f'{tipo}_{nombre}@{self.escala}x'
+
+    def _figura(self, nombre):
+        vis = Visualizaciones()
+        res = self.resultados
+        if nombre == 'carbono' and res.get('desglose_promedio'):
+            return vis.crear_grafico_barras_carbono(res['desglose_promedio'])
+        if nombre == 'biodiv' and res.get('puntos_biodiversidad'):
+            return vis.crear_grafico_radar_biodiversidad(res['puntos_biodiversidad'][0])
+        if nombre == 'comparativo' and all(k in res for k in ['puntos_carbono', 'puntos_ndvi', 'puntos_ndwi', 'puntos_biodiversidad']):
+            return vis.crear_grafico_comparativo(res['puntos_carbono'], res['puntos_ndvi'], res['puntos_ndwi'], res['puntos_biodiversidad'])
+        forrajero_data = res.get('analisis_forrajero', {})
+        if nombre == 'forrajero' and 'disponibilidad_forrajera' in forrajero_data and 'equivalentes_vaca' in forrajero_data:
+            return vis.crear_grafico_forrajero(forrajero_data['disponibilidad_forrajera'], forrajero_data['equivalentes_vaca'])
+        return None
 
-    def _fig_to_png(self, fig, width=800, height=500):
-        if fig is None:
+    def preparar_graficos(self):
+        """Renderiza en un solo lote, en paralelo, los gráficos que este resultado aún no tiene."""
+        pendientes = [n for n in self.GRAFICOS if self._nombre('grafico', n) not in self.fallidos
+                      and not self.almacen.contiene(self.huella, self._nombre('grafico', n))]
+        figuras = {}
+        for nombre in pendientes:
+            fig = self._figura(nombre)
+            if fig is not None:
+                figuras[nombre] = (fig, *self.GRAFICOS[nombre])
+        fallidos = []
+        for nombre, png in renderizador_graficos().renderizar_lote(figuras, escala=self.escala).items():
+            if isinstance(png, Exception) or not png:
+                self.fallidos[self._nombre('grafico', nombre)] = str(png)[:120]
+                fallidos.append(f"{nombre} ({str(png)[:120]})")
+            else:
+                self.almacen.registrar(self.huella, self._nombre('grafico', nombre), png)
+        if fallidos:
+            st.warning(f"No se pudieron convertir gráficos a PNG: {'; '.join(fallidos)}")
+
+    def _mapa_png(self, variable):
+        if self.sistema_mapas is None:
+            return None
+        mapa = self.sistema_mapas.crear_mapa_estatico(self.resultados, variable, self.gdf, dpi=75 * self.escala)
+        return mapa.getvalue() if mapa else None
+
+    def grafico(self, nombre):
+        """PNG del gráfico como BytesIO nuevo (cada documento lo consume por separado), o None."""
+        clave = self._nombre('grafico', nombre)
+        if clave not in self.fallidos and not self.almacen.contiene(self.huella, clave):
+            self.preparar_graficos()
+        datos = self.almacen.obtener(self.huella, clave, lambda: None)
+        return BytesIO(datos) if datos else None
+
+    def mapa(self, variable):
+        clave = self._nombre('mapa', variable)
+        if clave in self.fallidos:
             return None
         try:
-            img_bytes = fig.to_image(format='png', width=width, height=height, scale=2)
-            return BytesIO(img_bytes)
+            datos = self.almacen.obtener(self.huella, clave, lambda: self._mapa_png(variable))
         except Exception as e:
-            st.warning(f"No se pudo convertir el gráfico a PNG: {str(e)}")
+            self.fallidos[clave] = str(e)[:120]
+            st.warning(f"No se pudo generar el mapa de {variable}: {str(e)[:120]}")
             return None
+        return BytesIO(datos) if datos else None
+
+# ===============================
+# 📄 GENERADOR DE REPORTES
+# ===============================
+class GeneradorReportes:
+    def __init__(self, resultados, gdf, sistema_mapas=None, activos=None):
+        self.resultados = resultados
+        self.gdf = gdf
+        self.sistema_mapas = sistema_mapas
+        self.activos = activos or ActivosReporte(resultados, gdf, sistema_mapas)
+        self.buffer_pdf = BytesIO()
+        self.buffer_docx = BytesIO()
 
     def _mapa_to_png(self, mapa, width=800, height=600):
         try:
@@ -1086,31 +1601,21 @@ class GeneradorReportes:
             return None
 
     def _crear_graficos(self):
-        vis = Visualizaciones()
-        res = self.resultados
+        self.activos.preparar_graficos()
         graficos = {}
-        if 'desglose_promedio' in res and res['desglose_promedio']:
-            fig_carbono = vis.crear_grafico_barras_carbono(res['desglose_promedio'])
-            graficos['carbono'] = self._fig_to_png(fig_carbono)
-        if 'puntos_biodiversidad' in res and res['puntos_biodiversidad'] and len(res['puntos_biodiversidad']) > 0:
-            fig_biodiv = vis.crear_grafico_radar_biodiversidad(res['puntos_biodiversidad'][0])
-            graficos['biodiv'] = self._fig_to_png(fig_biodiv)
-        if all(k in res for k in ['puntos_carbono', 'puntos_ndvi', 'puntos_ndwi', 'puntos_biodiversidad']):
-            fig_comparativo = vis.crear_grafico_comparativo(
-                res['puntos_carbono'], res['puntos_ndvi'], res['puntos_ndwi'], res['puntos_biodiversidad']
-            )
-            if fig_comparativo:
-                graficos['comparativo'] = self._fig_to_png(fig_comparativo)
-        if 'analisis_forrajero' in res:
-            forrajero_data = res['analisis_forrajero']
-            if 'disponibilidad_forrajera' in forrajero_data and 'equivalentes_vaca' in forrajero_data:
-                fig_forrajero = vis.crear_grafico_forrajero(
-                    forrajero_data['disponibilidad_forrajera'],
-                    forrajero_data['equivalentes_vaca']
-                )
-                graficos['forrajero'] = self._fig_to_png(fig_forrajero)
+        for nombre in ActivosReporte.GRAFICOS:
+            png = self.activos.grafico(nombre)
+            if png is not None:
+                graficos[nombre] = png
         return graficos
 
+    def _imagen_pdf(self, png, ancho):
+        """Image de ReportLab con el ancho dado y el alto proporcional al PNG."""
+        from PIL import Image as PILImage
+        w, h = PILImage.open(png).size
+        png.seek(0)
+        return Image(png, width=ancho, height=ancho * h / w)
+
     def generar_pdf(self):
         if not REPORTPDF_AVAILABLE:
             st.error("ReportLab no está instalado. No se puede generar PDF.")
@@ -1119,6 +1624,7 @@ class GeneradorReportes:
             doc = SimpleDocTemplate(self.buffer_pdf, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
             story = []
             styles = getSampleStyleSheet()
+            graficos = self._crear_graficos()
             titulo_style = ParagraphStyle('TituloPrincipal', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#0a7e5a'), spaceAfter=30, alignment=TA_CENTER)
             subtitulo_style = ParagraphStyle('Subtitulo', parent=styles['Heading2'], fontSize=18, textColor=colors.HexColor('#065f46'), spaceAfter=12, spaceBefore=20)
             seccion_style = ParagraphStyle('Seccion', parent=styles['Heading3'], fontSize=14, textColor=colors.HexColor('#1d4ed8'), spaceAfter=10, spaceBefore=15)
@@ -1187,6 +1693,9 @@ class GeneradorReportes:
                 ]))
                 story.append(tabla_carbono)
                 story.append(Spacer(1, 15))
+            if 'carbono' in graficos:
+                story.append(self._imagen_pdf(graficos['carbono'], 450))
+                story.append(Spacer(1, 15))
             # Análisis de biodiversidad
             story.append(PageBreak())
             story.append(Paragraph("ANÁLISIS DE BIODIVERSIDAD", subtitulo_style))
@@ -1213,6 +1722,9 @@ class GeneradorReportes:
                 ]))
                 story.append(tabla_biodiv)
                 story.append(Spacer(1, 15))
+            if 'biodiv' in graficos:
+                story.append(self._imagen_pdf(graficos['biodiv'], 350))
+                story.append(Spacer(1, 15))
             # Análisis forrajero
             story.append(PageBreak())
             story.append(Paragraph("ANÁLISIS FORRAJERO", subtitulo_style))
@@ -1251,7 +1763,12 @@ class GeneradorReportes:
                         ["EV recomendado", f"{ev.get('ev_recomendado', 0):.1f}"],
                         ["Consumo EV diario", f"{ev.get('consumo_ev_diario_kg', 0)} kg"]
                     ]
-                    tabla_ev = Table(datos_ev, colWidths=[150, 100])
+                    incertidumbre = forrajero_data.get('incertidumbre')
+                    if incertidumbre:
+                        ev_b, dias_b = incertidumbre['ev_recomendado'], incertidumbre['dias_recomendados']
+                        datos_ev.append(["EV recomendado (P10 / P50 / P90)", f"{ev_b['p10']:.1f} / {ev_b['p50']:.1f} / {ev_b['p90']:.1f}"])
+                        datos_ev.append([f"Días con {incertidumbre['num_ev']:.0f} EV (P10 / P50 / P90)", f"{dias_b['p10']:.0f} / {dias_b['p50']:.0f} / {dias_b['p90']:.0f}"])
+                    tabla_ev = Table(datos_ev, colWidths=[190, 110])
                     tabla_ev.setStyle(TableStyle([
                         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#CD853F')),
                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -1285,6 +1802,9 @@ class GeneradorReportes:
                     ]))
                     story.append(tabla_sublotes)
                     story.append(Spacer(1, 15))
+            if 'forrajero' in graficos:
+                story.append(self._imagen_pdf(graficos['forrajero'], 450))
+                story.append(Spacer(1, 15))
             # Índices espectrales
             story.append(PageBreak())
             story.append(Paragraph("ÍNDICES ESPECTRALES", subtitulo_style))
@@ -1314,13 +1834,15 @@ class GeneradorReportes:
             ]))
             story.append(tabla_indices)
             story.append(Spacer(1, 20))
+            if 'comparativo' in graficos:
+                story.append(self._imagen_pdf(graficos['comparativo'], 450))
+                story.append(Spacer(1, 20))
             # Mapas estáticos (si los hay)
             if self.sistema_mapas:
                 story.append(PageBreak())
                 story.append(Paragraph("MAPAS DE CALOR", subtitulo_style))
-                variables = ['carbono', 'ndvi', 'ndwi', 'biodiversidad', 'forraje']
-                for var in variables:
-                    mapa = self.sistema_mapas.crear_mapa_estatico(self.resultados, var, self.gdf)
+                for var, _ in ActivosReporte.MAPAS:
+                    mapa = self.activos.mapa(var)
                     if mapa:
                         story.append(Paragraph(f"Mapa de {var.replace('_',' ').title()}", seccion_style))
                         story.append(Image(mapa, width=450, height=350))
@@ -1359,6 +1881,7 @@ class GeneradorReportes:
             style = doc.styles['Normal']
             style.font.name = 'Arial'
             style.font.size = Pt(11)
+            graficos = self._crear_graficos()
             title = doc.add_heading('INFORME AMBIENTAL INTEGRAL', 0)
             title.alignment = WD_ALIGN_PARAGRAPH.CENTER
             doc.add_paragraph(f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
@@ -1404,6 +1927,8 @@ class GeneradorReportes:
                     tabla_carbono.cell(i, 2).text = f"{valor:.2f}"
                     porcentaje = (valor / total * 100) if total > 0 else 0
                     tabla_carbono.cell(i, 3).text = f"{porcentaje:.1f}%"
+            if 'carbono' in graficos:
+                doc.add_picture(graficos['carbono'], width=Inches(5))
             doc.add_page_break()
             # Análisis de biodiversidad
             doc.add_heading('ANÁLISIS DE BIODIVERSIDAD', level=1)
@@ -1424,6 +1949,8 @@ class GeneradorReportes:
                     tabla_biodiv.cell(i, 0).text = met
                     tabla_biodiv.cell(i, 1).text = val
                     tabla_biodiv.cell(i, 2).text = interp
+            if 'biodiv' in graficos:
+                doc.add_picture(graficos['biodiv'], width=Inches(5))
             doc.add_page_break()
             # Análisis forrajero
             doc.add_heading('ANÁLISIS FORRAJERO', level=1)
@@ -1451,16 +1978,21 @@ class GeneradorReportes:
                 if 'equivalentes_vaca' in forrajero_data:
                     ev = forrajero_data['equivalentes_vaca']
                     doc.add_heading('Equivalentes Vaca', level=2)
-                    tabla_ev = doc.add_table(rows=5, cols=2)
-                    tabla_ev.style = 'Light Shading'
-                    tabla_ev.cell(0, 0).text = 'Concepto'
-                    tabla_ev.cell(0, 1).text = 'Valor'
                     datos_ev = [
                         ('EV por día', f"{ev.get('ev_por_dia', 0):.1f}"),
                         ('EV para 30 días', f"{ev.get('ev_para_periodo', 0):.1f}"),
                         ('EV recomendado', f"{ev.get('ev_recomendado', 0):.1f}"),
                         ('Consumo EV diario', f"{ev.get('consumo_ev_diario_kg', 0)} kg")
                     ]
+                    incertidumbre = forrajero_data.get('incertidumbre')
+                    if incertidumbre:
+                        ev_b, dias_b = incertidumbre['ev_recomendado'], incertidumbre['dias_recomendados']
+                        datos_ev.append(('EV recomendado (P10 / P50 / P90)', f"{ev_b['p10']:.1f} / {ev_b['p50']:.1f} / {ev_b['p90']:.1f}"))
+                        datos_ev.append((f"Días con {incertidumbre['num_ev']:.0f} EV (P10 / P50 / P90)", f"{dias_b['p10']:.0f} / {dias_b['p50']:.0f} / {dias_b['p90']:.0f}"))
+                    tabla_ev = doc.add_table(rows=len(datos_ev) + 1, cols=2)
+                    tabla_ev.style = 'Light Shading'
+                    tabla_ev.cell(0, 0).text = 'Concepto'
+                    tabla_ev.cell(0, 1).text = 'Valor'
                     for i, (concepto, valor) in enumerate(datos_ev, 1):
                         tabla_ev.cell(i, 0).text = concepto
                         tabla_ev.cell(i, 1).text = valor
@@ -1477,6 +2009,21 @@ class GeneradorReportes:
                         tabla_sub.cell(i, 1).text = f"{s['area_ha']:.1f}"
                         tabla_sub.cell(i, 2).text = f"{s['disponibilidad_kg_ms_ha']:,.0f}"
                         tabla_sub.cell(i, 3).text = f"{s['forraje_aprovechable_kg_ms']/1000:.1f}"
+            if 'forrajero' in graficos:
+                doc.add_picture(graficos['forrajero'], width=Inches(6))
+            if 'comparativo' in graficos:
+                doc.add_page_break()
+                doc.add_heading('ÍNDICES ESPECTRALES', level=1)
+                doc.add_picture(graficos['comparativo'], width=Inches(6))
+            if self.sistema_mapas:
+                mapas = [(tit, self.activos.mapa(var)) for var, tit in ActivosReporte.MAPAS]
+                if any(m for _, m in mapas):
+                    doc.add_page_break()
+                    doc.add_heading('MAPAS DE CALOR', level=1)
+                    for tit, mapa in mapas:
+                        if mapa:
+                            doc.add_heading(tit, level=2)
+                            doc.add_picture(mapa, width=Inches(6))
             doc.save(self.buffer_docx)
             self.buffer_docx.seek(0)
             return self.buffer_docx
@@ -1504,210 +2051,186 @@ class GeneradorReportes:
 # ===============================
 # FUNCIÓN PARA GENERAR INFORME CON IA (ahora usando Groq)
 # ===============================
-def generar_reporte_ia(resultados, gdf, sistema_mapas=None):
+def generar_reporte_ia(resultados, gdf, sistema_mapas=None, activos=None):
     """
-    Genera un informe en Word con análisis de IA usando Groq.
+    Genera un informe en Word con análisis de IA usando Groq. Los gráficos y
+    mapas salen de los activos compartidos con el PDF y el DOCX.
     """
-    import tempfile
     from docx import Document
     from docx.shared import Inches, Pt
     from docx.enum.text import WD_ALIGN_PARAGRAPH
     from datetime import datetime
-    import io
-    import os
 
     if not REPORTDOCX_AVAILABLE:
         st.error("python-docx no está instalado. No se puede generar el informe.")
         return None
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        doc = Document()
-        section = doc.sections[0]
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-
-        title = doc.add_heading('INFORME AMBIENTAL CON ANÁLISIS DE IA (GROQ)', 0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        subtitle = doc.add_paragraph(f'Fecha: {datetime.now().strftime("%d/%m/%Y %H:%M")}')
-        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    activos = activos or ActivosReporte(resultados, gdf, sistema_mapas)
+
+    doc = Document()
+    section = doc.sections[0]
+    section.left_margin = Inches(1)
+    section.right_margin = Inches(1)
+    section.top_margin = Inches(1)
+    section.bottom_margin = Inches(1)
+
+    title = doc.add_heading('INFORME AMBIENTAL CON ANÁLISIS DE IA (GROQ)', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    subtitle = doc.add_paragraph(f'Fecha: {datetime.now().strftime("%d/%m/%Y %H:%M")}')
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph()
+
+    df, stats = preparar_resumen(resultados)
+
+    # 1. Resumen ejecutivo
+    doc.add_heading('1. RESUMEN EJECUTIVO', level=1)
+    tabla_resumen = doc.add_table(rows=1, cols=3)
+    tabla_resumen.style = 'Light Shading'
+    tabla_resumen.cell(0, 0).text = 'Métrica'
+    tabla_resumen.cell(0, 1).text = 'Valor'
+    tabla_resumen.cell(0, 2).text = 'Interpretación'
+
+    metricas = [
+        ('Área total', f"{stats['area_total_ha']:,.1f} ha", 'Superficie del área de estudio'),
+        ('Carbono total', f"{stats['carbono_total_ton']:,.0f} ton C", 'Almacenamiento total de carbono'),
+        ('CO₂ equivalente', f"{stats['co2_total_ton']:,.0f} ton CO₂e", 'Potencial de créditos de carbono'),
+        ('Índice Shannon', f"{stats['shannon_promedio']:.3f}", 'Nivel de biodiversidad'),
+        ('NDVI promedio', f"{stats['ndvi_promedio']:.3f}", 'Salud de la vegetación'),
+        ('NDWI promedio', f"{stats['ndwi_promedio']:.3f}", 'Contenido de agua'),
+        ('Tipo ecosistema', stats['tipo_ecosistema'], 'Vegetación predominante'),
+        ('Puntos muestreo', str(stats['num_puntos']), 'Muestras analizadas')
+    ]
+    for i, (met, val, interp) in enumerate(metricas, 1):
+        row = tabla_resumen.add_row().cells
+        row[0].text = met
+        row[1].text = val
+        row[2].text = interp
+    doc.add_paragraph()
+
+    # 2. Análisis de Carbono (usando función de ia_integration)
+    doc.add_heading('2. ANÁLISIS DE CARBONO', level=1)
+    if resultados.get('desglose_promedio'):
+        doc.add_heading('Distribución por pools', level=2)
+        tabla_pools = doc.add_table(rows=1, cols=3)
+        tabla_pools.style = 'Light Shading'
+        tabla_pools.cell(0, 0).text = 'Pool'
+        tabla_pools.cell(0, 1).text = 'Descripción'
+        tabla_pools.cell(0, 2).text = 'Ton C/ha'
+        desc = {'AGB':'Biomasa Aérea Viva', 'BGB':'Biomasa de Raíces', 'DW':'Madera Muerta', 'LI':'Hojarasca', 'SOC':'Carbono Orgánico del Suelo'}
+        for pool, valor in resultados['desglose_promedio'].items():
+            row = tabla_pools.add_row().cells
+            row[0].text = pool
+            row[1].text = desc.get(pool, pool)
+            row[2].text = f"{valor:.2f}"
         doc.add_paragraph()
+        png = activos.grafico('carbono')
+        if png:
+            doc.add_picture(png, width=Inches(5))
+            doc.add_paragraph()
 
-        df, stats = preparar_resumen(resultados)
-
-        # 1. Resumen ejecutivo
-        doc.add_heading('1. RESUMEN EJECUTIVO', level=1)
-        tabla_resumen = doc.add_table(rows=1, cols=3)
-        tabla_resumen.style = 'Light Shading'
-        tabla_resumen.cell(0, 0).text = 'Métrica'
-        tabla_resumen.cell(0, 1).text = 'Valor'
-        tabla_resumen.cell(0, 2).text = 'Interpretación'
-
-        metricas = [
-            ('Área total', f"{stats['area_total_ha']:,.1f} ha", 'Superficie del área de estudio'),
-            ('Carbono total', f"{stats['carbono_total_ton']:,.0f} ton C", 'Almacenamiento total de carbono'),
-            ('CO₂ equivalente', f"{stats['co2_total_ton']:,.0f} ton CO₂e", 'Potencial de créditos de carbono'),
-            ('Índice Shannon', f"{stats['shannon_promedio']:.3f}", 'Nivel de biodiversidad'),
-            ('NDVI promedio', f"{stats['ndvi_promedio']:.3f}", 'Salud de la vegetación'),
-            ('NDWI promedio', f"{stats['ndwi_promedio']:.3f}", 'Contenido de agua'),
-            ('Tipo ecosistema', stats['tipo_ecosistema'], 'Vegetación predominante'),
-            ('Puntos muestreo', str(stats['num_puntos']), 'Muestras analizadas')
+    doc.add_heading('2.1 Interpretación técnica', level=2)
+    analisis_carbono = generar_analisis_carbono(df, stats)
+    doc.add_paragraph(analisis_carbono)
+
+    # 3. Análisis de Biodiversidad
+    doc.add_heading('3. ANÁLISIS DE BIODIVERSIDAD', level=1)
+    if resultados.get('puntos_biodiversidad'):
+        biodiv = resultados['puntos_biodiversidad'][0]
+        tabla_biodiv = doc.add_table(rows=1, cols=2)
+        tabla_biodiv.style = 'Light Shading'
+        tabla_biodiv.cell(0, 0).text = 'Métrica'
+        tabla_biodiv.cell(0, 1).text = 'Valor'
+        metricas_bio = [
+            ('Índice Shannon', f"{biodiv.get('indice_shannon', 0):.3f}"),
+            ('Categoría', biodiv.get('categoria', 'N/A')),
+            ('Riqueza de especies', str(biodiv.get('riqueza_especies', 0))),
+            ('Abundancia total', f"{biodiv.get('abundancia_total', 0):,}")
         ]
-        for i, (met, val, interp) in enumerate(metricas, 1):
-            row = tabla_resumen.add_row().cells
+        for met, val in metricas_bio:
+            row = tabla_biodiv.add_row().cells
             row[0].text = met
             row[1].text = val
-            row[2].text = interp
         doc.add_paragraph()
-
-        # 2. Análisis de Carbono (usando función de ia_integration)
-        doc.add_heading('2. ANÁLISIS DE CARBONO', level=1)
-        if resultados.get('desglose_promedio'):
-            doc.add_heading('Distribución por pools', level=2)
-            tabla_pools = doc.add_table(rows=1, cols=3)
-            tabla_pools.style = 'Light Shading'
-            tabla_pools.cell(0, 0).text = 'Pool'
-            tabla_pools.cell(0, 1).text = 'Descripción'
-            tabla_pools.cell(0, 2).text = 'Ton C/ha'
-            desc = {'AGB':'Biomasa Aérea Viva', 'BGB':'Biomasa de Raíces', 'DW':'Madera Muerta', 'LI':'Hojarasca', 'SOC':'Carbono Orgánico del Suelo'}
-            for pool, valor in resultados['desglose_promedio'].items():
-                row = tabla_pools.add_row().cells
-                row[0].text = pool
-                row[1].text = desc.get(pool, pool)
-                row[2].text = f"{valor:.2f}"
-            doc.add_paragraph()
-            vis = Visualizaciones()
-            fig_carbono = vis.crear_grafico_barras_carbono(resultados['desglose_promedio'])
-            if fig_carbono:
-                try:
-                    img_bytes = fig_carbono.to_image(format='png', width=800, height=500, scale=2)
-                    img_path = os.path.join(tmpdir, 'carbono.png')
-                    with open(img_path, 'wb') as f:
-                        f.write(img_bytes)
-                    doc.add_picture(img_path, width=Inches(5))
-                    doc.add_paragraph()
-                except:
-                    pass
-
-        doc.add_heading('2.1 Interpretación técnica', level=2)
-        analisis_carbono = generar_analisis_carbono(df, stats)
-        doc.add_paragraph(analisis_carbono)
-
-        # 3. Análisis de Biodiversidad
-        doc.add_heading('3. ANÁLISIS DE BIODIVERSIDAD', level=1)
-        if resultados.get('puntos_biodiversidad'):
-            biodiv = resultados['puntos_biodiversidad'][0]
-            tabla_biodiv = doc.add_table(rows=1, cols=2)
-            tabla_biodiv.style = 'Light Shading'
-            tabla_biodiv.cell(0, 0).text = 'Métrica'
-            tabla_biodiv.cell(0, 1).text = 'Valor'
-            metricas_bio = [
-                ('Índice Shannon', f"{biodiv.get('indice_shannon', 0):.3f}"),
-                ('Categoría', biodiv.get('categoria', 'N/A')),
-                ('Riqueza de especies', str(biodiv.get('riqueza_especies', 0))),
-                ('Abundancia total', f"{biodiv.get('abundancia_total', 0):,}")
-            ]
-            for met, val in metricas_bio:
-                row = tabla_biodiv.add_row().cells
-                row[0].text = met
-                row[1].text = val
+        png = activos.grafico('biodiv')
+        if png:
+            doc.add_picture(png, width=Inches(5))
             doc.add_paragraph()
-            fig_biodiv = vis.crear_grafico_radar_biodiversidad(biodiv)
-            if fig_biodiv:
-                try:
-                    img_bytes = fig_biodiv.to_image(format='png', width=800, height=800, scale=2)
-                    img_path = os.path.join(tmpdir, 'biodiv.png')
-                    with open(img_path, 'wb') as f:
-                        f.write(img_bytes)
-                    doc.add_picture(img_path, width=Inches(5))
-                    doc.add_paragraph()
-                except:
-                    pass
-
-        doc.add_heading('3.1 Interpretación técnica', level=2)
-        analisis_biodiv = generar_analisis_biodiversidad(df, stats)
-        doc.add_paragraph(analisis_biodiv)
-
-        # 4. Análisis de Índices Espectrales
-        doc.add_heading('4. ANÁLISIS DE ÍNDICES ESPECTRALES', level=1)
-        doc.add_heading('4.1 Interpretación técnica', level=2)
-        analisis_espectral = generar_analisis_espectral(df, stats)
-        doc.add_paragraph(analisis_espectral)
-
-        # 5. Análisis Forrajero
-        doc.add_heading('5. ANÁLISIS FORRAJERO', level=1)
-        if 'analisis_forrajero' in resultados:
-            forrajero = resultados['analisis_forrajero']
-            disp = forrajero['disponibilidad_forrajera']
-            ev = forrajero['equivalentes_vaca']
-            tabla_forraje = doc.add_table(rows=1, cols=2)
-            tabla_forraje.style = 'Light Shading'
-            tabla_forraje.cell(0, 0).text = 'Métrica'
-            tabla_forraje.cell(0, 1).text = 'Valor'
-            datos_f = [
-                ('Productividad (kg MS/ha)', f"{disp['productividad_kg_ms_ha']:,.0f}"),
-                ('Forraje aprovechable (ton)', f"{disp['forraje_aprovechable_kg_ms']/1000:.1f}"),
-                ('EV por día', f"{ev['ev_por_dia']:.1f}"),
-                ('EV recomendado (30 días)', f"{ev['ev_recomendado']:.1f}")
-            ]
-            for met, val in datos_f:
-                row = tabla_forraje.add_row().cells
-                row[0].text = met
-                row[1].text = val
-            doc.add_paragraph()
-            fig_forrajero = vis.crear_grafico_forrajero(disp, ev)
-            if fig_forrajero:
-                try:
-                    img_bytes = fig_forrajero.to_image(format='png', width=1000, height=700, scale=2)
-                    img_path = os.path.join(tmpdir, 'forrajero.png')
-                    with open(img_path, 'wb') as f:
-                        f.write(img_bytes)
-                    doc.add_picture(img_path, width=Inches(6))
-                    doc.add_paragraph()
-                except:
-                    pass
-
-        doc.add_heading('5.1 Interpretación técnica', level=2)
-        analisis_forrajero = generar_analisis_forrajero(df, stats)
-        doc.add_paragraph(analisis_forrajero)
-
-        # 6. Mapas de calor
-        if sistema_mapas:
-            doc.add_heading('6. MAPAS DE CALOR CONTINUOS', level=1)
-            variables = ['carbono', 'ndvi', 'ndwi', 'biodiversidad', 'forraje']
-            titulos = ['Carbono (ton C/ha)', 'NDVI', 'NDWI', 'Biodiversidad (Shannon)', 'Productividad Forrajera (kg MS/ha)']
-            for var, tit in zip(variables, titulos):
-                mapa = sistema_mapas.crear_mapa_estatico(resultados, var, gdf)
-                if mapa:
-                    doc.add_heading(tit, level=2)
-                    img_path = os.path.join(tmpdir, f'mapa_{var}.png')
-                    with open(img_path, 'wb') as f:
-                        f.write(mapa.getvalue())
-                    doc.add_picture(img_path, width=Inches(6))
-                    doc.add_paragraph()
-
-        # 7. Recomendaciones Integradas
-        doc.add_heading('7. RECOMENDACIONES DE MANEJO', level=1)
-        recomendaciones = generar_recomendaciones_integradas(df, stats)
-        doc.add_paragraph(recomendaciones)
-
-        # 8. Metadatos
-        doc.add_heading('8. METADATOS', level=1)
-        metadatos = [
-            ('Generado por', 'Sistema Satelital de Análisis Ambiental v3.0 con IA Groq'),
-            ('Fecha de generación', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-            ('Número de puntos', str(stats['num_puntos']))
+
+    doc.add_heading('3.1 Interpretación técnica', level=2)
+    analisis_biodiv = generar_analisis_biodiversidad(df, stats)
+    doc.add_paragraph(analisis_biodiv)
+
+    # 4. Análisis de Índices Espectrales
+    doc.add_heading('4. ANÁLISIS DE ÍNDICES ESPECTRALES', level=1)
+    doc.add_heading('4.1 Interpretación técnica', level=2)
+    analisis_espectral = generar_analisis_espectral(df, stats)
+    doc.add_paragraph(analisis_espectral)
+
+    # 5. Análisis Forrajero
+    doc.add_heading('5. ANÁLISIS FORRAJERO', level=1)
+    if 'analisis_forrajero' in resultados:
+        forrajero = resultados['analisis_forrajero']
+        disp = forrajero['disponibilidad_forrajera']
+        ev = forrajero['equivalentes_vaca']
+        tabla_forraje = doc.add_table(rows=1, cols=2)
+        tabla_forraje.style = 'Light Shading'
+        tabla_forraje.cell(0, 0).text = 'Métrica'
+        tabla_forraje.cell(0, 1).text = 'Valor'
+        datos_f = [
+            ('Productividad (kg MS/ha)', f"{disp['productividad_kg_ms_ha']:,.0f}"),
+            ('Forraje aprovechable (ton)', f"{disp['forraje_aprovechable_kg_ms']/1000:.1f}"),
+            ('EV por día', f"{ev['ev_por_dia']:.1f}"),
+            ('EV recomendado (30 días)', f"{ev['ev_recomendado']:.1f}")
         ]
-        for key, val in metadatos:
-            p = doc.add_paragraph()
-            p.add_run(f"{key}: ").bold = True
-            p.add_run(val)
+        if forrajero.get('incertidumbre'):
+            ev_b = forrajero['incertidumbre']['ev_recomendado']
+            dias_b = forrajero['incertidumbre']['dias_recomendados']
+            datos_f.append(('EV recomendado P10 / P50 / P90', f"{ev_b['p10']:.1f} / {ev_b['p50']:.1f} / {ev_b['p90']:.1f}"))
+            datos_f.append(('Días de pastoreo P10 / P50 / P90', f"{dias_b['p10']:.0f} / {dias_b['p50']:.0f} / {dias_b['p90']:.0f}"))
+        for met, val in datos_f:
+            row = tabla_forraje.add_row().cells
+            row[0].text = met
+            row[1].text = val
+        doc.add_paragraph()
+        png = activos.grafico('forrajero')
+        if png:
+            doc.add_picture(png, width=Inches(6))
+            doc.add_paragraph()
 
-        docx_output = BytesIO()
-        doc.save(docx_output)
-        docx_output.seek(0)
-        return docx_output
+    doc.add_heading('5.1 Interpretación técnica', level=2)
+    analisis_forrajero = generar_analisis_forrajero(df, stats)
+    doc.add_paragraph(analisis_forrajero)
+
+    # 6. Mapas de calor
+    if sistema_mapas:
+        doc.add_heading('6. MAPAS DE CALOR CONTINUOS', level=1)
+        for var, tit in ActivosReporte.MAPAS:
+            mapa = activos.mapa(var)
+            if mapa:
+                doc.add_heading(tit, level=2)
+                doc.add_picture(mapa, width=Inches(6))
+                doc.add_paragraph()
+
+    # 7. Recomendaciones Integradas
+    doc.add_heading('7. RECOMENDACIONES DE MANEJO', level=1)
+    recomendaciones = generar_recomendaciones_integradas(df, stats)
+    doc.add_paragraph(recomendaciones)
+
+    # 8. Metadatos
+    doc.add_heading('8. METADATOS', level=1)
+    metadatos = [
+        ('Generado por', 'Sistema Satelital de Análisis Ambiental v3.0 con IA Groq'),
+        ('Fecha de generación', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        ('Número de puntos', str(stats['num_puntos']))
+    ]
+    for key, val in metadatos:
+        p = doc.add_paragraph()
+        p.add_run(f"{key}: ").bold = True
+        p.add_run(val)
+
+    docx_output = BytesIO()
+    doc.save(docx_output)
+    docx_output.seek(0)
+    return docx_output
 
 # ===============================
 # FUNCIONES AUXILIARES
@@ -1729,144 +2252,41 @@ def validar_y_corregir_crs(gdf):
         return gdf
 
 def calcular_superficie(gdf):
+    """Área total en ha de todas las geometrías, sobre el elipsoide (ver modules/area_geodesica.py)."""
     try:
         if gdf is None or len(gdf) == 0:
             return 0.0
         gdf = validar_y_corregir_crs(gdf)
         bounds = gdf.total_bounds
         if bounds[0] < -180 or bounds[2] > 180 or bounds[1] < -90 or bounds[3] > 90:
-            st.warning("⚠️ Coordenadas fuera de rango para cálculo preciso de área")
-            area_grados2 = gdf.geometry.area.sum()
-            area_m2 = area_grados2 * 111000 * 111000
-            return area_m2 / 10000
-        gdf_projected = gdf.to_crs('EPSG:3857')
-        area_m2 = gdf_projected.geometry.area.sum()
-        return area_m2 / 10000
-    except Exception as e:
-        try:
+            # Coordenadas en metros sin CRS declarado: el área plana es la única medida posible
+            st.warning("⚠️ Coordenadas fuera de rango geográfico: el archivo parece proyectado sin CRS declarado")
             return gdf.geometry.area.sum() / 10000
-        except:
-            return 0.0
-
-def dividir_poligono_en_cuadricula(poligono, puntos_forraje, n_celdas=100):
-    try:
-        bounds = poligono.bounds
-        minx, miny, maxx, maxy = bounds
-        n_cols = int(np.sqrt(n_celdas * (maxx - minx) / (maxy - miny)))
-        n_rows = int(n_celdas / n_cols)
-        if n_rows == 0:
-            n_rows = 1
-        width = (maxx - minx) / n_cols
-        height = (maxy - miny) / n_rows
-        celdas = []
-        productividades = []
-        for i in range(n_rows):
-            for j in range(n_cols):
-                cell_minx = minx + j * width
-                cell_maxx = minx + (j + 1) * width
-                cell_miny = miny + i * height
-                cell_maxy = miny + (i + 1) * height
-                cell_poly = Polygon([(cell_minx, cell_miny), (cell_maxx, cell_miny), (cell_maxx, cell_maxy), (cell_minx, cell_maxy)])
-                intersection = poligono.intersection(cell_poly)
-                if intersection.is_empty or intersection.area == 0:
-                    continue
-                puntos_dentro = [p['productividad_kg_ms_ha'] for p in puntos_forraje if Point(p['lon'], p['lat']).within(intersection)]
-                if puntos_dentro:
-                    prod_promedio = np.mean(puntos_dentro)
-                else:
-                    min_dist = float('inf')
-                    prod_cercano = None
-                    for p in puntos_forraje:
-                        point = Point(p['lon'], p['lat'])
-                        dist = intersection.distance(point)
-                        if dist < min_dist:
-                            min_dist = dist
-                            prod_cercano = p['productividad_kg_ms_ha']
-                    prod_promedio = prod_cercano if prod_cercano is not None else 0
-                celdas.append(intersection)
-                productividades.append(prod_promedio)
-        gdf_celdas = gpd.GeoDataFrame({'geometry': celdas, 'productividad_kg_ms_ha': productividades}, crs='EPSG:4326')
-        return gdf_celdas
+        return area_total_ha(gdf)
     except Exception as e:
-        st.warning(f"Error en dividir cuadrícula: {str(e)}")
-        return gpd.GeoDataFrame()
+        st.warning(f"⚠️ Error calculando la superficie: {str(e)}")
+        return 0.0
 
 def cargar_shapefile_desde_zip(zip_file):
     try:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                zip_ref.extractall(tmp_dir)
-            shp_files = [f for f in os.listdir(tmp_dir) if f.endswith('.shp')]
-            if shp_files:
-                shp_path = os.path.join(tmp_dir, shp_files[0])
-                gdf = gpd.read_file(shp_path)
-                gdf = validar_y_corregir_crs(gdf)
-                return gdf
-            else:
-                st.error("❌ No se encontró ningún archivo .shp en el ZIP")
-                return None
+        zip_file.seek(0)
+        gdf = leer_shapefile_zip(zip_file)
+        if gdf is None:
+            st.error("❌ No se encontró ningún archivo .shp en el ZIP")
+            return None
+        return gdf
     except Exception as e:
         st.error(f"❌ Error cargando shapefile desde ZIP: {str(e)}")
         return None
 
 def parsear_kml_manual(contenido_kml):
+    """Parsea un KML (texto, bytes u objeto archivo) en streaming; ver modules/lector_kml.py."""
     try:
-        root = ET.fromstring(contenido_kml)
-        namespaces = {'kml': 'http://www.opengis.net/kml/2.2'}
-        polygons = []
-        for polygon_elem in root.findall('.//kml:Polygon', namespaces):
-            coords_elem = polygon_elem.find('.//kml:coordinates', namespaces)
-            if coords_elem is not None and coords_elem.text:
-                coord_text = coords_elem.text.strip()
-                coord_list = []
-                for coord_pair in coord_text.split():
-                    parts = coord_pair.split(',')
-                    if len(parts) >= 2:
-                        lon = float(parts[0])
-                        lat = float(parts[1])
-                        coord_list.append((lon, lat))
-                if len(coord_list) >= 3:
-                    polygons.append(Polygon(coord_list))
-        if not polygons:
-            for multi_geom in root.findall('.//kml:MultiGeometry', namespaces):
-                for polygon_elem in multi_geom.findall('.//kml:Polygon', namespaces):
-                    coords_elem = polygon_elem.find('.//kml:coordinates', namespaces)
-                    if coords_elem is not None and coords_elem.text:
-                        coord_text = coords_elem.text.strip()
-                        coord_list = []
-                        for coord_pair in coord_text.split():
-                            parts = coord_pair.split(',')
-                            if len(parts) >= 2:
-                                lon = float(parts[0])
-                                lat = float(parts[1])
-                                coord_list.append((lon, lat))
-                        if len(coord_list) >= 3:
-                            polygons.append(Polygon(coord_list))
-        if polygons:
-            gdf = gpd.GeoDataFrame({'geometry': polygons}, crs='EPSG:4326')
-            return gdf
-        else:
-            for placemark in root.findall('.//kml:Placemark', namespaces):
-                for elem_name in ['Polygon', 'LineString', 'Point', 'LinearRing']:
-                    elem = placemark.find(f'.//kml:{elem_name}', namespaces)
-                    if elem is not None:
-                        coords_elem = elem.find('.//kml:coordinates', namespaces)
-                        if coords_elem is not None and coords_elem.text:
-                            coord_text = coords_elem.text.strip()
-                            coord_list = []
-                            for coord_pair in coord_text.split():
-                                parts = coord_pair.split(',')
-                                if len(parts) >= 2:
-                                    lon = float(parts[0])
-                                    lat = float(parts[1])
-                                    coord_list.append((lon, lat))
-                            if len(coord_list) >= 3:
-                                polygons.append(Polygon(coord_list))
-                            break
-        if polygons:
-            gdf = gpd.GeoDataFrame({'geometry': polygons}, crs='EPSG:4326')
-            return gdf
-        return None
+        if isinstance(contenido_kml, str):
+            contenido_kml = contenido_kml.encode('utf-8')
+        if isinstance(contenido_kml, bytes):
+            contenido_kml = BytesIO(contenido_kml)
+        return leer_kml(contenido_kml)
     except Exception as e:
         st.error(f"❌ Error parseando KML manualmente: {str(e)}")
         return None
@@ -1874,43 +2294,35 @@ def parsear_kml_manual(contenido_kml):
 def cargar_kml(kml_file):
     try:
         if kml_file.name.endswith('.kmz'):
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                with zipfile.ZipFile(kml_file, 'r') as zip_ref:
-                    zip_ref.extractall(tmp_dir)
-                kml_files = [f for f in os.listdir(tmp_dir) if f.endswith('.kml')]
-                if kml_files:
-                    kml_path = os.path.join(tmp_dir, kml_files[0])
-                    with open(kml_path, 'r', encoding='utf-8') as f:
-                        contenido = f.read()
-                    gdf = parsear_kml_manual(contenido)
-                    if gdf is not None:
-                        return gdf
-                    else:
-                        try:
-                            gdf = gpd.read_file(kml_path)
-                            gdf = validar_y_corregir_crs(gdf)
-                            return gdf
-                        except:
-                            st.error("❌ No se pudo cargar el archivo KML/KMZ")
-                            return None
-                else:
+            kml_file.seek(0)
+            with zipfile.ZipFile(kml_file, 'r') as zip_ref:
+                flujo = abrir_kml_de_kmz(zip_ref)
+                if flujo is None:
                     st.error("❌ No se encontró ningún archivo .kml en el KMZ")
                     return None
+                with flujo:
+                    gdf = parsear_kml_manual(flujo)
+                if gdf is not None:
+                    return gdf
+                try:
+                    with abrir_kml_de_kmz(zip_ref) as flujo:
+                        return gpd.read_file(BytesIO(flujo.read()))
+                except:
+                    st.error("❌ No se pudo cargar el archivo KML/KMZ")
+                    return None
         else:
-            contenido = kml_file.read().decode('utf-8')
-            gdf = parsear_kml_manual(contenido)
+            kml_file.seek(0)
+            gdf = parsear_kml_manual(kml_file)
             if gdf is not None:
                 return gdf
             else:
                 kml_file.seek(0)
-                gdf = gpd.read_file(kml_file)
-                gdf = validar_y_corregir_crs(gdf)
-                return gdf
+                return gpd.read_file(kml_file)
     except Exception as e:
         st.error(f"❌ Error cargando archivo KML/KMZ: {str(e)}")
         return None
 
-def cargar_archivo_parcela(uploaded_file):
+def cargar_archivo_parcela(uploaded_file, filtros_catastro=None):
     try:
         if uploaded_file.name.endswith('.zip'):
             gdf = cargar_shapefile_desde_zip(uploaded_file)
@@ -1918,12 +2330,18 @@ def cargar_archivo_parcela(uploaded_file):
             gdf = cargar_kml(uploaded_file)
         elif uploaded_file.name.endswith('.geojson'):
             gdf = gpd.read_file(uploaded_file)
-            gdf = validar_y_corregir_crs(gdf)
+        elif es_catastro(uploaded_file.name):
+            gdf = leer_catastro(uploaded_file, uploaded_file.name, **(filtros_catastro or {}))
+            if len(gdf) == 0:
+                st.error("❌ Ningún registro del catastro cumple el filtro")
+                return None
+            st.info(f"🗂️ {len(gdf):,} registro(s) seleccionados del catastro ({calcular_superficie(gdf):,.1f} ha)")
         else:
             st.error("❌ Formato de archivo no soportado")
             return None
 
         if gdf is not None:
+            # Única normalización de CRS: los lectores devuelven el CRS original
             gdf = validar_y_corregir_crs(gdf)
             gdf = gdf.explode(ignore_index=True)
             gdf = gdf[gdf.geometry.geom_type.isin(['Polygon', 'MultiPolygon'])]
@@ -1931,11 +2349,8 @@ def cargar_archivo_parcela(uploaded_file):
                 st.error("❌ No se encontraron polígonos en el archivo")
                 return None
             geometria_unida = gdf.unary_union
-            gdf_unido = gpd.GeoDataFrame([{'geometry': geometria_unida}], crs='EPSG:4326')
-            gdf_unido = validar_y_corregir_crs(gdf_unido)
             st.info(f"✅ Se unieron {len(gdf)} polígono(s) en una sola geometría.")
-            gdf_unido['id_zona'] = 1
-            return gdf_unido
+            return gpd.GeoDataFrame([{'geometry': geometria_unida, 'id_zona': 1}], crs='EPSG:4326')
         return gdf
     except Exception as e:
         st.error(f"❌ Error cargando archivo: {str(e)}")
@@ -1943,14 +2358,179 @@ def cargar_archivo_parcela(uploaded_file):
         st.error(f"Detalle: {traceback.format_exc()}")
         return None
 
+def huella_archivo(uploaded_file) -> str:
+    """Hash del contenido del archivo subido (independiente del nombre y de la sesión)."""
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def inspeccionar_catastro_subido(huella, _uploaded_file, capa=None):
+    """Metadatos del catastro subido (solo encabezados), una vez por archivo y capa."""
+    info = inspeccionar_catastro(_uploaded_file, _uploaded_file.name, capa)
+    info['crs'] = str(info['crs']) if info['crs'] is not None else None
+    return info
+
+def configurar_filtros_catastro(uploaded_file, huella):
+    """
+    Selección de un subconjunto del catastro (capa, atributo y rectángulo) que
+    se delega al lector. Devuelve los filtros confirmados para este archivo o
+    None mientras el usuario no cargue la selección.
+    """
+    info = inspeccionar_catastro_subido(huella, uploaded_file)
+    with st.expander("🗂️ Selección del catastro", expanded=True):
+        st.caption(f"{info['registros']:,} registros · filtro espacial "
+                   f"{'con índice' if info['filtro_espacial_indexado'] else 'por lectura'}")
+        filtros = {}
+        if len(info['capas']) > 1:
+            filtros['capa'] = st.selectbox("Capa", info['capas'])
+            info = inspeccionar_catastro_subido(huella, uploaded_file, filtros['capa'])
+        columna = st.selectbox("Filtrar por atributo", ['(ninguno)'] + list(info['columnas']))
+        if columna != '(ninguno)':
+            valores = [v.strip() for v in st.text_input("Valores (separados por coma)").split(',') if v.strip()]
+            if valores:
+                filtros.update(columna=columna, valores=tuple(valores), tipo_columna=info['columnas'][columna])
+        if st.checkbox("Limitar a un rectángulo (lon/lat)") and info['extension']:
+            oeste, sur, este, norte = info['extension']
+            col1, col2 = st.columns(2)
+            with col1:
+                oeste = st.number_input("Oeste", value=float(oeste), format="%.5f")
+                sur = st.number_input("Sur", value=float(sur), format="%.5f")
+            with col2:
+                este = st.number_input("Este", value=float(este), format="%.5f")
+                norte = st.number_input("Norte", value=float(norte), format="%.5f")
+            filtros['bbox'] = (oeste, sur, este, norte)
+        if st.button("Cargar selección", use_container_width=True):
+            st.session_state.filtros_catastro = {'huella': huella, 'filtros': filtros}
+    confirmado = st.session_state.get('filtros_catastro')
+    if confirmado and confirmado['huella'] == huella:
+        return confirmado['filtros']
+    return None
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def procesar_archivo_parcela(huella, _uploaded_file, filtros_catastro=None):
+    """
+    Lectura, normalización de CRS, unión, área y mapa base de una parcela,
+    una vez por contenido distinto; `huella` es la clave de la caché. El
+    resultado se comparte entre sesiones (el mapa folium no es serializable),
+    así que quien lo use debe copiar el GeoDataFrame antes de modificarlo.
+    """
+    gdf = cargar_archivo_parcela(_uploaded_file, filtros_catastro)
+    if gdf is None:
+        return None, 0.0, None
+    return gdf, parcela_de(gdf).area_ha, SistemaMapas().crear_mapa_area(gdf, zoom_auto=True)
+
+def guardar_raster_local(uploaded_file):
+    """
+    Copia el GeoTIFF subido a un archivo temporal por bloques, para que rasterio
+    lo lea por ventanas desde disco sin mantener una segunda copia en memoria.
+    La copia vive lo que la sesión: se borra al reemplazarla o al descartarse.
+    """
+    clave = (uploaded_file.name, uploaded_file.size)
+    guardado = st.session_state.get('raster_subido')
+    if guardado is not None and guardado.clave == clave and os.path.exists(guardado.ruta):
+        return guardado.ruta
+    try:
+        nuevo = RasterSubido(uploaded_file, clave)
+    except Exception as e:
+        st.error(f"❌ Error guardando el raster: {str(e)}")
+        return None
+    if guardado is not None:
+        guardado.borrar()
+    st.session_state.raster_subido = nuevo
+    return nuevo.ruta
+
+def directorio_rasters():
+    """
+    Directorio del servidor desde el que se permite leer rasters por ruta
+    (secret o variable de entorno DIRECTORIO_RASTERS). Sin configurar, solo
+    se aceptan archivos subidos.
+    """
+    try:
+        directorio = st.secrets.get("DIRECTORIO_RASTERS")
+    except Exception:
+        directorio = None
+    directorio = directorio or os.getenv("DIRECTORIO_RASTERS")
+    return directorio if directorio and os.path.isdir(directorio) else None
+
+def cargar_sublotes(uploaded_file, poligono):
+    """
+    Carga los polígonos de sublotes sin unirlos (a diferencia de cargar_archivo_parcela)
+    y los recorta al lote analizado.
+    """
+    try:
+        if uploaded_file.name.endswith('.zip'):
+            gdf = cargar_shapefile_desde_zip(uploaded_file)
+        elif uploaded_file.name.endswith(('.kml', '.kmz')):
+            gdf = cargar_kml(uploaded_file)
+        elif uploaded_file.name.endswith('.geojson'):
+            gdf = gpd.read_file(uploaded_file)
+        elif es_catastro(uploaded_file.name):
+            # Solo los registros que tocan el lote
+            gdf = leer_catastro(uploaded_file, uploaded_file.name, bbox=poligono.bounds)
+        else:
+            st.error("❌ Formato de archivo no soportado")
+            return None
+        if gdf is None:
+            return None
+        gdf = validar_y_corregir_crs(gdf)
+        gdf = gdf.explode(ignore_index=True)
+        gdf = gdf[gdf.geometry.geom_type.isin(['Polygon', 'MultiPolygon'])]
+        geometrias = gdf.geometry.intersection(poligono)
+        geometrias = geometrias[~geometrias.is_empty & (geometrias.area > 0)]
+        if len(geometrias) == 0:
+            st.error("❌ Ningún sublote se superpone con el lote analizado")
+            return None
+        return gpd.GeoDataFrame({'sublote_id': range(1, len(geometrias) + 1)}, geometry=geometrias.values, crs='EPSG:4326')
+    except Exception as e:
+        st.error(f"❌ Error cargando sublotes: {str(e)}")
+        return None
+
 # ===============================
 # FUNCIÓN PRINCIPAL DE ANÁLISIS
 # ===============================
-def ejecutar_analisis_completo(gdf, tipo_ecosistema, num_puntos, usar_gee=False):
+def analizar_pixeles(raster, poligono, superficie, tipo_ecosistema, sistema_forrajero, precipitacion, verra, forrajero):
+    """
+    Cobertura total: aplica los modelos de carbono y forraje a cada píxel del
+    lote, bloque por bloque, y acumula totales ponderados por el área de cada
+    píxel. Los mismos bloques alimentan la superficie del lote en lugar de la
+    interpolación de puntos.
+    """
+    totales = {'area_ha': 0.0, 'pixeles': 0, 'carbono_ton': 0.0, 'ndvi': 0.0, 'ndwi': 0.0, 'area_ndwi_ha': 0.0,
+               'forraje_kg_ms': 0.0, 'crecimiento_kg_dia': 0.0}
+    transformador = None
+    for bloque in raster.recorrer_lote(poligono):
+        if transformador is None:
+            transformador = pyproj.Transformer.from_crs(bloque['crs'], superficie.crs_metrico, always_xy=True)
+        ndvi = bloque['indices']['NDVI'].astype(float)
+        ndwi = bloque['indices']['NDWI'].astype(float)
+        area = bloque['area_ha']
+        con_ndwi = np.isfinite(ndwi)
+        carbono = verra.calcular_carbono_array(ndvi, tipo_ecosistema, precipitacion)
+        productividad, tasa = forrajero.productividad_array(ndvi, sistema_forrajero)
+        totales['area_ha'] += float(area.sum())
+        totales['pixeles'] += len(ndvi)
+        totales['carbono_ton'] += float((carbono * area).sum())
+        totales['ndvi'] += float((ndvi * area).sum())
+        totales['ndwi'] += float((ndwi[con_ndwi] * area[con_ndwi]).sum())
+        totales['area_ndwi_ha'] += float(area[con_ndwi].sum())
+        totales['forraje_kg_ms'] += float((productividad * area).sum())
+        totales['crecimiento_kg_dia'] += float((tasa * area).sum())
+        x, y = transformador.transform(bloque['x'], bloque['y'])
+        superficie.agregar_pixeles(x, y, {'productividad_kg_ms_ha': productividad, 'carbono_ton_ha': carbono, 'ndvi': ndvi}, area)
+    superficie.cerrar_pixeles()
+    if totales['area_ha'] > 0:
+        totales['ndvi'] /= totales['area_ha']
+    # Sin banda SWIR no hay NDWI por píxel
+    totales['ndwi'] = totales['ndwi'] / totales['area_ndwi_ha'] if totales['area_ndwi_ha'] > 0 else None
+    return totales
+
+def ejecutar_analisis_completo(gdf, tipo_ecosistema, num_puntos, usar_gee=False, replicas_incertidumbre=0, serie_temporal=False,
+                               raster_local=None, cobertura_total=False):
     try:
-        area_total = calcular_superficie(gdf)
-        poligono = gdf.geometry.iloc[0]
-        bounds = poligono.bounds
+        # Área, límites, geometría preparada y proyección del lote calculados una sola vez
+        parcela = parcela_de(gdf)
+        area_total = parcela.area_ha
+        poligono = parcela.geometria
+        bounds = parcela.bounds
 
         clima = ConectorClimaticoTropical()
         verra = MetodologiaVerra()
@@ -1983,69 +2563,212 @@ def ejecutar_analisis_completo(gdf, tipo_ecosistema, num_puntos, usar_gee=False)
         ndwi_promedio = 0
         area_por_punto = max(area_total / num_puntos, 0.1)
 
-        puntos_generados = 0
         max_intentos = num_puntos * 10
-
-        while puntos_generados < num_puntos and len(puntos_carbono) < max_intentos:
+        coordenadas = []
+        intentos = 0
+        while len(coordenadas) < num_puntos and intentos < max_intentos:
+            intentos += 1
             lat = bounds[1] + random.random() * (bounds[3] - bounds[1])
             lon = bounds[0] + random.random() * (bounds[2] - bounds[0])
-            point = Point(lon, lat)
-
-            if poligono.contains(point):
-                datos_clima = clima.obtener_datos_climaticos(lat, lon)
-                ndvi = 0.5 + random.uniform(-0.2, 0.3)
-                base_ndwi = 0.1
-                if datos_clima['precipitacion'] > 2000:
-                    base_ndwi += 0.3
-                elif datos_clima['precipitacion'] < 800:
-                    base_ndwi -= 0.2
-                ndwi = base_ndwi + random.uniform(-0.2, 0.2)
-                ndwi = max(-0.5, min(0.8, ndwi))
-                ndre = min(1.0, max(-1.0, ndvi * 0.95 + random.uniform(-0.05, 0.1)))
-                msavi = min(1.0, max(0.0, ndvi * 0.85 + random.uniform(-0.1, 0.05)))
-                evi = min(1.0, max(0.0, ndvi * 1.2 + random.uniform(-0.1, 0.1)))
-
-                carbono_info = verra.calcular_carbono_hectarea(ndvi, tipo_ecosistema, datos_clima['precipitacion'])
-                biodiv_info = biodiversidad.calcular_shannon(ndvi, tipo_ecosistema, area_por_punto, datos_clima['precipitacion'])
-                forraje_info = forrajero.estimar_disponibilidad_forrajera(ndvi, sistema_forrajero, area_por_punto)
-
-                carbono_total += carbono_info['carbono_total_ton_ha'] * area_por_punto
-                co2_total += carbono_info['co2_equivalente_ton_ha'] * area_por_punto
-                shannon_promedio += biodiv_info['indice_shannon']
-                ndvi_promedio += ndvi
-                ndwi_promedio += ndwi
-
-                puntos_carbono.append({'lat': lat, 'lon': lon, 'carbono_ton_ha': carbono_info['carbono_total_ton_ha'], 'ndvi': ndvi, 'precipitacion': datos_clima['precipitacion']})
-                biodiv_info['lat'] = lat
-                biodiv_info['lon'] = lon
-                puntos_biodiversidad.append(biodiv_info)
-                puntos_ndvi.append({'lat': lat, 'lon': lon, 'ndvi': ndvi})
-                puntos_ndwi.append({'lat': lat, 'lon': lon, 'ndwi': ndwi})
-                puntos_ndre.append({'lat': lat, 'lon': lon, 'ndre': ndre})
-                puntos_msavi.append({'lat': lat, 'lon': lon, 'msavi': msavi})
-                puntos_evi.append({'lat': lat, 'lon': lon, 'evi': evi})
-                puntos_forraje.append({'lat': lat, 'lon': lon, 'productividad_kg_ms_ha': forraje_info['productividad_kg_ms_ha']})
-
-                puntos_generados += 1
+            if poligono.contains(Point(lon, lat)):
+                coordenadas.append((lon, lat))
+
+        indices_reales = None
+        metricas_gee = None
+        estadisticas_raster = None
+        raster = None
+        fuente_indices = 'simulado'
+        # Raster propio (dron / Sentinel-2 descargado): lectura por ventanas solo sobre el lote
+        if raster_local and coordenadas:
+            try:
+                raster = RasterMultiespectral(raster_local)
+                extraido = raster.extraer(poligono, [c[0] for c in coordenadas], [c[1] for c in coordenadas])
+                if np.isfinite(extraido['valores']['NDVI']).any():
+                    indices_reales = extraido['valores']
+                    estadisticas_raster = extraido['estadisticas']
+                    fuente_indices = 'GeoTIFF local'
+                else:
+                    raster = None
+                    st.warning("⚠️ El raster no tiene píxeles válidos en los puntos del lote, se usan valores simulados")
+            except Exception as e:
+                raster = None
+                st.warning(f"⚠️ No se pudo leer el raster local, se usan valores simulados: {str(e)}")
+
+        # Índices reales: un compuesto Sentinel-2 y una extracción por lotes para todos los puntos
+        if indices_reales is None and usar_gee and GEE_AVAILABLE and coordenadas:
+            try:
+                extractor = ExtractorIndicesGEE(ee)
+                fecha_inicio, fecha_fin = extractor.ventana()
+                cache = CacheIndicesSatelitales()
+                clave_cache = cache.clave(geometria=hash_geometria(poligono), fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                                          num_puntos=len(coordenadas), **extractor.parametros())
+                guardado = cache.obtener(clave_cache)
+                if guardado is not None:
+                    # Mismo lote y semana: se reutilizan los puntos y sus índices
+                    coordenadas = list(zip(guardado['lon'].tolist(), guardado['lat'].tolist()))
+                    indices_reales = {k: guardado[k] for k in INDICES_ESPECTRALES}
+                    fuente_indices = 'Sentinel-2 (GEE, caché local)'
+                else:
+                    lons = [c[0] for c in coordenadas]
+                    lats = [c[1] for c in coordenadas]
+                    ejecutor = EjecutorGEE(proyecto=GEE_PROYECTO)
+                    indices_reales, lotes_fallidos = extractor.extraer(lons, lats, poligono.__geo_interface__, fecha_fin,
+                                                                        ejecutor=ejecutor)
+                    metricas_gee = ejecutor.metricas()
+                    if lotes_fallidos:
+                        # Resultado parcial: no se guarda, así la próxima corrida vuelve a pedir los lotes que faltaron
+                        st.warning(f"⚠️ {lotes_fallidos} lote(s) de puntos no se pudieron obtener de GEE; "
+                                   "esos puntos usan valores simulados y el resultado no se guarda en caché.")
+                        fuente_indices = 'Sentinel-2 (GEE, parcial)'
+                    else:
+                        cache.guardar(clave_cache, dict(indices_reales, lon=lons, lat=lats),
+                                      descripcion={'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin, **extractor.parametros()})
+                        fuente_indices = 'Sentinel-2 (GEE)'
+            except Exception as e:
+                if es_error_credenciales(e):
+                    sesion_gee().invalidar(e)
+                st.warning(f"⚠️ No se pudieron obtener índices de GEE, se usan valores simulados: {str(e)}")
+
+        # Serie temporal por escena: solo se piden a GEE las fechas recientes, solapadas unos días con el historial local
+        serie_indices = None
+        if serie_temporal:
+            historial = HistorialIndices()
+            id_lote = hash_geometria(poligono)
+            if inicializar_gee():
+                try:
+                    serie_indices, nuevas = actualizar_historial(
+                        ExtractorIndicesGEE(ee), historial, poligono, id_lote,
+                        ejecutor=EjecutorGEE(proyecto=GEE_PROYECTO))
+                    st.info(f"🛰️ Serie temporal: {nuevas} fecha(s) nueva(s), {len(serie_indices)} en el historial.")
+                except Exception as e:
+                    if es_error_credenciales(e):
+                        sesion_gee().invalidar(e)
+                    st.warning(f"⚠️ No se pudo actualizar la serie temporal desde GEE: {str(e)}")
+            if serie_indices is None:
+                serie_indices = historial.leer(id_lote)
+
+        puntos_generados = 0
+        for i, (lon, lat) in enumerate(coordenadas):
+            datos_clima = clima.obtener_datos_climaticos(lat, lon)
+            ndvi = 0.5 + random.uniform(-0.2, 0.3)
+            base_ndwi = 0.1
+            if datos_clima['precipitacion'] > 2000:
+                base_ndwi += 0.3
+            elif datos_clima['precipitacion'] < 800:
+                base_ndwi -= 0.2
+            ndwi = base_ndwi + random.uniform(-0.2, 0.2)
+            ndwi = max(-0.5, min(0.8, ndwi))
+            ndre = min(1.0, max(-1.0, ndvi * 0.95 + random.uniform(-0.05, 0.1)))
+            msavi = min(1.0, max(0.0, ndvi * 0.85 + random.uniform(-0.1, 0.05)))
+            evi = min(1.0, max(0.0, ndvi * 1.2 + random.uniform(-0.1, 0.1)))
+            if indices_reales is not None and np.isfinite(indices_reales['NDVI'][i]):
+                # Un índice sin dato (p. ej. NDWI en cámaras sin SWIR) conserva el valor estimado
+                simulados = dict(zip(INDICES_ESPECTRALES, (ndvi, ndwi, ndre, msavi, evi)))
+                ndvi, ndwi, ndre, msavi, evi = (float(indices_reales[k][i]) if np.isfinite(indices_reales[k][i]) else simulados[k]
+                                                for k in INDICES_ESPECTRALES)
+
+            carbono_info = verra.calcular_carbono_hectarea(ndvi, tipo_ecosistema, datos_clima['precipitacion'])
+            biodiv_info = biodiversidad.calcular_shannon(ndvi, tipo_ecosistema, area_por_punto, datos_clima['precipitacion'])
+            forraje_info = forrajero.estimar_disponibilidad_forrajera(ndvi, sistema_forrajero, area_por_punto)
+
+            carbono_total += carbono_info['carbono_total_ton_ha'] * area_por_punto
+            co2_total += carbono_info['co2_equivalente_ton_ha'] * area_por_punto
+            shannon_promedio += biodiv_info['indice_shannon']
+            ndvi_promedio += ndvi
+            ndwi_promedio += ndwi
+
+            puntos_carbono.append({'lat': lat, 'lon': lon, 'carbono_ton_ha': carbono_info['carbono_total_ton_ha'], 'ndvi': ndvi, 'precipitacion': datos_clima['precipitacion']})
+            biodiv_info['lat'] = lat
+            biodiv_info['lon'] = lon
+            puntos_biodiversidad.append(biodiv_info)
+            puntos_ndvi.append({'lat': lat, 'lon': lon, 'ndvi': ndvi})
+            puntos_ndwi.append({'lat': lat, 'lon': lon, 'ndwi': ndwi})
+            puntos_ndre.append({'lat': lat, 'lon': lon, 'ndre': ndre})
+            puntos_msavi.append({'lat': lat, 'lon': lon, 'msavi': msavi})
+            puntos_evi.append({'lat': lat, 'lon': lon, 'evi': evi})
+            puntos_forraje.append({'lat': lat, 'lon': lon, 'productividad_kg_ms_ha': forraje_info['productividad_kg_ms_ha']})
+
+            puntos_generados += 1
 
         if puntos_generados > 0:
             shannon_promedio /= puntos_generados
             ndvi_promedio /= puntos_generados
             ndwi_promedio /= puntos_generados
 
+        # Cobertura total: modelos aplicados a cada píxel del raster; la superficie sale de los píxeles, sin interpolar
+        pixeles = None
+        area_carbono = area_total
+        if cobertura_total and raster is not None:
+            lado_m = raster.resolucion_m()
+            superficie = SuperficieInterpolada(poligono, parcela.crs_metrico, int(min(40000, max(area_total * 10000 / lado_m ** 2, 1))),
+                                               poligono_metrico=parcela.geometria_metrica)
+            centro = parcela.centroide
+            pixeles = analizar_pixeles(raster, poligono, superficie, tipo_ecosistema, sistema_forrajero,
+                                       clima.obtener_datos_climaticos(centro.y, centro.x)['precipitacion'], verra, forrajero)
+            if pixeles['pixeles'] == 0:
+                pixeles = None
+            else:
+                area_carbono = pixeles['area_ha']
+                carbono_total = pixeles['carbono_ton']
+                co2_total = carbono_total * verra.factores['ratio_co2']
+                ndvi_promedio = pixeles['ndvi']
+                if pixeles['ndwi'] is not None:
+                    ndwi_promedio = pixeles['ndwi']
+
         carbono_promedio = verra.calcular_carbono_hectarea(ndvi_promedio, tipo_ecosistema, 1500)
 
         # Análisis forrajero
-        disponibilidad_forrajera = forrajero.estimar_disponibilidad_forrajera(ndvi_promedio, sistema_forrajero, area_total)
+        if pixeles is not None:
+            params_forraje = forrajero.parametros_forrajeros.get(sistema_forrajero, forrajero.parametros_forrajeros['pastizal_natural'])
+            disponibilidad_forrajera = {
+                'productividad_kg_ms_ha': round(pixeles['forraje_kg_ms'] / pixeles['area_ha'], 2),
+                'disponibilidad_total_kg_ms': round(pixeles['forraje_kg_ms'], 2),
+                'forraje_aprovechable_kg_ms': round(pixeles['forraje_kg_ms'] * params_forraje['eficiencia_aprovechamiento'], 2),
+                'tasa_crecimiento_diario_kg': round(pixeles['crecimiento_kg_dia'], 2),
+                'categoria_productividad': forrajero._categoria_productividad(ndvi_promedio),
+                'densidad_forraje_kg_m3': params_forraje['densidad_forraje']
+            }
+        else:
+            disponibilidad_forrajera = forrajero.estimar_disponibilidad_forrajera(ndvi_promedio, sistema_forrajero, area_total)
         equivalentes_vaca = forrajero.calcular_equivalentes_vaca(disponibilidad_forrajera['forraje_aprovechable_kg_ms'], dias_permanencia=30)
-        sublotes = forrajero.dividir_lote_en_sublotes(area_total, disponibilidad_forrajera['productividad_kg_ms_ha'], heterogeneidad=0.3)
-        gdf_cuadricula = dividir_poligono_en_cuadricula(poligono, puntos_forraje, n_celdas=200)
+        incertidumbre = None
+        if replicas_incertidumbre and puntos_ndvi:
+            incertidumbre = forrajero.simular_incertidumbre(
+                [p['ndvi'] for p in puntos_ndvi], sistema_forrajero, area_total,
+                num_ev=max(equivalentes_vaca['ev_recomendado'], 1.0), replicas=replicas_incertidumbre)
+        # Sublotes con geometría delineados sobre la superficie interpolada (o de píxeles)
+        if pixeles is None:
+            superficie = SuperficieInterpolada(poligono, parcela.crs_metrico, poligono_metrico=parcela.geometria_metrica)
+            superficie.interpolar_resultados({
+                'puntos_forraje': puntos_forraje,
+                'puntos_carbono': puntos_carbono,
+                'puntos_ndvi': puntos_ndvi
+            })
+        num_sublotes = forrajero.numero_sublotes(area_total)
+        gdf_sublotes, sublotes = forrajero.delinear_sublotes(superficie, num_sublotes, sistema_forrajero)
+        if not sublotes:
+            sublotes = forrajero.dividir_lote_en_sublotes(area_total, disponibilidad_forrajera['productividad_kg_ms_ha'], heterogeneidad=0.3)
+        recomendaciones_rotacion = forrajero.generar_recomendaciones_rotacion(sublotes, max(equivalentes_vaca['ev_recomendado'], 1.0))
+        # Zonas de manejo hexagonales con niveles anidados (el nivel 0 es el más fino)
+        malla_hexagonal = MallaHexagonal(poligono, parcela.crs_metrico, celdas_objetivo=400, niveles=3,
+                                         poligono_metrico=parcela.geometria_metrica)
+        if pixeles is not None and 'productividad_kg_ms_ha' in superficie.valores:
+            celdas = gpd.GeoSeries.from_xy(superficie.cx, superficie.cy, crs=superficie.crs_metrico).to_crs('EPSG:4326')
+            malla_hexagonal.agregar(celdas.x.to_numpy(), celdas.y.to_numpy(),
+                                    {'productividad_kg_ms_ha': superficie.valores['productividad_kg_ms_ha']})
+        else:
+            malla_hexagonal.agregar(
+                [p['lon'] for p in puntos_forraje],
+                [p['lat'] for p in puntos_forraje],
+                {'productividad_kg_ms_ha': [p['productividad_kg_ms_ha'] for p in puntos_forraje]}
+            )
+        gdf_cuadricula = malla_hexagonal.gdf_nivel(0)
 
         resultados = {
             'area_total_ha': area_total,
             'carbono_total_ton': round(carbono_total, 2),
             'co2_total_ton': round(co2_total, 2),
-            'carbono_promedio_ha': round(carbono_total / area_total, 2) if area_total > 0 else 0,
+            'carbono_promedio_ha': round(carbono_total / area_carbono, 2) if area_carbono > 0 else 0,
             'shannon_promedio': round(shannon_promedio, 3),
             'ndvi_promedio': round(ndvi_promedio, 3),
             'ndwi_promedio': round(ndwi_promedio, 3),
@@ -2058,15 +2781,27 @@ def ejecutar_analisis_completo(gdf, tipo_ecosistema, num_puntos, usar_gee=False)
             'puntos_evi': puntos_evi,
             'puntos_forraje': puntos_forraje,
             'gdf_cuadricula': gdf_cuadricula,
+            'malla_hexagonal': malla_hexagonal,
+            'superficie': superficie,
             'tipo_ecosistema': tipo_ecosistema,
             'num_puntos': puntos_generados,
             'desglose_promedio': carbono_promedio['desglose'] if carbono_promedio else {},
             'usar_gee': usar_gee,
+            'fuente_indices': fuente_indices,
+            'metricas_gee': metricas_gee,
+            'estadisticas_raster': estadisticas_raster,
+            'cobertura_total': {'pixeles': pixeles['pixeles'], 'area_ha': round(pixeles['area_ha'], 2)} if pixeles else None,
+            'serie_indices': serie_indices,
             'analisis_forrajero': {
                 'sistema_forrajero': sistema_forrajero,
                 'disponibilidad_forrajera': disponibilidad_forrajera,
                 'equivalentes_vaca': equivalentes_vaca,
                 'sublotes': sublotes,
+                'gdf_sublotes': gdf_sublotes,
+                'num_sublotes': num_sublotes,
+                'origen_sublotes': 'delineados',
+                'recomendaciones_rotacion': recomendaciones_rotacion,
+                'incertidumbre': incertidumbre,
                 'forrajero': forrajero
             }
         }
@@ -2157,6 +2892,38 @@ def mostrar_dashboard():
         st.metric("💧 NDWI promedio", f"{res.get('ndwi_promedio', 0):.3f}")
     with col3:
         st.metric("🎯 Puntos analizados", res.get('num_puntos', 0))
+    st.caption(f"Índices espectrales: {res.get('fuente_indices', 'simulado')}")
+    if res.get('cobertura_total'):
+        st.caption(f"Análisis píxel a píxel: {res['cobertura_total']['pixeles']:,} píxeles "
+                   f"({res['cobertura_total']['area_ha']:,.1f} ha); totales de carbono y forraje sin muestreo")
+    if res.get('estadisticas_raster'):
+        with st.expander("🗺️ Índices del GeoTIFF sobre todo el lote"):
+            st.dataframe(pd.DataFrame([
+                {'Índice': indice, 'Media': e['media'], 'Desvío': e['desv'], 'Píxeles válidos': e['pixeles']}
+                for indice, e in res['estadisticas_raster'].items()
+            ]), hide_index=True, use_container_width=True)
+    serie_indices = res.get('serie_indices')
+    if serie_indices is not None:
+        st.subheader("🛰️ Serie Temporal de Índices")
+        if serie_indices.empty:
+            st.info("Todavía no hay escenas guardadas para este lote. Conecte GEE para descargar el historial.")
+        else:
+            st.plotly_chart(Visualizaciones.crear_grafico_serie_indices(serie_indices), use_container_width=True)
+    if res.get('metricas_gee'):
+        with st.expander("🛰️ Métricas de Earth Engine"):
+            metricas = res['metricas_gee']
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Solicitudes", metricas['intentos'], f"{metricas['reintentos']} reintentos", delta_color="off")
+            with col2:
+                st.metric("Lotes OK / fallidos", f"{metricas['exitosos']} / {metricas['fallidos'] + metricas['vencidos']}")
+            with col3:
+                st.metric("Errores de cuota", metricas['errores_cuota'])
+            with col4:
+                st.metric("Latencia media", f"{metricas['latencia_media_s']:.2f} s")
+            st.caption(f"Espera por límite de tasa: {metricas['espera_limitador_s']:.1f} s · "
+                       f"espera por reintentos: {metricas['espera_reintentos_s']:.1f} s · "
+                       f"máximo en paralelo: {metricas['max_en_curso']}")
 
     if 'analisis_forrajero' in res:
         st.subheader("🐮 Métricas Forrajeras")
@@ -2167,6 +2934,20 @@ def mostrar_dashboard():
             st.metric("EV Recomendados", f"{res['analisis_forrajero']['equivalentes_vaca']['ev_recomendado']:.1f}")
         with col_f3:
             st.metric("Sublotes", len(res['analisis_forrajero']['sublotes']))
+        incertidumbre = res['analisis_forrajero'].get('incertidumbre')
+        if incertidumbre:
+            ev_b = incertidumbre['ev_recomendado']
+            dias_b = incertidumbre['dias_recomendados']
+            col_i1, col_i2, col_i3 = st.columns(3)
+            with col_i1:
+                st.metric("EV recomendado (P50)", f"{ev_b['p50']:.1f}", f"P10 {ev_b['p10']:.1f} – P90 {ev_b['p90']:.1f}", delta_color="off")
+            with col_i2:
+                st.metric(f"Días de pastoreo con {incertidumbre['num_ev']:.0f} EV (P50)", f"{dias_b['p50']:.0f}",
+                          f"P10 {dias_b['p10']:.0f} – P90 {dias_b['p90']:.0f}", delta_color="off")
+            with col_i3:
+                prod_b = incertidumbre['productividad_kg_ms_ha']
+                st.metric("Productividad (P50)", f"{prod_b['p50']:,.0f}", f"P10 {prod_b['p10']:,.0f} – P90 {prod_b['p90']:,.0f}", delta_color="off")
+            st.caption(f"Bandas de {incertidumbre['replicas']:,} réplicas Monte Carlo (NDVI remuestreado y ±10% de productividad).")
 
     col1, col2 = st.columns(2)
     with col1:
@@ -2252,11 +3033,141 @@ def mostrar_analisis_forrajero():
     with col3:
         st.metric("EV recomendado", f"{ev['ev_recomendado']:.1f}")
 
+    incertidumbre = forrajero_data.get('incertidumbre')
+    if incertidumbre:
+        st.subheader("🎲 Bandas de Incertidumbre")
+        st.dataframe(pd.DataFrame([
+            {'Métrica': nombre, 'P10': incertidumbre[clave]['p10'], 'P50': incertidumbre[clave]['p50'], 'P90': incertidumbre[clave]['p90']}
+            for clave, nombre in [
+                ('productividad_kg_ms_ha', 'Productividad (kg MS/ha)'),
+                ('forraje_aprovechable_kg_ms', 'Forraje aprovechable (kg MS)'),
+                ('ev_recomendado', 'EV recomendado'),
+                ('dias_recomendados', f"Días de pastoreo ({incertidumbre['num_ev']:.0f} EV)")
+            ]
+        ]), use_container_width=True, hide_index=True)
+
+    st.subheader("✂️ Delineación de Sublotes")
+    col_n, col_archivo = st.columns([1, 2])
+    with col_n:
+        num_sublotes = st.slider("N sublotes", min_value=2, max_value=20, value=int(forrajero_data.get('num_sublotes', 4)), key='slider_num_sublotes')
+    with col_archivo:
+        archivo_sublotes = st.file_uploader("Cargar sublotes propios (KML, GeoJSON, SHP, KMZ, GeoParquet, FlatGeobuf, GeoPackage)",
+                                            type=['kml', 'geojson', 'zip', 'kmz'] + [f.lstrip('.') for f in FORMATOS_CATASTRO], key='archivo_sublotes')
+    if res.get('superficie') is not None:
+        forrajero = forrajero_data['forrajero']
+        nuevos = None
+        if archivo_sublotes:
+            zonas = cargar_sublotes(archivo_sublotes, st.session_state.poligono_data.geometry.iloc[0])
+            if zonas is not None:
+                nuevos = forrajero.calcular_sublotes_zonales(res['superficie'], zonas, forrajero_data['sistema_forrajero'])
+                origen = f"archivo: {archivo_sublotes.name}"
+        elif (num_sublotes, 'delineados') != (forrajero_data.get('num_sublotes'), forrajero_data.get('origen_sublotes')):
+            nuevos = forrajero.delinear_sublotes(res['superficie'], num_sublotes, forrajero_data['sistema_forrajero'])
+            origen = 'delineados'
+        if nuevos is not None and nuevos[1]:
+            forrajero_data['gdf_sublotes'], forrajero_data['sublotes'] = nuevos
+            forrajero_data['num_sublotes'] = num_sublotes
+            forrajero_data['origen_sublotes'] = origen
+            forrajero_data['recomendaciones_rotacion'] = forrajero.generar_recomendaciones_rotacion(forrajero_data['sublotes'], max(ev['ev_recomendado'], 1.0))
+
     if 'sublotes' in forrajero_data and forrajero_data['sublotes']:
         st.subheader("📋 Sublotes")
         df_sub = pd.DataFrame(forrajero_data['sublotes'])
         st.dataframe(df_sub, use_container_width=True, hide_index=True)
 
+    if forrajero_data.get('recomendaciones_rotacion'):
+        rotacion = forrajero_data['recomendaciones_rotacion']
+        st.subheader("🔄 Plan de Rotación")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("EV considerados", f"{rotacion['num_ev']:.1f}")
+        with col2:
+            st.metric("Ciclo promedio", f"{rotacion['dias_ciclo_promedio']:.1f} días")
+        with col3:
+            st.metric("Intensidad", rotacion['intensidad_rotacion'].split(' - ')[0])
+        st.dataframe(pd.DataFrame(rotacion['plan_rotacion']), use_container_width=True, hide_index=True)
+
+    if forrajero_data.get('sublotes'):
+        st.subheader("🔮 Escenarios de Carga")
+        ev_base = max(ev['ev_recomendado'], 1.0)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            rango_ev = st.slider("Rango de EV", min_value=1, max_value=int(max(1000, ev_base * 4)),
+                                 value=(max(1, int(ev_base * 0.5)), max(2, int(ev_base * 2))), key='rango_ev_escenarios')
+        with col2:
+            factores = st.multiselect("Factor de descanso (× días de uso)", [2, 3, 4, 5], default=[3], key='factores_descanso')
+        with col3:
+            minimos = st.multiselect("Descanso mínimo (días)", [14, 21, 30, 45, 60], default=[21], key='descansos_minimos')
+        valores_ev = np.unique(np.linspace(rango_ev[0], rango_ev[1], 25).round())
+        df_escenarios = forrajero_data['forrajero'].barrer_escenarios_rotacion(
+            forrajero_data['sublotes'], valores_ev, factores or [3], minimos or [21])
+        st.plotly_chart(Visualizaciones.crear_grafico_escenarios_rotacion(df_escenarios), use_container_width=True)
+        st.dataframe(df_escenarios, use_container_width=True, hide_index=True)
+
+    if forrajero_data.get('sublotes'):
+        st.subheader("📉 Balance Forrajero Diario")
+        ev_base = max(ev['ev_recomendado'], 1.0)
+        col1, col2 = st.columns(2)
+        with col1:
+            carga_balance = st.slider("Carga (EV, pastoreo continuo)", min_value=1, max_value=int(max(1000, ev_base * 4)),
+                                      value=max(1, int(ev_base)), key='carga_balance')
+        with col2:
+            remanente_balance = st.slider("Remanente (%)", min_value=0, max_value=60, value=20, step=5, key='remanente_balance')
+        latitud = st.session_state.poligono_data.geometry.iloc[0].centroid.y
+        balance = forrajero_data['forrajero'].simular_balance_forrajero(
+            forrajero_data['sublotes'], forrajero_data['sistema_forrajero'], carga_balance,
+            fraccion_remanente=remanente_balance / 100, latitud=latitud)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Días con déficit en el lote", balance['dias_deficit_lote'])
+        with col2:
+            st.metric("Déficit anual", f"{balance['deficit_total_kg'] / 1000:,.1f} ton MS")
+        with col3:
+            st.metric("Sublotes que se agotan", int(balance['sublotes']['fecha_agotamiento'].notna().sum()))
+        st.plotly_chart(Visualizaciones.crear_grafico_balance_forrajero(balance['diario']), use_container_width=True)
+        st.dataframe(balance['sublotes'], use_container_width=True, hide_index=True)
+        if not balance['ventanas_deficit'].empty:
+            st.markdown("**Ventanas de déficit**")
+            st.dataframe(balance['ventanas_deficit'], use_container_width=True, hide_index=True)
+
+    if forrajero_data.get('sublotes'):
+        with st.expander("📅 Calendario de Pastoreo (365 días)"):
+            ev_base = max(ev['ev_recomendado'], 1.0)
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                rodeos_txt = st.text_input("EV por rodeo (separados por coma)", value=f"{ev_base:.0f}", key='rodeos_calendario')
+            with col2:
+                descanso_cal = st.number_input("Descanso mínimo (días)", min_value=1, max_value=180, value=21, step=1, key='descanso_calendario')
+            with col3:
+                ocupacion_cal = st.number_input("Ocupación máxima (días)", min_value=1, max_value=60, value=7, step=1, key='ocupacion_calendario')
+            with col4:
+                remanente_cal = st.slider("Remanente (%)", min_value=0, max_value=60, value=20, step=5, key='remanente_calendario')
+            if st.button("Generar calendario"):
+                try:
+                    rodeos_ev = [float(v) for v in rodeos_txt.replace(';', ',').split(',') if v.strip()]
+                except ValueError:
+                    rodeos_ev = []
+                if not rodeos_ev or min(rodeos_ev) <= 0:
+                    st.error("Ingrese al menos un rodeo con EV mayor a cero.")
+                else:
+                    forrajero_data['calendario'] = forrajero_data['forrajero'].planificar_temporada(
+                        forrajero_data['sublotes'], rodeos_ev, forrajero_data['sistema_forrajero'],
+                        descanso_minimo=descanso_cal, ocupacion_maxima=ocupacion_cal, fraccion_remanente=remanente_cal / 100,
+                        latitud=st.session_state.poligono_data.geometry.iloc[0].centroid.y)
+            calendario = forrajero_data.get('calendario')
+            if calendario:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Utilización del forraje", f"{calendario['utilizacion_pct']:.1f}%")
+                with col2:
+                    st.metric("Demanda cubierta", f"{calendario['cobertura_demanda_pct']:.1f}%")
+                with col3:
+                    st.metric("Días con déficit (máx. por rodeo)", max(calendario['dias_con_deficit']))
+                st.plotly_chart(Visualizaciones.crear_grafico_calendario_pastoreo(calendario['movimientos']), use_container_width=True)
+                st.dataframe(calendario['movimientos'], use_container_width=True, hide_index=True)
+                st.download_button("⬇️ Descargar calendario diario (CSV)", calendario['calendario'].to_csv(index=False),
+                                   f"calendario_pastoreo_{datetime.now().strftime('%Y%m%d')}.csv", "text/csv")
+
     # Gráfico forrajero
     fig_forrajero = Visualizaciones.crear_grafico_forrajero(disp, ev)
     if fig_forrajero:
@@ -2265,46 +3176,109 @@ def mostrar_analisis_forrajero():
     # Mapa de sublotes (coroplético)
     if 'gdf_cuadricula' in res and not res['gdf_cuadricula'].empty:
         st.subheader("🗺️ Mapa de Productividad por Sublotes")
-        sistema = SistemaMapas()
+        gdf_zonas = res['gdf_cuadricula']
+        malla = res.get('malla_hexagonal')
+        if malla is not None:
+            etiquetas = malla.etiquetas_niveles()
+            etiqueta = st.select_slider("Resolución de zonas de manejo", options=etiquetas, value=etiquetas[0])
+            gdf_zonas = malla.gdf_nivel(etiquetas.index(etiqueta))
         try:
             bounds = st.session_state.poligono_data.total_bounds
             centro = [(bounds[1] + bounds[3]) / 2, (bounds[0] + bounds[2]) / 2]
             m = folium.Map(location=centro, zoom_start=12, tiles='OpenStreetMap')
-            min_prod = res['gdf_cuadricula']['productividad_kg_ms_ha'].min()
-            max_prod = res['gdf_cuadricula']['productividad_kg_ms_ha'].max()
+            min_prod = gdf_zonas['productividad_kg_ms_ha'].min()
+            max_prod = gdf_zonas['productividad_kg_ms_ha'].max()
             colormap = LinearColormap(colors=['#8B4513', '#CD853F', '#F4A460', '#9ACD32', '#32CD32', '#006400'], vmin=min_prod, vmax=max_prod)
             colormap.caption = 'Productividad Forrajera (kg MS/ha)'
+            if 'n_muestras' in gdf_zonas.columns:
+                campos = ['productividad_kg_ms_ha', 'productividad_kg_ms_ha_desv', 'n_muestras', 'area_ha']
+                alias = ['Productividad:', 'Desvío:', 'Muestras:', 'Área (ha):']
+            else:
+                campos = ['productividad_kg_ms_ha']
+                alias = ['Productividad:']
             folium.GeoJson(
-                res['gdf_cuadricula'],
+                gdf_zonas,
                 style_function=lambda feature: {
                     'fillColor': colormap(feature['properties']['productividad_kg_ms_ha']),
                     'color': 'black',
                     'weight': 0.5,
                     'fillOpacity': 0.7
                 },
-                tooltip=folium.GeoJsonTooltip(fields=['productividad_kg_ms_ha'], aliases=['Productividad:'], localize=True)
+                tooltip=folium.GeoJsonTooltip(fields=campos, aliases=alias, localize=True)
             ).add_to(m)
             folium.GeoJson(
                 st.session_state.poligono_data.geometry.iloc[0],
                 style_function=lambda x: {'fillColor': 'transparent', 'color': '#1d4ed8', 'weight': 3, 'dashArray': '5, 5'}
             ).add_to(m)
+            gdf_sublotes = forrajero_data.get('gdf_sublotes')
+            if gdf_sublotes is not None and not gdf_sublotes.empty and 'disponibilidad_kg_ms_ha' in gdf_sublotes.columns:
+                folium.GeoJson(
+                    gdf_sublotes[['sublote_id', 'area_ha', 'disponibilidad_kg_ms_ha', 'geometry']],
+                    name='Sublotes',
+                    style_function=lambda x: {'fillColor': 'transparent', 'color': '#111827', 'weight': 2.5},
+                    tooltip=folium.GeoJsonTooltip(fields=['sublote_id', 'area_ha', 'disponibilidad_kg_ms_ha'],
+                                                  aliases=['Sublote:', 'Área (ha):', 'Productividad:'], localize=True)
+                ).add_to(m)
             colormap.add_to(m)
             folium_static(m, width=1000, height=600)
         except Exception as e:
             st.warning(f"No se pudo generar el mapa de sublotes: {str(e)}")
 
+    if forrajero_data.get('sublotes'):
+        with st.expander("🐂 Rodeo Mixto"):
+            etiquetas_categorias = {
+                'vaca_adulta': 'Vacas adultas',
+                'novillo': 'Novillos',
+                'ternero': 'Terneros',
+                'vaca_secas': 'Vacas secas',
+                'vaca_lactancia': 'Vacas en lactancia'
+            }
+            cabezas = {}
+            columnas = st.columns(len(etiquetas_categorias) + 1)
+            for col, (categoria, etiqueta) in zip(columnas, etiquetas_categorias.items()):
+                with col:
+                    cabezas[categoria] = st.number_input(etiqueta, min_value=0, max_value=100000, value=0, step=1, key=f'cabezas_{categoria}')
+            with columnas[-1]:
+                dias_mixto = st.number_input("Días de permanencia", min_value=1, max_value=365, value=30, step=1, key='dias_rodeo_mixto')
+            rodeo = forrajero_data['forrajero'].calcular_rodeo_mixto(forrajero_data['sublotes'], cabezas, dias_mixto)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("EV equivalentes", f"{rodeo['ev_equivalentes']:.1f}")
+            with col2:
+                st.metric("Consumo diario", f"{rodeo['consumo_diario_kg']:,.0f} kg MS")
+            with col3:
+                st.metric("Días en todo el lote", f"{rodeo['dias_lote']:.1f}" if rodeo['dias_lote'] is not None else "—")
+            if rodeo['total_cabezas'] == 0:
+                st.info("Ingrese cabezas por categoría para ver los días de pastoreo; la tabla muestra la capacidad por categoría.")
+            st.dataframe(rodeo['sublotes'], use_container_width=True, hide_index=True)
+
     # Calculadora interactiva
     with st.expander("📊 Calculadora de Equivalentes Vaca"):
-        num_ev_input = st.number_input("Número de EV disponibles:", min_value=1.0, max_value=1000.0, value=50.0, step=1.0)
-        dias_input = st.number_input("Días de permanencia deseada:", min_value=1, max_value=365, value=30, step=1)
-        if st.button("Calcular días"):
-            forrajero = forrajero_data['forrajero']
-            dias_calc = forrajero.calcular_dias_permanencia(disp['forraje_aprovechable_kg_ms'], num_ev_input)
-            st.success(f"**Resultado:** {num_ev_input:.0f} EV pueden pastar {dias_calc['dias_recomendados']} días")
-            col1, col2, col3 = st.columns(3)
-            with col1: st.metric("Días básicos", f"{dias_calc['dias_basico']:.1f}")
-            with col2: st.metric("Días ajustados", f"{dias_calc['dias_ajustado']:.1f}")
-            with col3: st.metric("Recomendados", dias_calc['dias_recomendados'])
+        calculadora_equivalentes_vaca(forrajero_data['forrajero'], disp['forraje_aprovechable_kg_ms'])
+
+@st.fragment
+def calculadora_equivalentes_vaca(forrajero, forraje_aprovechable_kg_ms):
+    """
+    Se ejecuta como fragmento: cambiar los valores solo vuelve a correr esta
+    función, no los mapas ni las tablas de la página. El gráfico trae las curvas
+    completas precalculadas y sus deslizadores responden en el navegador.
+    """
+    valores_ev = np.unique(np.linspace(1, 1000, 200).round())
+    valores_dias = np.arange(1, 366)
+    curvas = forrajero.curvas_respuesta_ev(forraje_aprovechable_kg_ms, valores_ev, valores_dias)
+    st.plotly_chart(Visualizaciones.crear_grafico_calculadora_ev(curvas), use_container_width=True)
+
+    num_ev_input = st.number_input("Número de EV disponibles:", min_value=1.0, max_value=1000.0, value=50.0, step=1.0)
+    dias_input = st.number_input("Días de permanencia deseada:", min_value=1, max_value=365, value=30, step=1)
+    exacto = forrajero.curvas_respuesta_ev(forraje_aprovechable_kg_ms, [num_ev_input], [dias_input])
+    dias_calc = exacto['dias_vs_ev'].iloc[0]
+    ev_calc = exacto['ev_vs_dias'].iloc[0]
+    st.success(f"**Resultado:** {num_ev_input:.0f} EV pueden pastar {int(dias_calc['dias_recomendados'])} días; "
+               f"para {dias_input} días se recomiendan {ev_calc['ev_recomendado']:.1f} EV")
+    col1, col2, col3 = st.columns(3)
+    with col1: st.metric("Días básicos", f"{dias_calc['dias_basico']:.1f}")
+    with col2: st.metric("Días ajustados", f"{dias_calc['dias_ajustado']:.1f}")
+    with col3: st.metric("Recomendados", int(dias_calc['dias_recomendados']))
 
 def mostrar_comparacion():
     st.header("📈 Análisis Comparativo")
@@ -2338,6 +3312,47 @@ def mostrar_comparacion():
     except Exception as e:
         st.warning(f"No se pudieron calcular correlaciones: {str(e)}")
 
+@st.cache_resource
+def cache_informes():
+    """Caché en disco de informes terminados, compartida por las sesiones (None si no hay disco escribible)."""
+    try:
+        return CacheInformes()
+    except Exception:
+        return None
+
+def boton_informe(huella, formato, opciones, etiqueta_generar, etiqueta_descargar, generar, nombre_archivo, mime,
+                  activos=None, cachear=True):
+    """
+    Botón de un formato de informe. Si ya se generó para este resultado con
+    las mismas opciones, el botón de descarga aparece directamente con los
+    bytes guardados y "Regenerar" lo vuelve a construir. No se guarda un
+    informe al que le faltan gráficos o mapas de `activos` por un fallo.
+    """
+    cache = cache_informes() if cachear else None
+    clave = CacheInformes.clave(huella, formato, **opciones)
+    datos = cache.obtener(clave) if cache is not None else None
+    descarga = st.container()
+    regenerar = datos is not None and st.button("🔄 Regenerar", key=f'regenerar_{formato}', use_container_width=True,
+                                                help="Vuelve a generar el informe sin usar la copia guardada")
+    if datos is None or regenerar:
+        if not regenerar and not st.button(etiqueta_generar, use_container_width=True):
+            return
+        generado = generar()
+        if not generado:
+            return
+        datos = generado.getvalue() if hasattr(generado, 'getvalue') else generado
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        if activos is not None and activos.fallidos:
+            st.warning("⚠️ El informe quedó sin algunos gráficos o mapas; no se guarda en caché.")
+        elif cache is not None:
+            try:
+                cache.guardar(clave, datos, formato, opciones)
+            except OSError as e:
+                st.warning(f"⚠️ No se pudo guardar el informe en caché: {str(e)}")
+    descarga.download_button(etiqueta_descargar, datos, nombre_archivo.format(datetime.now().strftime('%Y%m%d_%H%M')), mime,
+                             key=f'descarga_{formato}', use_container_width=True)
+
 def mostrar_informe():
     st.header("📥 Informe Completo")
     if st.session_state.resultados is None or st.session_state.poligono_data is None:
@@ -2346,46 +3361,42 @@ def mostrar_informe():
 
     st.markdown("### Generar informe con todos los análisis")
     sistema = SistemaMapas()
-    generador = GeneradorReportes(st.session_state.resultados, st.session_state.poligono_data, sistema)
+    escala = st.select_slider("Resolución de imágenes", options=list(ESCALAS_IMAGEN), value=2,
+                              format_func=lambda e: f"{ESCALAS_IMAGEN[e]} ({e}x)",
+                              help="Menor resolución: informes más livianos y más rápidos de generar")
+    activos = ActivosReporte(st.session_state.resultados, st.session_state.poligono_data, sistema, escala=escala)
+    generador = GeneradorReportes(st.session_state.resultados, st.session_state.poligono_data, sistema, activos)
 
     col1, col2, col3, col4 = st.columns(4)
+    mime_docx = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
     with col1:
         if REPORTPDF_AVAILABLE:
-            if st.button("📄 Generar PDF", use_container_width=True):
-                pdf = generador.generar_pdf()
-                if pdf:
-                    st.download_button("⬇️ Descargar PDF", pdf, f"informe_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf", "application/pdf")
+            boton_informe(activos.huella, 'pdf', {'escala': escala}, "📄 Generar PDF", "⬇️ Descargar PDF",
+                          generador.generar_pdf, "informe_{}.pdf", "application/pdf", activos=activos)
     with col2:
         if REPORTDOCX_AVAILABLE:
-            if st.button("📘 Generar DOCX", use_container_width=True):
-                docx = generador.generar_docx()
-                if docx:
-                    st.download_button("⬇️ Descargar DOCX", docx, f"informe_{datetime.now().strftime('%Y%m%d_%H%M')}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+            boton_informe(activos.huella, 'docx', {'escala': escala}, "📘 Generar DOCX", "⬇️ Descargar DOCX",
+                          generador.generar_docx, "informe_{}.docx", mime_docx, activos=activos)
     with col3:
         # Verificar si la IA está disponible (cliente y API key)
         if GROQ_API_KEY is not None and groq_client is not None:
-            if st.button("🤖 Generar Informe con IA (Groq)", use_container_width=True):
+            def generar_ia():
                 with st.spinner("Generando informe con IA (Groq)..."):
-                    reporte_ia = generar_reporte_ia(st.session_state.resultados, st.session_state.poligono_data, sistema)
-                    if reporte_ia:
-                        st.download_button("⬇️ Descargar Informe IA", reporte_ia, f"informe_IA_{datetime.now().strftime('%Y%m%d_%H%M')}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+                    return generar_reporte_ia(st.session_state.resultados, st.session_state.poligono_data, sistema, activos)
+            # El texto de Groq cambia (o trae un error) en cada consulta: no se guarda en caché
+            boton_informe(activos.huella, 'docx_ia', {'escala': escala}, "🤖 Generar Informe con IA (Groq)", "⬇️ Descargar Informe IA",
+                          generar_ia, "informe_IA_{}.docx", mime_docx, cachear=False)
         else:
             st.info("🤖 IA no disponible (falta API key de Groq o cliente no configurado)")
     with col4:
-        if st.button("🌍 Generar GeoJSON", use_container_width=True):
-            geojson = generador.generar_geojson()
-            if geojson:
-                st.download_button("⬇️ Descargar GeoJSON", geojson, f"area_{datetime.now().strftime('%Y%m%d_%H%M')}.geojson", "application/geo+json")
+        boton_informe(activos.huella, 'geojson', {}, "🌍 Generar GeoJSON", "⬇️ Descargar GeoJSON",
+                      generador.generar_geojson, "area_{}.geojson", "application/geo+json")
 
 # ===============================
 # MAIN
 # ===============================
 def main():
-    if 'gee_authenticated' not in st.session_state:
-        st.session_state.gee_authenticated = False
-        st.session_state.gee_project = ''
-        if GEE_AVAILABLE:
-            inicializar_gee()
+    gee_conectado = inicializar_gee()
     if 'poligono_data' not in st.session_state:
         st.session_state.poligono_data = None
     if 'resultados' not in st.session_state:
@@ -2401,18 +3412,27 @@ def main():
 
     with st.sidebar:
         st.header("📁 Carga de Datos")
-        if GEE_AVAILABLE and st.session_state.gee_authenticated:
-            st.success(f"✅ GEE Conectado")
-        uploaded_file = st.file_uploader("Cargar polígono (KML, GeoJSON, SHP, KMZ)", type=['kml', 'geojson', 'zip', 'kmz'])
+        mostrar_estado_gee()
+        uploaded_file = st.file_uploader("Cargar polígono (KML, GeoJSON, SHP, KMZ, GeoParquet, FlatGeobuf, GeoPackage)",
+                                         type=['kml', 'geojson', 'zip', 'kmz'] + [f.lstrip('.') for f in FORMATOS_CATASTRO])
         if uploaded_file:
-            with st.spinner("Procesando archivo..."):
-                gdf = cargar_archivo_parcela(uploaded_file)
+            huella = huella_archivo(uploaded_file)
+            filtros_catastro = None
+            if es_catastro(uploaded_file.name):
+                filtros_catastro = configurar_filtros_catastro(uploaded_file, huella)
+                # Cada selección del mismo catastro es una parcela distinta
+                huella = huella + json.dumps(filtros_catastro, sort_keys=True) if filtros_catastro is not None else None
+            # Solo cuando cambia el archivo: los reruns por widgets no vuelven a procesarlo ni pisan el mapa
+            if huella is not None and st.session_state.get('huella_parcela') != huella:
+                with st.spinner("Procesando archivo..."):
+                    gdf, area_ha, mapa = procesar_archivo_parcela(huella, uploaded_file, filtros_catastro)
                 if gdf is not None:
-                    st.session_state.poligono_data = gdf
-                    area_ha = calcular_superficie(gdf)
-                    st.info(f"📍 Área calculada: {area_ha:,.1f} ha")
-                    sistema = SistemaMapas()
-                    st.session_state.mapa = sistema.crear_mapa_area(gdf, zoom_auto=True)
+                    st.session_state.poligono_data = gdf.copy()
+                    st.session_state.mapa = mapa
+                    st.session_state.area_parcela_ha = area_ha
+                    st.session_state.huella_parcela = huella
+            if huella is not None and st.session_state.get('huella_parcela') == huella:
+                st.info(f"📍 Área calculada: {st.session_state.area_parcela_ha:,.1f} ha")
 
         if st.session_state.poligono_data is not None:
             st.header("⚙️ Configuración")
@@ -2424,9 +3444,32 @@ def main():
             ]
             tipo_ecosistema = st.selectbox("Tipo de ecosistema", ecosistemas)
             num_puntos = st.slider("Número de puntos de muestreo", 10, 200, 50)
+            replicas_incertidumbre = 0
+            if st.checkbox("Modo incertidumbre (Monte Carlo)", help="Calcula bandas P10/P50/P90 de EV y días de pastoreo"):
+                replicas_incertidumbre = st.select_slider("Réplicas", options=[1000, 2000, 5000, 10000, 20000], value=5000)
             usar_gee = False
-            if GEE_AVAILABLE and st.session_state.gee_authenticated:
+            if gee_conectado:
                 usar_gee = st.checkbox("Usar datos reales de GEE")
+            serie_temporal = st.checkbox("Serie temporal de índices", help="Historial por escena guardado localmente; con GEE se agregan solo las escenas nuevas")
+            raster_local = None
+            cobertura_total = False
+            if RASTERIO_AVAILABLE:
+                with st.expander("🛩️ Raster multiespectral propio (GeoTIFF)"):
+                    archivo_raster = st.file_uploader("Cargar GeoTIFF (dron o Sentinel-2)", type=['tif', 'tiff'], key='archivo_raster')
+                    directorio = directorio_rasters()
+                    ruta_raster = st.text_input("o ruta del archivo en el servidor",
+                                                help="Para archivos de varios GB: se leen solo las ventanas que cubren el lote. "
+                                                     "Relativa al directorio de rasters configurado") if directorio else None
+                    if ruta_raster:
+                        raster_local = ruta_permitida(ruta_raster, directorio)
+                        if raster_local is None:
+                            st.error("❌ Ruta no válida: debe ser un archivo dentro del directorio de rasters configurado")
+                    elif archivo_raster:
+                        raster_local = guardar_raster_local(archivo_raster)
+                    if raster_local:
+                        st.caption("Los índices del raster tienen prioridad sobre GEE y los valores simulados")
+                        cobertura_total = st.checkbox("Análisis píxel a píxel (cobertura total)", value=True,
+                                                      help="Carbono y forraje calculados en cada píxel del lote en lugar de interpolar los puntos")
             
             # Selector de modelo de IA (Groq)
             if available_models:
@@ -2442,7 +3485,8 @@ def main():
             
             if st.button("🚀 Ejecutar Análisis Completo", type="primary", use_container_width=True):
                 with st.spinner("Analizando..."):
-                    resultados = ejecutar_analisis_completo(st.session_state.poligono_data, tipo_ecosistema, num_puntos, usar_gee)
+                    resultados = ejecutar_analisis_completo(st.session_state.poligono_data, tipo_ecosistema, num_puntos, usar_gee, replicas_incertidumbre, serie_temporal,
+                                                            raster_local, cobertura_total)
                     if resultados:
                         st.session_state.resultados = resultados
                         st.success("✅ Análisis completado!")
@@ -0,0 +1,92 @@
+# modules/activos_reporte.py
+# ===============================
+# ACTIVOS GRÁFICOS DE LOS INFORMES
+# Cada gráfico y mapa de un resultado se renderiza una sola vez a PNG y
+# se guarda en memoria direccionado por contenido; PDF, DOCX e informe
+# con IA reciben los mismos bytes
+# ===============================
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+
+def _serializable(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.to_json()
+    # Objetos de trabajo (superficie, malla, analizadores): derivados del resto del resultado
+    return f'<{type(valor).__name__}>'
+
+
+def huella_resultados(resultados: Dict, gdf: Optional[gpd.GeoDataFrame] = None) -> str:
+    """Hash del contenido del resultado (y del lote), estable entre reruns mientras no cambie."""
+    h = hashlib.sha256(json.dumps(resultados, sort_keys=True, default=_serializable).encode('utf-8'))
+    if gdf is not None and len(gdf):
+        h.update(gdf.geometry.iloc[0].wkb)
+    return h.hexdigest()
+
+
+class AlmacenActivos:
+    """
+    PNG en memoria guardados por el SHA-256 de sus bytes, con un índice
+    (huella del resultado, nombre del activo) -> contenido. Solo se guardan
+    activos renderizados: un fallo (o un activo sin datos) no se registra,
+    así el próximo informe lo vuelve a pedir. Se descartan los contenidos
+    menos usados al superar `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._contenidos: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._indice: Dict[Tuple[str, str], str] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _guardar(self, datos: bytes) -> str:
+        clave = hashlib.sha256(datos).hexdigest()
+        if clave in self._contenidos:
+            self._contenidos.move_to_end(clave)
+            return clave
+        self._contenidos[clave] = datos
+        self._bytes += len(datos)
+        while self._bytes > self.max_bytes and len(self._contenidos) > 1:
+            vieja, descartado = self._contenidos.popitem(last=False)
+            self._bytes -= len(descartado)
+            for k in [k for k, v in self._indice.items() if v == vieja]:
+                del self._indice[k]
+        return clave
+
+    def obtener(self, huella: str, nombre: str, generar: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """Bytes del activo; `generar` solo se llama si este resultado todavía no lo tiene."""
+        with self._lock:
+            clave = self._indice.get((huella, nombre))
+            if clave is not None:
+                self._contenidos.move_to_end(clave)
+                return self._contenidos[clave]
+        return self.registrar(huella, nombre, generar())
+
+    def contiene(self, huella: str, nombre: str) -> bool:
+        with self._lock:
+            return (huella, nombre) in self._indice
+
+    def registrar(self, huella: str, nombre: str, datos: Optional[bytes]) -> Optional[bytes]:
+        """Guarda el activo ya renderizado; si `datos` está vacío no se guarda nada."""
+        if not datos:
+            return None
+        with self._lock:
+            self._indice[(huella, nombre)] = self._guardar(datos)
+        return datos
+
+    def estado(self) -> Dict:
+        with self._lock:
+            return {'activos': len(self._indice), 'contenidos': len(self._contenidos), 'bytes': self._bytes}
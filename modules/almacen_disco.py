@@ -0,0 +1,132 @@
+# modules/almacen_disco.py
+# ===============================
+# ALMACÉN EN DISCO CON ÍNDICE SQLITE
+# Un archivo por entrada y un índice (clave, archivo, tamaño, creación,
+# último acceso); escritura atómica, vencimiento por TTL y desalojo por
+# tamaño de las menos usadas recientemente. Las cachés concretas solo
+# definen cómo se escribe y se lee cada carga
+# ===============================
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class AlmacenDisco:
+    """
+    Base de las cachés locales. Las subclases redefinen `EXTENSION`,
+    `_escribir(f, datos)` y `_leer(ruta)`; por defecto la carga son bytes.
+    Las entradas vencen a los `ttl_dias`; si el total supera
+    `tamano_maximo_mb` se desalojan las menos usadas recientemente.
+    """
+    EXTENSION = '.bin'
+
+    def __init__(self, directorio: str, ttl_dias: float, tamano_maximo_mb: float):
+        self.directorio = directorio
+        self.ttl_segundos = ttl_dias * 86400
+        self.tamano_maximo = int(tamano_maximo_mb * 1024 * 1024)
+        os.makedirs(self.directorio, exist_ok=True)
+        self.ruta_indice = os.path.join(self.directorio, 'indice.sqlite')
+        with self._conectar() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS entradas ('
+                'clave TEXT PRIMARY KEY, archivo TEXT NOT NULL, bytes INTEGER NOT NULL, '
+                'creado REAL NOT NULL, ultimo_acceso REAL NOT NULL, descripcion TEXT)'
+            )
+
+    @contextmanager
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta_indice, timeout=10)
+        try:
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    @staticmethod
+    def hash_clave(partes: Dict) -> str:
+        """Clave determinística a partir de un diccionario de parámetros."""
+        return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _escribir(self, f, datos: Any):
+        f.write(datos)
+
+    def _leer(self, ruta: str) -> Any:
+        with open(ruta, 'rb') as f:
+            return f.read()
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        ahora = time.time()
+        with self._conectar() as conexion:
+            fila = conexion.execute('SELECT archivo, creado FROM entradas WHERE clave = ?', (clave,)).fetchone()
+            if fila is None:
+                return None
+            archivo, creado = fila
+            ruta = os.path.join(self.directorio, archivo)
+            if ahora - creado > self.ttl_segundos or not os.path.exists(ruta):
+                self._borrar(conexion, clave, archivo)
+                return None
+            conexion.execute('UPDATE entradas SET ultimo_acceso = ? WHERE clave = ?', (ahora, clave))
+        try:
+            return self._leer(ruta)
+        except (OSError, ValueError):
+            with self._conectar() as conexion:
+                self._borrar(conexion, clave, archivo)
+            return None
+
+    def guardar(self, clave: str, datos: Any, descripcion: Optional[Dict] = None):
+        archivo = f'{clave}{self.EXTENSION}'
+        ruta = os.path.join(self.directorio, archivo)
+        # Escritura atómica: archivo temporal en el mismo directorio y os.replace
+        descriptor, ruta_temporal = tempfile.mkstemp(dir=self.directorio, suffix=f'{self.EXTENSION}.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                self._escribir(f, datos)
+            os.replace(ruta_temporal, ruta)
+        finally:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+        ahora = time.time()
+        with self._conectar() as conexion:
+            conexion.execute(
+                'INSERT OR REPLACE INTO entradas (clave, archivo, bytes, creado, ultimo_acceso, descripcion) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (clave, archivo, os.path.getsize(ruta), ahora, ahora, json.dumps(descripcion or {}, default=str))
+            )
+            self._desalojar(conexion, ahora)
+
+    def _borrar(self, conexion, clave: str, archivo: str):
+        conexion.execute('DELETE FROM entradas WHERE clave = ?', (clave,))
+        ruta = os.path.join(self.directorio, archivo)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    def _desalojar(self, conexion, ahora: float):
+        vencidas = conexion.execute('SELECT clave, archivo FROM entradas WHERE creado < ?',
+                                    (ahora - self.ttl_segundos,)).fetchall()
+        for clave, archivo in vencidas:
+            self._borrar(conexion, clave, archivo)
+        total = conexion.execute('SELECT COALESCE(SUM(bytes), 0) FROM entradas').fetchone()[0]
+        if total <= self.tamano_maximo:
+            return
+        for clave, archivo, tamano in conexion.execute(
+                'SELECT clave, archivo, bytes FROM entradas ORDER BY ultimo_acceso ASC').fetchall():
+            self._borrar(conexion, clave, archivo)
+            total -= tamano
+            if total <= self.tamano_maximo:
+                break
+
+    def estadisticas(self) -> Dict:
+        with self._conectar() as conexion:
+            entradas, total = conexion.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entradas').fetchone()
+        return {'entradas': entradas, 'tamano_mb': round(total / (1024 * 1024), 2)}
+
+    def limpiar(self):
+        with self._conectar() as conexion:
+            for clave, archivo in conexion.execute('SELECT clave, archivo FROM entradas').fetchall():
+                self._borrar(conexion, clave, archivo)
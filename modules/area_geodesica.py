@@ -0,0 +1,77 @@
+# modules/area_geodesica.py
+# ===============================
+# ÁREA ELIPSOIDAL VECTORIZADA
+# Todas las geometrías de un lote o catastro se proyectan en una sola
+# llamada a una Lambert azimutal equivalente centrada en ellas y se miden
+# juntas; cada área queda en caché por geometría
+# ===============================
+
+from typing import Optional
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from pyproj import CRS, Geod, Transformer
+
+from modules.cache_geometrias import CacheGeometrias
+
+_GEOD = Geod(ellps='WGS84')
+# Más allá de esta extensión (grados) se mide cada geometría sobre el elipsoide
+_EXTENSION_MAX_LAEA = 60.0
+_areas_m2 = CacheGeometrias(maximo=50000)
+
+
+def _proyectar_laea(geometrias: np.ndarray) -> np.ndarray:
+    """Proyección equivalente (área exacta sobre el elipsoide) centrada en el conjunto, en una sola transformación."""
+    minx, miny, maxx, maxy = shapely.total_bounds(geometrias)
+    laea = CRS.from_proj4(f'+proj=laea +lat_0={(miny + maxy) / 2} +lon_0={(minx + maxx) / 2} +ellps=WGS84 +units=m')
+    transformador = Transformer.from_crs('EPSG:4326', laea, always_xy=True)
+    return shapely.transform(geometrias, lambda xy: np.column_stack(transformador.transform(xy[:, 0], xy[:, 1])))
+
+
+def _medir_m2(geometrias: np.ndarray) -> np.ndarray:
+    minx, miny, maxx, maxy = shapely.total_bounds(geometrias)
+    if maxx - minx > _EXTENSION_MAX_LAEA or maxy - miny > _EXTENSION_MAX_LAEA:
+        return np.array([abs(_GEOD.geometry_area_perimeter(g)[0]) for g in geometrias])
+    return shapely.area(_proyectar_laea(geometrias))
+
+
+def areas_ha(geometrias, crs: Optional[object] = 'EPSG:4326') -> np.ndarray:
+    """
+    Área en hectáreas de cada geometría (GeoSeries o array de shapely). Las
+    que ya se midieron salen de la caché; el resto se mide en una sola
+    pasada. Si el CRS no es geográfico se pasa antes a EPSG:4326.
+    """
+    if isinstance(geometrias, gpd.GeoSeries):
+        if geometrias.crs is not None and not geometrias.crs.is_geographic:
+            geometrias = geometrias.to_crs('EPSG:4326')
+        geometrias = geometrias.values
+    elif crs is not None and not CRS.from_user_input(crs).is_geographic:
+        geometrias = gpd.GeoSeries(geometrias, crs=crs).to_crs('EPSG:4326').values
+    geometrias = np.asarray(geometrias, dtype=object)
+    resultado = np.zeros(len(geometrias))
+    validas = ~(shapely.is_missing(geometrias) | shapely.is_empty(geometrias))
+    if not validas.any():
+        return resultado
+
+    claves = CacheGeometrias.claves(geometrias[validas])
+    posiciones = np.flatnonzero(validas)
+    pendientes = []
+    for posicion, clave, area in zip(posiciones, claves, _areas_m2.obtener_varios(claves)):
+        if area is None:
+            pendientes.append((posicion, clave))
+        else:
+            resultado[posicion] = area
+    if pendientes:
+        indices = np.array([p for p, _ in pendientes])
+        medidas = _medir_m2(geometrias[indices])
+        resultado[indices] = medidas
+        _areas_m2.guardar_varios((clave, float(area)) for (_, clave), area in zip(pendientes, medidas))
+    return resultado / 10000
+
+
+def area_total_ha(gdf: gpd.GeoDataFrame) -> float:
+    """Suma de las áreas elipsoidales de todas las geometrías del GeoDataFrame."""
+    if gdf is None or len(gdf) == 0:
+        return 0.0
+    return float(areas_ha(gdf.geometry).sum())
@@ -0,0 +1,140 @@
+# modules/balance_forrajero.py
+# ===============================
+# BALANCE FORRAJERO DIARIO
+# Simulación de stock, crecimiento estacional y consumo para todos los
+# sublotes y todos los días como operaciones sobre la matriz sublotes × días
+# ===============================
+
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+# Crecimiento relativo mensual (enero a diciembre, hemisferio sur); se normaliza a media 1
+CURVAS_ESTACIONALES = {
+    'pastizal_natural': [1.3, 1.2, 1.1, 0.8, 0.5, 0.3, 0.3, 0.5, 0.9, 1.3, 1.5, 1.4],
+    'pastura_mejorada': [1.2, 1.1, 1.0, 0.8, 0.5, 0.35, 0.35, 0.6, 1.1, 1.5, 1.5, 1.3],
+    'silvopastoril': [1.15, 1.1, 1.05, 0.9, 0.7, 0.55, 0.55, 0.7, 1.0, 1.2, 1.3, 1.2],
+    'agroforestal': [1.2, 1.15, 1.05, 0.85, 0.65, 0.5, 0.5, 0.65, 0.95, 1.2, 1.3, 1.25],
+    'monte': [1.6, 1.6, 1.3, 0.8, 0.4, 0.2, 0.2, 0.3, 0.5, 1.0, 1.5, 1.7],
+    'patagonico': [0.7, 0.5, 0.5, 0.5, 0.3, 0.2, 0.2, 0.5, 1.2, 1.9, 1.9, 1.3]
+}
+# Día del año en el centro de cada mes
+_DIAS_MEDIOS_MES = np.array([15, 45, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349], dtype=float)
+
+
+def curva_estacional(tipo_sistema: str, dias: int = 365, fecha_inicio: Optional[date] = None, latitud: float = -34.0) -> np.ndarray:
+    """
+    Factor diario de crecimiento (media anual 1) para el sistema forrajero,
+    interpolado entre los valores mensuales. Al norte del ecuador la curva
+    se desplaza medio año.
+    """
+    fecha_inicio = fecha_inicio or date.today()
+    mensual = np.asarray(CURVAS_ESTACIONALES.get(tipo_sistema, CURVAS_ESTACIONALES['pastizal_natural']), dtype=float)
+    mensual = mensual / mensual.mean()
+    dia_anio = (fecha_inicio.timetuple().tm_yday - 1 + np.arange(dias)) % 365
+    if latitud > 0:
+        dia_anio = (dia_anio + 182) % 365
+    return np.interp(dia_anio, _DIAS_MEDIOS_MES, mensual, period=365)
+
+
+def simular_balance(stock_inicial_kg, crecimiento_diario_kg, stock_maximo_kg, consumo_diario_kg,
+                    factor_estacional=None, remanente_kg=0.0, dias: int = 365) -> Dict[str, np.ndarray]:
+    """
+    Balance diario por sublote: stock_t = clip(stock_{t-1} + crecimiento_t - consumo_t,
+    remanente, stock_maximo). `consumo_diario_kg` admite un escalar, un valor por
+    sublote o una matriz sublotes × días. Devuelve matrices sublotes × días.
+    """
+    stock_inicial = np.asarray(stock_inicial_kg, dtype=float)
+    n = len(stock_inicial)
+    factor = np.ones(dias) if factor_estacional is None else np.asarray(factor_estacional, dtype=float)[:dias]
+    crecimiento = np.asarray(crecimiento_diario_kg, dtype=float).reshape(n, 1) * factor[None, :]
+    consumo = np.asarray(consumo_diario_kg, dtype=float)
+    if consumo.ndim == 1:
+        consumo = consumo[:, None]
+    consumo = np.broadcast_to(consumo, (n, dias))
+    techo = np.maximum(np.asarray(stock_maximo_kg, dtype=float), stock_inicial)
+    piso = np.minimum(np.broadcast_to(np.asarray(remanente_kg, dtype=float), (n,)), stock_inicial)
+
+    # Flujo neto como matriz días × sublotes contigua; la recurrencia acotada avanza
+    # un día por vez sobre el vector completo de sublotes
+    neto = np.ascontiguousarray((crecimiento - consumo).T)
+    stock = np.empty_like(neto)
+    s = stock_inicial.copy()
+    for dia in range(dias):
+        np.add(s, neto[dia], out=s)
+        np.clip(s, piso, techo, out=s)
+        stock[dia] = s
+    stock = stock.T
+    stock_previo = np.concatenate([stock_inicial[:, None], stock[:, :-1]], axis=1)
+    deficit = np.maximum(piso[:, None] - (stock_previo + crecimiento - consumo), 0.0)
+    return {
+        'stock_inicial': stock_inicial,
+        'stock': stock,
+        'crecimiento': crecimiento,
+        'consumo': consumo - deficit,
+        'deficit': deficit
+    }
+
+
+def ventanas_deficit(deficit: np.ndarray, umbral: float = 1e-6):
+    """Tramos consecutivos con déficit: arrays (sublote, inicio, fin) con índices de día inclusivos."""
+    con_deficit = deficit > umbral
+    borde = np.zeros((con_deficit.shape[0], 1), dtype=bool)
+    cambios = np.diff(np.hstack([borde, con_deficit, borde]).astype(np.int8), axis=1)
+    filas_ini, inicios = np.nonzero(cambios == 1)
+    _, fines = np.nonzero(cambios == -1)
+    # np.nonzero recorre por filas, así que inicios y fines quedan emparejados
+    return filas_ini, inicios, fines - 1
+
+
+def resumir_balance(balance: Dict[str, np.ndarray], ids_sublotes=None, fecha_inicio: Optional[date] = None) -> Dict:
+    """
+    Fecha de agotamiento por sublote (primer día con déficit), ventanas de
+    déficit y serie diaria total del lote.
+    """
+    stock, deficit = balance['stock'], balance['deficit']
+    n, dias = stock.shape
+    fecha_inicio = fecha_inicio or date.today()
+    ids_sublotes = np.asarray(ids_sublotes if ids_sublotes is not None else np.arange(1, n + 1))
+    fechas = np.array([fecha_inicio + timedelta(days=d) for d in range(dias)])
+
+    con_deficit = deficit > 1e-6
+    agota = con_deficit.any(axis=1)
+    primer_dia = np.where(agota, con_deficit.argmax(axis=1), -1)
+    df_sublotes = pd.DataFrame({
+        'sublote_id': ids_sublotes,
+        'stock_inicial_kg': np.round(balance['stock_inicial'], 1),
+        'stock_minimo_kg': np.round(stock.min(axis=1), 1),
+        'stock_final_kg': np.round(stock[:, -1], 1),
+        'crecimiento_total_kg': np.round(balance['crecimiento'].sum(axis=1), 1),
+        'consumo_total_kg': np.round(balance['consumo'].sum(axis=1), 1),
+        'deficit_total_kg': np.round(deficit.sum(axis=1), 1),
+        'dias_con_deficit': con_deficit.sum(axis=1),
+        'fecha_agotamiento': np.where(agota, fechas[np.maximum(primer_dia, 0)], None)
+    })
+
+    filas, inicios, fines = ventanas_deficit(deficit)
+    acumulado = np.concatenate([np.zeros((n, 1)), np.cumsum(deficit, axis=1)], axis=1)
+    df_ventanas = pd.DataFrame({
+        'sublote_id': ids_sublotes[filas],
+        'fecha_inicio': fechas[inicios],
+        'fecha_fin': fechas[fines],
+        'dias': fines - inicios + 1,
+        'deficit_kg': np.round(acumulado[filas, fines + 1] - acumulado[filas, inicios], 1)
+    })
+
+    df_diario = pd.DataFrame({
+        'fecha': fechas,
+        'stock_kg': np.round(stock.sum(axis=0), 1),
+        'crecimiento_kg': np.round(balance['crecimiento'].sum(axis=0), 1),
+        'consumo_kg': np.round(balance['consumo'].sum(axis=0), 1),
+        'deficit_kg': np.round(deficit.sum(axis=0), 1)
+    })
+    return {
+        'sublotes': df_sublotes,
+        'ventanas_deficit': df_ventanas,
+        'diario': df_diario,
+        'dias_deficit_lote': int((deficit.sum(axis=0) > 1e-6).sum()),
+        'deficit_total_kg': round(float(deficit.sum()), 1)
+    }
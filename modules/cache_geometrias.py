@@ -0,0 +1,56 @@
+# modules/cache_geometrias.py
+# ===============================
+# CACHÉ DE DERIVADOS POR GEOMETRÍA
+# LRU acotado y seguro entre hilos, con clave por el WKB de cada
+# geometría (independiente del objeto o GeoDataFrame que la contenga)
+# ===============================
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+import shapely
+
+
+class CacheGeometrias:
+    """Valores calculados por geometría; al superar `maximo` se descartan los menos usados."""
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._valores: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def claves(geometrias) -> List[str]:
+        """Clave de cada geometría (hash de su WKB), en una sola serialización vectorizada."""
+        return [hashlib.sha1(wkb).hexdigest() for wkb in shapely.to_wkb(geometrias)]
+
+    @classmethod
+    def clave(cls, geometria) -> str:
+        return cls.claves([geometria])[0]
+
+    def obtener_varios(self, claves: Iterable[str]) -> List[Optional[Any]]:
+        with self._lock:
+            salida = []
+            for clave in claves:
+                valor = self._valores.get(clave)
+                if valor is not None:
+                    self._valores.move_to_end(clave)
+                salida.append(valor)
+            return salida
+
+    def guardar_varios(self, pares: Iterable[Tuple[str, Any]]):
+        with self._lock:
+            for clave, valor in pares:
+                self._valores[clave] = valor
+                self._valores.move_to_end(clave)
+            while len(self._valores) > self.maximo:
+                self._valores.popitem(last=False)
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        return self.obtener_varios([clave])[0]
+
+    def guardar(self, clave: str, valor: Any) -> Any:
+        self.guardar_varios([(clave, valor)])
+        return valor
@@ -0,0 +1,28 @@
+# modules/cache_informes.py
+# ===============================
+# CACHÉ LOCAL DE INFORMES GENERADOS
+# Bytes finales de cada informe en un AlmacenDisco, con clave por huella
+# del resultado, formato y opciones
+# ===============================
+
+import os
+from typing import Dict, Optional
+
+from modules.almacen_disco import AlmacenDisco
+
+DIRECTORIO_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'disponibilidad_forrajera', 'informes')
+
+
+class CacheInformes(AlmacenDisco):
+    """Cada informe (PDF, DOCX, GeoJSON...) como un archivo; vencen a los 30 días y ocupan hasta 500 MB."""
+
+    def __init__(self, directorio: str = DIRECTORIO_CACHE, ttl_dias: float = 30, tamano_maximo_mb: float = 500):
+        super().__init__(directorio, ttl_dias, tamano_maximo_mb)
+
+    @staticmethod
+    def clave(huella: str, formato: str, **opciones) -> str:
+        """Clave determinística: huella del resultado, formato y opciones del informe."""
+        return AlmacenDisco.hash_clave({'huella': huella, 'formato': formato, **opciones})
+
+    def guardar(self, clave: str, datos: bytes, formato: str = '', opciones: Optional[Dict] = None):
+        super().guardar(clave, datos, {'formato': formato, 'opciones': opciones or {}})
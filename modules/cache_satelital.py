@@ -0,0 +1,46 @@
+# modules/cache_satelital.py
+# ===============================
+# CACHÉ LOCAL DE EXTRACCIONES SATELITALES
+# Cargas NPZ en un AlmacenDisco, con clave por geometría, ventana de fechas,
+# colección y parámetros de máscara
+# ===============================
+
+import os
+import hashlib
+import numpy as np
+import shapely
+from typing import Dict
+
+from modules.almacen_disco import AlmacenDisco
+
+DIRECTORIO_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'disponibilidad_forrajera', 'indices_satelitales')
+
+
+def hash_geometria(geometria, precision: float = 1e-7) -> str:
+    """Hash estable de la geometría (normalizada y redondeada a ~1 cm en grados)."""
+    normalizada = shapely.normalize(shapely.set_precision(geometria, precision))
+    return hashlib.sha256(shapely.to_wkb(normalizada, hex=True).encode()).hexdigest()
+
+
+class CacheIndicesSatelitales(AlmacenDisco):
+    """
+    Arrays de índices por punto en archivos NPZ comprimidos. Las entradas
+    vencen a los `ttl_dias`; si el total supera `tamano_maximo_mb` se
+    desalojan las menos usadas recientemente.
+    """
+    EXTENSION = '.npz'
+
+    def __init__(self, directorio: str = DIRECTORIO_CACHE, ttl_dias: float = 7, tamano_maximo_mb: float = 200):
+        super().__init__(directorio, ttl_dias, tamano_maximo_mb)
+
+    @staticmethod
+    def clave(**partes) -> str:
+        """Clave determinística a partir de los parámetros de la extracción."""
+        return AlmacenDisco.hash_clave(partes)
+
+    def _escribir(self, f, arrays: Dict[str, np.ndarray]):
+        np.savez_compressed(f, **{k: np.asarray(v) for k, v in arrays.items()})
+
+    def _leer(self, ruta: str) -> Dict[str, np.ndarray]:
+        with np.load(ruta, allow_pickle=False) as datos:
+            return {nombre: datos[nombre] for nombre in datos.files}
@@ -0,0 +1,161 @@
+# modules/ejecutor_gee.py
+# ===============================
+# EJECUTOR CONCURRENTE DE SOLICITUDES A EARTH ENGINE
+# Pool de hilos acotado, limitador de tasa por proyecto, reintentos con
+# espera exponencial ante errores de cuota/transitorios y métricas
+# ===============================
+
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Hashable, Optional
+
+# Fragmentos de mensaje con los que Earth Engine / la API de Google informan cuota o saturación
+_MARCAS_CUOTA = ('429', 'too many requests', 'quota', 'rate limit', 'resource_exhausted', 'too many concurrent')
+_MARCAS_TRANSITORIAS = ('500', '502', '503', '504', 'backend error', 'internal error', 'service unavailable',
+                        'connection reset', 'connection aborted', 'temporarily unavailable')
+
+
+def es_error_cuota(error: Exception) -> bool:
+    codigo = getattr(error, 'status_code', None) or getattr(getattr(error, 'resp', None), 'status', None)
+    if codigo == 429:
+        return True
+    texto = str(error).lower()
+    return any(marca in texto for marca in _MARCAS_CUOTA)
+
+
+def es_error_reintentable(error: Exception) -> bool:
+    if es_error_cuota(error) or isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    texto = str(error).lower()
+    return any(marca in texto for marca in _MARCAS_TRANSITORIAS)
+
+
+class LimitadorTasa:
+    """Cubeta de fichas: `tasa` solicitudes por segundo con ráfagas de hasta `capacidad`."""
+
+    def __init__(self, tasa: float, capacidad: Optional[float] = None, reloj=time.monotonic, dormir=time.sleep):
+        self.tasa = max(float(tasa), 1e-6)
+        self.capacidad = float(capacidad if capacidad is not None else max(tasa, 1.0))
+        self.fichas = self.capacidad
+        self.reloj = reloj
+        self.dormir = dormir
+        self._ultimo = reloj()
+        self._lock = threading.Lock()
+
+    def adquirir(self) -> float:
+        """Bloquea hasta obtener una ficha; devuelve los segundos esperados."""
+        esperado = 0.0
+        while True:
+            with self._lock:
+                ahora = self.reloj()
+                self.fichas = min(self.capacidad, self.fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self.fichas >= 1.0:
+                    self.fichas -= 1.0
+                    return esperado
+                faltante = (1.0 - self.fichas) / self.tasa
+            self.dormir(faltante)
+            esperado += faltante
+
+
+_LIMITADORES: Dict[str, LimitadorTasa] = {}
+_LOCK_LIMITADORES = threading.Lock()
+
+
+def limitador_proyecto(proyecto: str, tasa: float = 10.0, capacidad: Optional[float] = None) -> LimitadorTasa:
+    """Limitador compartido por todo el proceso para un mismo proyecto de Earth Engine."""
+    with _LOCK_LIMITADORES:
+        if proyecto not in _LIMITADORES:
+            _LIMITADORES[proyecto] = LimitadorTasa(tasa, capacidad)
+        return _LIMITADORES[proyecto]
+
+
+class EjecutorGEE:
+    """
+    Ejecuta trabajos independientes (funciones sin argumentos que hacen la
+    llamada bloqueante, p. ej. `getInfo`) en un pool acotado. Cada intento pasa
+    por el limitador del proyecto; los errores de cuota o transitorios se
+    reintentan con espera exponencial y jitter. Las funciones pueden ser de un
+    backend local, lo que permite probar sin Earth Engine.
+    """
+
+    def __init__(self, proyecto: str = 'default', max_hilos: int = 4, solicitudes_por_segundo: float = 10.0,
+                 reintentos: int = 5, espera_base_s: float = 1.0, espera_maxima_s: float = 32.0,
+                 timeout_s: Optional[float] = 300.0, limitador: Optional[LimitadorTasa] = None,
+                 dormir=time.sleep):
+        self.max_hilos = max(int(max_hilos), 1)
+        self.reintentos = max(int(reintentos), 0)
+        self.espera_base_s = espera_base_s
+        self.espera_maxima_s = espera_maxima_s
+        self.timeout_s = timeout_s
+        self.limitador = limitador or limitador_proyecto(proyecto, solicitudes_por_segundo)
+        self.dormir = dormir
+        self._lock = threading.Lock()
+        self._metricas = {
+            'trabajos': 0, 'exitosos': 0, 'fallidos': 0, 'vencidos': 0,
+            'intentos': 0, 'reintentos': 0, 'errores_cuota': 0,
+            'espera_limitador_s': 0.0, 'espera_reintentos_s': 0.0, 'latencia_total_s': 0.0,
+            'en_curso': 0, 'max_en_curso': 0
+        }
+
+    def _sumar(self, **incrementos):
+        with self._lock:
+            for clave, valor in incrementos.items():
+                self._metricas[clave] += valor
+            self._metricas['max_en_curso'] = max(self._metricas['max_en_curso'], self._metricas['en_curso'])
+
+    def _correr(self, trabajo: Callable):
+        for intento in range(self.reintentos + 1):
+            self._sumar(espera_limitador_s=self.limitador.adquirir(), intentos=1, en_curso=1)
+            inicio = time.monotonic()
+            try:
+                resultado = trabajo()
+                self._sumar(latencia_total_s=time.monotonic() - inicio, en_curso=-1)
+                return resultado
+            except Exception as e:
+                self._sumar(latencia_total_s=time.monotonic() - inicio, en_curso=-1,
+                            errores_cuota=int(es_error_cuota(e)))
+                if intento >= self.reintentos or not es_error_reintentable(e):
+                    raise
+                espera = random.uniform(0, min(self.espera_maxima_s, self.espera_base_s * 2 ** intento))
+                self._sumar(reintentos=1, espera_reintentos_s=espera)
+                self.dormir(espera)
+
+    def ejecutar(self, trabajos: Dict[Hashable, Callable]) -> Dict[Hashable, Dict]:
+        """
+        Corre todos los trabajos y devuelve {clave: {'ok', 'resultado' | 'error'}}.
+        Los que no terminan dentro de `timeout_s` quedan marcados como vencidos.
+        """
+        if not trabajos:
+            return {}
+        self._sumar(trabajos=len(trabajos))
+        resultados = {}
+        pool = ThreadPoolExecutor(max_workers=min(self.max_hilos, len(trabajos)), thread_name_prefix='gee')
+        try:
+            futuros = {pool.submit(self._correr, trabajo): clave for clave, trabajo in trabajos.items()}
+            hechos, pendientes = wait(futuros, timeout=self.timeout_s)
+            for futuro in hechos:
+                clave = futuros[futuro]
+                try:
+                    resultados[clave] = {'ok': True, 'resultado': futuro.result()}
+                    self._sumar(exitosos=1)
+                except Exception as e:
+                    resultados[clave] = {'ok': False, 'error': str(e)}
+                    self._sumar(fallidos=1)
+            for futuro in pendientes:
+                futuro.cancel()
+                resultados[futuros[futuro]] = {'ok': False, 'error': f'Tiempo agotado ({self.timeout_s:g} s)'}
+                self._sumar(vencidos=1)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return resultados
+
+    def metricas(self) -> Dict:
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas['latencia_media_s'] = round(metricas['latencia_total_s'] / metricas['intentos'], 3) if metricas['intentos'] else 0.0
+        for clave in ('espera_limitador_s', 'espera_reintentos_s', 'latencia_total_s'):
+            metricas[clave] = round(metricas[clave], 3)
+        return metricas
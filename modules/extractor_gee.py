@@ -0,0 +1,197 @@
+# modules/extractor_gee.py
+# ===============================
+# EXTRACCIÓN DE ÍNDICES SENTINEL-2 DESDE GOOGLE EARTH ENGINE
+# Compuesto único del período, índices calculados en el servidor y
+# muestreo de todos los puntos con reduceRegions por lotes
+# ===============================
+
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+INDICES_ESPECTRALES = ['NDVI', 'NDWI', 'NDRE', 'MSAVI', 'EVI']
+# Clases SCL descartadas: sombra de nube, nubes (media/alta probabilidad), cirros, nieve
+_CLASES_SCL_INVALIDAS = [3, 8, 9, 10, 11]
+
+
+class ExtractorIndicesGEE:
+    """
+    Construye una sola vez la mediana Sentinel-2 SR sin nubes sobre el lote y
+    los índices espectrales como bandas; luego extrae todos los puntos con una
+    llamada reduceRegions + getInfo por lote de `tamano_lote` puntos.
+
+    El módulo `ee` se recibe por parámetro, así que se puede usar una
+    implementación local de la API para trabajar sin conexión.
+    """
+
+    def __init__(self, ee_modulo=None, coleccion: str = 'COPERNICUS/S2_SR_HARMONIZED', dias_compuesto: int = 90,
+                 nubosidad_maxima: float = 30, escala_m: int = 10, tamano_lote: int = 2000):
+        if ee_modulo is None:
+            import ee as ee_modulo
+        self.ee = ee_modulo
+        self.coleccion = coleccion
+        self.dias_compuesto = dias_compuesto
+        self.nubosidad_maxima = nubosidad_maxima
+        self.escala_m = escala_m
+        self.tamano_lote = max(int(tamano_lote), 1)
+
+    def _enmascarar_nubes(self, imagen):
+        scl = imagen.select('SCL')
+        valido = scl.neq(_CLASES_SCL_INVALIDAS[0])
+        for clase in _CLASES_SCL_INVALIDAS[1:]:
+            valido = valido.And(scl.neq(clase))
+        return imagen.updateMask(valido)
+
+    def ventana(self, fecha_fin: Optional[date] = None):
+        """
+        Período del compuesto. Por defecto termina el lunes de la semana en curso,
+        así todas las corridas de una misma semana usan el mismo compuesto.
+        """
+        if fecha_fin is None:
+            hoy = date.today()
+            fecha_fin = hoy - timedelta(days=hoy.weekday())
+        return fecha_fin - timedelta(days=self.dias_compuesto), fecha_fin
+
+    def parametros(self) -> Dict:
+        """Parámetros que determinan el resultado (para claves de caché)."""
+        return {
+            'coleccion': self.coleccion,
+            'dias_compuesto': self.dias_compuesto,
+            'nubosidad_maxima': self.nubosidad_maxima,
+            'escala_m': self.escala_m,
+            'clases_scl_invalidas': _CLASES_SCL_INVALIDAS
+        }
+
+    def compuesto(self, geometria_geojson: Dict, fecha_fin: Optional[date] = None):
+        """Imagen con una banda por índice (NDVI, NDWI, NDRE, MSAVI, EVI) para el período."""
+        ee = self.ee
+        fecha_inicio, fecha_fin = self.ventana(fecha_fin)
+        region = ee.Geometry(geometria_geojson)
+        mediana = (ee.ImageCollection(self.coleccion)
+                   .filterBounds(region)
+                   .filterDate(fecha_inicio.isoformat(), fecha_fin.isoformat())
+                   .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', self.nubosidad_maxima))
+                   .map(self._enmascarar_nubes)
+                   .median())
+        return self.indices(mediana)
+
+    def indices(self, imagen):
+        """Bandas NDVI, NDWI, NDRE, MSAVI y EVI a partir de una imagen Sentinel-2 SR."""
+        ee = self.ee
+        reflectancia = imagen.select(['B2', 'B3', 'B4', 'B5', 'B8', 'B11']).divide(10000)
+        bandas = {
+            'B': reflectancia.select('B2'),
+            'R': reflectancia.select('B4'),
+            'N': reflectancia.select('B8')
+        }
+        ndvi = reflectancia.normalizedDifference(['B8', 'B4']).rename('NDVI')
+        ndwi = reflectancia.normalizedDifference(['B8', 'B11']).rename('NDWI')
+        ndre = reflectancia.normalizedDifference(['B8', 'B5']).rename('NDRE')
+        msavi = reflectancia.expression('(2 * N + 1 - sqrt((2 * N + 1) ** 2 - 8 * (N - R))) / 2', bandas).rename('MSAVI')
+        evi = reflectancia.expression('2.5 * (N - R) / (N + 6 * R - 7.5 * B + 1)', bandas).rename('EVI')
+        return ee.Image.cat([ndvi, ndwi, ndre, msavi, evi])
+
+    def serie_temporal(self, geometria_geojson: Dict, fecha_desde: date, fecha_hasta: date,
+                       ejecutor=None, dias_por_solicitud: int = 365) -> List[Dict]:
+        """
+        Media, desvío y píxeles válidos de cada índice sobre el lote para cada
+        escena del período (reduceRegion por imagen, calculado en el servidor).
+        El período se parte en tramos de `dias_por_solicitud` para no exceder
+        los límites de tamaño de respuesta; cada tramo es un solo getInfo.
+        """
+        ee = self.ee
+        region = ee.Geometry(geometria_geojson)
+        reductor = (ee.Reducer.mean()
+                    .combine(ee.Reducer.stdDev(), sharedInputs=True)
+                    .combine(ee.Reducer.count(), sharedInputs=True))
+
+        def resumir_escena(imagen):
+            estadisticas = self.indices(self._enmascarar_nubes(imagen)).reduceRegion(
+                reducer=reductor, geometry=region, scale=self.escala_m, maxPixels=1e9)
+            return ee.Feature(None, estadisticas).set({
+                'fecha': imagen.date().format('YYYY-MM-dd'),
+                'nubosidad': imagen.get('CLOUDY_PIXEL_PERCENTAGE')
+            })
+
+        def trabajo_tramo(desde, hasta):
+            coleccion = (ee.ImageCollection(self.coleccion)
+                         .filterBounds(region)
+                         .filterDate(desde.isoformat(), hasta.isoformat())
+                         .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', self.nubosidad_maxima)))
+            return lambda: ee.FeatureCollection(coleccion.map(resumir_escena)).getInfo()
+
+        trabajos = {}
+        desde = fecha_desde
+        while desde < fecha_hasta:
+            hasta = min(desde + timedelta(days=dias_por_solicitud), fecha_hasta)
+            trabajos[desde] = trabajo_tramo(desde, hasta)
+            desde = hasta
+        if ejecutor is None:
+            respuestas = {clave: {'ok': True, 'resultado': trabajo()} for clave, trabajo in trabajos.items()}
+        else:
+            respuestas = ejecutor.ejecutar(trabajos)
+            errores = [r['error'] for r in respuestas.values() if not r['ok']]
+            if errores:
+                # Un tramo faltante dejaría un hueco que el modo incremental no volvería a pedir
+                raise RuntimeError(errores[0])
+
+        filas = []
+        for clave in sorted(respuestas):
+            for feature in respuestas[clave]['resultado'].get('features', []):
+                propiedades = feature.get('properties', {})
+                if not propiedades.get('NDVI_count'):
+                    continue
+                fila = {'fecha': propiedades['fecha'], 'nubosidad': propiedades.get('nubosidad')}
+                for indice in INDICES_ESPECTRALES:
+                    fila[f'{indice}_media'] = propiedades.get(f'{indice}_mean')
+                    fila[f'{indice}_desv'] = propiedades.get(f'{indice}_stdDev')
+                fila['pixeles'] = propiedades.get('NDVI_count')
+                filas.append(fila)
+        return filas
+
+    def extraer(self, lons: List[float], lats: List[float], geometria_geojson: Dict,
+                fecha_fin: Optional[date] = None, ejecutor=None) -> Tuple[Dict[str, np.ndarray], int]:
+        """
+        Valores de cada índice en los puntos (NaN donde el compuesto no tiene
+        píxeles válidos) y cantidad de lotes que fallaron. Una sola ida y vuelta
+        al servidor por lote de puntos; con un `ejecutor` (EjecutorGEE) los lotes
+        corren en paralelo con reintentos y límite de tasa. Los lotes fallidos
+        quedan en NaN; si fallan todos se lanza el primer error.
+        """
+        ee = self.ee
+        n = len(lons)
+        valores = {indice: np.full(n, np.nan) for indice in INDICES_ESPECTRALES}
+        if n == 0:
+            return valores, 0
+        imagen = self.compuesto(geometria_geojson, fecha_fin)
+        reductor = ee.Reducer.first()
+
+        def trabajo_lote(inicio, fin):
+            puntos = ee.FeatureCollection([
+                ee.Feature(ee.Geometry.Point([float(lons[i]), float(lats[i])]), {'idx': i})
+                for i in range(inicio, fin)
+            ])
+            return lambda: imagen.reduceRegions(collection=puntos, reducer=reductor, scale=self.escala_m).getInfo()
+
+        trabajos = {inicio: trabajo_lote(inicio, min(inicio + self.tamano_lote, n)) for inicio in range(0, n, self.tamano_lote)}
+        if ejecutor is None:
+            respuestas = {inicio: {'ok': True, 'resultado': trabajo()} for inicio, trabajo in trabajos.items()}
+        else:
+            respuestas = ejecutor.ejecutar(trabajos)
+        errores = [r['error'] for r in respuestas.values() if not r['ok']]
+        if len(errores) == len(respuestas):
+            raise RuntimeError(errores[0])
+
+        for respuesta in respuestas.values():
+            if not respuesta['ok']:
+                continue
+            for feature in respuesta['resultado'].get('features', []):
+                propiedades = feature.get('properties', {})
+                i = propiedades.get('idx')
+                if i is None:
+                    continue
+                for indice in INDICES_ESPECTRALES:
+                    valor = propiedades.get(indice)
+                    if valor is not None:
+                        valores[indice][int(i)] = float(valor)
+        return valores, len(errores)
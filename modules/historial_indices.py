@@ -0,0 +1,110 @@
+# modules/historial_indices.py
+# ===============================
+# HISTORIAL DE ÍNDICES POR LOTE
+# Serie temporal de estadísticas por escena guardada en Parquet por lote;
+# cada actualización solo pide a Earth Engine las escenas recientes,
+# desde unos días antes de la última fecha almacenada
+# ===============================
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from modules.extractor_gee import INDICES_ESPECTRALES
+
+DIRECTORIO_HISTORIAL = os.path.join(os.path.expanduser('~'), '.cache', 'disponibilidad_forrajera', 'historial_indices')
+# Las escenas Sentinel-2 llegan a la colección días después de su fecha de adquisición
+DIAS_SOLAPAMIENTO = 10
+
+
+class HistorialIndices:
+    """Un archivo Parquet por lote (identificado por el hash de su geometría), una fila por fecha."""
+
+    def __init__(self, directorio: str = DIRECTORIO_HISTORIAL):
+        self.directorio = directorio
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def ruta(self, id_lote: str) -> str:
+        return os.path.join(self.directorio, f'{id_lote}.parquet')
+
+    def leer(self, id_lote: str) -> pd.DataFrame:
+        ruta = self.ruta(id_lote)
+        if not os.path.exists(ruta):
+            return pd.DataFrame()
+        return pd.read_parquet(ruta)
+
+    def ultima_fecha(self, id_lote: str) -> Optional[date]:
+        ruta = self.ruta(id_lote)
+        if not os.path.exists(ruta):
+            return None
+        fechas = pd.read_parquet(ruta, columns=['fecha'])['fecha']
+        return fechas.max().date() if len(fechas) else None
+
+    def agregar(self, id_lote: str, filas: List[Dict]) -> pd.DataFrame:
+        """
+        Incorpora filas por escena. Las escenas de una misma fecha (varios tiles)
+        se combinan en una fila ponderando por píxeles válidos; una fecha que
+        ya estaba se reemplaza, porque la consulta nueva trae todos sus tiles.
+        """
+        historial = self.leer(id_lote)
+        if not filas:
+            return historial
+        nuevas = _combinar_por_fecha(pd.DataFrame(filas))
+        if not historial.empty:
+            historial = historial[~historial['fecha'].isin(nuevas['fecha'])]
+            nuevas = pd.concat([historial, nuevas], ignore_index=True)
+        nuevas = nuevas.sort_values('fecha').reset_index(drop=True)
+        descriptor, ruta_temporal = tempfile.mkstemp(dir=self.directorio, suffix='.parquet.tmp')
+        os.close(descriptor)
+        try:
+            nuevas.to_parquet(ruta_temporal, index=False)
+            os.replace(ruta_temporal, self.ruta(id_lote))
+        finally:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+        return nuevas
+
+
+def _combinar_por_fecha(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    pixeles = df['pixeles'].astype(float).to_numpy()
+    columnas = {'pixeles': df.groupby('fecha')['pixeles'].sum(), 'nubosidad': df.groupby('fecha')['nubosidad'].mean()}
+    for indice in INDICES_ESPECTRALES:
+        media = df[f'{indice}_media'].astype(float).to_numpy()
+        desv = df[f'{indice}_desv'].astype(float).to_numpy()
+        validos = np.isfinite(media)
+        peso = np.where(validos, pixeles, 0.0)
+        media_0 = np.where(validos, media, 0.0)
+        # Momentos ponderados para unir las estadísticas de varios tiles
+        agrupado = pd.DataFrame({
+            'fecha': df['fecha'], 'w': peso, 'wm': peso * media_0,
+            'wm2': peso * (np.nan_to_num(desv) ** 2 + media_0 ** 2)
+        }).groupby('fecha').sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media_fecha = agrupado['wm'] / agrupado['w']
+            columnas[f'{indice}_media'] = media_fecha
+            columnas[f'{indice}_desv'] = np.sqrt(np.maximum(agrupado['wm2'] / agrupado['w'] - media_fecha ** 2, 0.0))
+    return pd.DataFrame(columnas).reset_index()
+
+
+def actualizar_historial(extractor, historial: HistorialIndices, poligono, id_lote: str,
+                         ejecutor=None, anios_iniciales: int = 3, hasta: Optional[date] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Trae de Earth Engine las escenas desde `DIAS_SOLAPAMIENTO` días antes de la
+    última fecha guardada, para recoger las que se publicaron con retraso (o los
+    últimos `anios_iniciales` años la primera vez), y devuelve el historial
+    completo junto con la cantidad de fechas nuevas.
+    """
+    hasta = hasta or date.today()
+    ultima = historial.ultima_fecha(id_lote)
+    desde = ultima - timedelta(days=DIAS_SOLAPAMIENTO) if ultima else hasta - timedelta(days=365 * anios_iniciales)
+    if desde >= hasta:
+        return historial.leer(id_lote), 0
+    filas = extractor.serie_temporal(poligono.__geo_interface__, desde, hasta, ejecutor=ejecutor)
+    antes = 0 if ultima is None else len(historial.leer(id_lote))
+    df = historial.agregar(id_lote, filas)
+    return df, len(df) - antes
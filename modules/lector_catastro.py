@@ -0,0 +1,118 @@
+# modules/lector_catastro.py
+# ===============================
+# LECTURA DE CATASTROS GRANDES (GEOPARQUET / FLATGEOBUF / GEOPACKAGE)
+# Inspección solo de metadatos y lectura con filtro espacial y por
+# atributo delegado al lector, sin cargar todo el registro
+# ===============================
+
+import json
+import inspect
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import geopandas as gpd
+from pyproj import CRS, Transformer
+
+FORMATOS_PARQUET = ('.parquet', '.geoparquet')
+FORMATOS_OGR = ('.fgb', '.gpkg')
+FORMATOS_CATASTRO = FORMATOS_PARQUET + FORMATOS_OGR
+# `bbox=` en read_parquet existe desde geopandas 1.0; con versiones anteriores se filtra con .cx al leer
+_PARQUET_ADMITE_BBOX = 'bbox' in inspect.signature(gpd.read_parquet).parameters
+
+
+def es_catastro(nombre: str) -> bool:
+    return nombre.lower().endswith(FORMATOS_CATASTRO)
+
+
+def _es_parquet(nombre: str) -> bool:
+    return nombre.lower().endswith(FORMATOS_PARQUET)
+
+
+def _rebobinar(fuente):
+    if hasattr(fuente, 'seek'):
+        fuente.seek(0)
+    return fuente
+
+
+def _a_lonlat(extension, crs) -> Optional[Tuple[float, float, float, float]]:
+    if extension is None:
+        return None
+    if crs is None or CRS.from_user_input(crs).equals(CRS.from_epsg(4326)):
+        return tuple(float(v) for v in extension)
+    return Transformer.from_crs(crs, 4326, always_xy=True).transform_bounds(*extension)
+
+
+def _desde_lonlat(bbox, crs) -> Tuple[float, float, float, float]:
+    if crs is None or CRS.from_user_input(crs).equals(CRS.from_epsg(4326)):
+        return tuple(bbox)
+    return Transformer.from_crs(4326, crs, always_xy=True).transform_bounds(*bbox)
+
+
+def inspeccionar_catastro(fuente, nombre: str, capa: Optional[str] = None) -> Dict:
+    """Cantidad de registros, columnas (con tipo), capas, CRS y extensión (en lon/lat), leyendo solo metadatos."""
+    _rebobinar(fuente)
+    if _es_parquet(nombre):
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(fuente)
+        esquema = archivo.schema_arrow
+        geo = json.loads((esquema.metadata or {}).get(b'geo', b'{}'))
+        columna_geometria = geo.get('primary_column', 'geometry')
+        columnas = {c.name: str(c.type) for c in esquema if c.name != columna_geometria and c.name != 'bbox'}
+        meta_geometria = geo.get('columns', {}).get(columna_geometria, {})
+        # GeoParquet sin 'crs' implica OGC:CRS84 (lon/lat)
+        crs = CRS.from_json_dict(meta_geometria['crs']) if meta_geometria.get('crs') else None
+        return {'registros': archivo.metadata.num_rows, 'columnas': columnas, 'capas': [], 'crs': crs,
+                'extension': _a_lonlat(meta_geometria.get('bbox'), crs),
+                'filtro_espacial_indexado': 'covering' in meta_geometria}
+    import pyogrio
+    capas = [str(c[0]) for c in pyogrio.list_layers(fuente)]
+    info = pyogrio.read_info(_rebobinar(fuente), layer=capa or capas[0])
+    _rebobinar(fuente)
+    return {
+        'registros': int(info['features']),
+        'columnas': {str(c): str(t) for c, t in zip(info['fields'], info['dtypes'])},
+        'capas': capas,
+        'crs': info.get('crs'),
+        'extension': _a_lonlat(info.get('total_bounds'), info.get('crs')),
+        'filtro_espacial_indexado': bool(info.get('capabilities', {}).get('fast_spatial_filter'))
+    }
+
+
+def _valores_tipados(valores: Sequence[str], tipo: str) -> List:
+    tipo = tipo.lower()
+    if 'int' in tipo:
+        return [int(v) for v in valores]
+    if 'float' in tipo or 'double' in tipo:
+        return [float(v) for v in valores]
+    return [str(v) for v in valores]
+
+
+def leer_catastro(fuente, nombre: str, bbox: Optional[Tuple[float, float, float, float]] = None,
+                  columna: Optional[str] = None, valores: Optional[Sequence[str]] = None,
+                  capa: Optional[str] = None, tipo_columna: str = 'string') -> gpd.GeoDataFrame:
+    """
+    Lee solo los registros dentro de `bbox` (lon/lat) y con `columna` en
+    `valores`. En GeoPackage/FlatGeobuf ambos filtros los resuelve GDAL con su
+    índice espacial; en GeoParquet el filtro por atributo se aplica al leer
+    los row groups y el espacial usa la columna bbox si el archivo la tiene
+    (y geopandas la admite).
+    """
+    filtra_atributo = bool(columna and valores)
+    if filtra_atributo:
+        valores = _valores_tipados(valores, tipo_columna)
+    info = inspeccionar_catastro(fuente, nombre, capa)
+    if bbox is not None:
+        bbox = _desde_lonlat(bbox, info['crs'])
+    _rebobinar(fuente)
+    if _es_parquet(nombre):
+        filtros = [(columna, 'in', valores)] if filtra_atributo else None
+        if bbox is not None and info['filtro_espacial_indexado'] and _PARQUET_ADMITE_BBOX:
+            return gpd.read_parquet(fuente, bbox=bbox, filters=filtros)
+        gdf = gpd.read_parquet(fuente, filters=filtros)
+        if bbox is not None:
+            gdf = gdf.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+        return gdf
+    condicion = None
+    if filtra_atributo:
+        literales = ', '.join(repr(v) if not isinstance(v, str) else "'" + v.replace("'", "''") + "'" for v in valores)
+        condicion = '"{}" IN ({})'.format(columna.replace('"', '""'), literales)
+    return gpd.read_file(fuente, layer=capa, bbox=bbox, where=condicion, engine='pyogrio')
@@ -0,0 +1,62 @@
+# modules/lector_comprimidos.py
+# ===============================
+# LECTURA DE KMZ Y SHAPEFILE COMPRIMIDO EN MEMORIA
+# Se abren solo los miembros necesarios directamente desde el archivo
+# subido, sin extraer el ZIP a un directorio temporal
+# ===============================
+
+import os
+import zipfile
+from io import BytesIO
+from typing import Dict, IO, Optional
+
+import geopandas as gpd
+
+# Componentes de un shapefile que GDAL necesita (o aprovecha) para leerlo
+EXTENSIONES_SHAPEFILE = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+
+def _miembros_validos(zip_ref: zipfile.ZipFile):
+    """Archivos del ZIP, sin directorios ni metadatos de macOS."""
+    return [m for m in zip_ref.infolist()
+            if not m.is_dir() and not m.filename.startswith('__MACOSX/') and not os.path.basename(m.filename).startswith('._')]
+
+
+def miembros_shapefile(zip_ref: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+    """Extensión -> miembro del primer shapefile del ZIP y sus archivos asociados (mismo nombre base)."""
+    miembros = _miembros_validos(zip_ref)
+    shp = next((m for m in miembros if m.filename.lower().endswith('.shp')), None)
+    if shp is None:
+        return {}
+    base = shp.filename[:-4].lower()
+    return {m.filename[-4:].lower(): m for m in miembros
+            if m.filename[:-4].lower() == base and m.filename[-4:].lower() in EXTENSIONES_SHAPEFILE}
+
+
+def leer_shapefile_zip(fuente) -> Optional[gpd.GeoDataFrame]:
+    """
+    Lee el primer shapefile de un ZIP (ruta u objeto archivo). Solo se
+    descomprimen sus componentes, que se pasan a GDAL como un ZIP mínimo en
+    memoria; el resto del contenido no se lee.
+    """
+    with zipfile.ZipFile(fuente, 'r') as zip_ref:
+        miembros = miembros_shapefile(zip_ref)
+        if '.shp' not in miembros:
+            return None
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as minimo:
+            for extension, miembro in miembros.items():
+                minimo.writestr(f'capa{extension}', zip_ref.read(miembro))
+    buffer.seek(0)
+    return gpd.read_file(buffer)
+
+
+def abrir_kml_de_kmz(zip_ref: zipfile.ZipFile) -> Optional[IO[bytes]]:
+    """Flujo de lectura del KML principal del KMZ (doc.kml, o el primero en la raíz, o cualquiera)."""
+    kmls = [m for m in _miembros_validos(zip_ref) if m.filename.lower().endswith('.kml')]
+    if not kmls:
+        return None
+    principal = (next((m for m in kmls if m.filename.lower() == 'doc.kml'), None)
+                 or next((m for m in kmls if '/' not in m.filename), None)
+                 or kmls[0])
+    return zip_ref.open(principal)
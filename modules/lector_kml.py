@@ -0,0 +1,102 @@
+# modules/lector_kml.py
+# ===============================
+# LECTOR KML EN STREAMING
+# Una sola pasada con iterparse: Polygon, MultiGeometry y anillos
+# interiores, nombre y ExtendedData por Placemark, liberando cada
+# elemento apenas se procesa
+# ===============================
+
+import re
+import numpy as np
+import xml.etree.ElementTree as ET
+import geopandas as gpd
+from shapely.geometry import Polygon, MultiPolygon
+from typing import Dict, List, Optional
+
+_SEPARADOR_COMA = re.compile(r'\s*,\s*')
+
+
+def _etiqueta(elem) -> str:
+    """Nombre del elemento sin namespace (KML 2.2, gx, archivos sin namespace)."""
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def parsear_coordenadas(texto: Optional[str]) -> np.ndarray:
+    """Convierte un bloque <coordinates> a un array (n, 2) de lon/lat en una sola operación."""
+    if not texto or not texto.strip():
+        return np.empty((0, 2))
+    if ', ' in texto or ' ,' in texto:
+        texto = _SEPARADOR_COMA.sub(',', texto)
+    texto = texto.strip()
+    primera = texto.split(None, 1)[0]
+    componentes = primera.count(',') + 1
+    valores = np.fromstring(texto.replace(',', ' '), sep=' ')
+    if componentes >= 2 and len(valores) % componentes == 0 and len(valores) // componentes == len(texto.split()):
+        return valores.reshape(-1, componentes)[:, :2]
+    # Tuplas con distinta cantidad de componentes (2D y 3D mezcladas)
+    return np.array([[float(v) for v in t.split(',')[:2]] for t in texto.split() if t.count(',') >= 1])
+
+
+def leer_kml(fuente) -> Optional[gpd.GeoDataFrame]:
+    """
+    Lee un KML desde una ruta o un objeto tipo archivo. Devuelve un
+    GeoDataFrame con una fila por Placemark con polígonos (columnas `nombre`
+    y los campos de ExtendedData) o None si no hay polígonos.
+    """
+    filas: List[Dict] = []
+    pila: List[str] = []
+    placemark: Optional[Dict] = None
+    poligonos: List[Polygon] = []
+    anillos_sueltos: List[np.ndarray] = []
+    exterior, interiores = None, []
+    dato_nombre = None
+
+    for evento, elem in ET.iterparse(fuente, events=('start', 'end')):
+        etiqueta = _etiqueta(elem)
+        if evento == 'start':
+            pila.append(etiqueta)
+            if etiqueta == 'Placemark':
+                placemark = {'nombre': None, 'atributos': {}}
+                poligonos, anillos_sueltos = [], []
+            elif etiqueta == 'Polygon':
+                exterior, interiores = None, []
+            elif etiqueta in ('Data', 'SimpleData'):
+                dato_nombre = elem.get('name')
+            continue
+
+        pila.pop()
+        if etiqueta == 'coordinates':
+            anillo = parsear_coordenadas(elem.text)
+            if 'outerBoundaryIs' in pila:
+                exterior = anillo
+            elif 'innerBoundaryIs' in pila:
+                interiores.append(anillo)
+            elif placemark is not None and ('LinearRing' in pila or 'LineString' in pila):
+                anillos_sueltos.append(anillo)
+        elif etiqueta == 'Polygon':
+            if exterior is not None and len(exterior) >= 3:
+                poligono = Polygon(exterior, [r for r in interiores if len(r) >= 3])
+                if placemark is not None:
+                    poligonos.append(poligono)
+                else:
+                    filas.append({'nombre': None, 'geometry': poligono})
+            exterior, interiores = None, []
+        elif placemark is not None and etiqueta == 'name' and pila and pila[-1] == 'Placemark':
+            placemark['nombre'] = (elem.text or '').strip() or None
+        elif placemark is not None and etiqueta == 'value' and pila and pila[-1] == 'Data' and dato_nombre:
+            placemark['atributos'][dato_nombre] = (elem.text or '').strip()
+        elif placemark is not None and etiqueta == 'SimpleData' and dato_nombre:
+            placemark['atributos'][dato_nombre] = (elem.text or '').strip()
+        elif etiqueta == 'Placemark':
+            if not poligonos:
+                # Contornos dibujados como línea o anillo suelto
+                poligonos = [Polygon(a) for a in anillos_sueltos[:1] if len(a) >= 3]
+            if poligonos:
+                geometria = poligonos[0] if len(poligonos) == 1 else MultiPolygon(poligonos)
+                filas.append({'nombre': placemark['nombre'], **placemark['atributos'], 'geometry': geometria})
+            placemark = None
+            elem.clear()
+
+    if not filas:
+        return None
+    return gpd.GeoDataFrame(filas, geometry='geometry', crs='EPSG:4326')
@@ -0,0 +1,205 @@
+# modules/malla_hexagonal.py
+# ===============================
+# MALLA HEXAGONAL MULTIRRESOLUCIÓN
+# Zonas de manejo hexagonales anidadas sobre el lote, con agregación
+# jerárquica (media, desvío, conteo) de los valores muestreados
+# ===============================
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from scipy.spatial import cKDTree
+from typing import Dict, List
+
+RAIZ3 = np.sqrt(3.0)
+# Desplazamiento para codificar (q, r) en una sola clave entera
+_OFFSET_CLAVE = 1 << 20
+
+
+def _clave(q, r):
+    return (q + _OFFSET_CLAVE) * (2 * _OFFSET_CLAVE) + (r + _OFFSET_CLAVE)
+
+
+def coordenadas_axiales(x, y, lado):
+    """
+    Convierte coordenadas métricas a índices axiales (q, r) de hexágonos
+    de punta hacia arriba con el lado indicado (redondeo cúbico vectorizado).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    qf = (RAIZ3 / 3.0 * x - y / 3.0) / lado
+    rf = (2.0 / 3.0 * y) / lado
+    sf = -qf - rf
+    q = np.round(qf)
+    r = np.round(rf)
+    s = np.round(sf)
+    dq = np.abs(q - qf)
+    dr = np.abs(r - rf)
+    ds = np.abs(s - sf)
+    corregir_q = (dq > dr) & (dq > ds)
+    corregir_r = ~corregir_q & (dr > ds)
+    q = np.where(corregir_q, -r - s, q)
+    r = np.where(corregir_r, -q - s, r)
+    return q.astype(np.int64), r.astype(np.int64)
+
+
+def centros_hexagonos(q, r, lado):
+    x = lado * RAIZ3 * (q + r / 2.0)
+    y = lado * 1.5 * r
+    return x, y
+
+
+def poligonos_hexagonos(cx, cy, lado):
+    """Construye los hexágonos (vectorizado con shapely 2) a partir de sus centros."""
+    angulos = np.deg2rad(30 + 60 * np.arange(7))
+    xs = cx[:, None] + lado * np.cos(angulos)[None, :]
+    ys = cy[:, None] + lado * np.sin(angulos)[None, :]
+    return shapely.polygons(np.stack([xs, ys], axis=-1))
+
+
+class MallaHexagonal:
+    """
+    Malla de hexágonos anidados sobre un polígono. El nivel 0 es el más fino;
+    cada nivel siguiente multiplica el lado por `factor`. Las estadísticas se
+    acumulan una sola vez sobre el nivel 0 y los niveles gruesos se derivan
+    de los finos (conteo, suma y suma de cuadrados), sin volver a recorrer
+    los puntos.
+    """
+
+    def __init__(self, poligono, crs_metrico=None, celdas_objetivo: int = 400, niveles: int = 3, factor: float = 2.0,
+                 poligono_metrico=None):
+        serie = gpd.GeoSeries([poligono], crs='EPSG:4326')
+        self.crs_metrico = crs_metrico or serie.estimate_utm_crs()
+        self.poligono_metrico = poligono_metrico if poligono_metrico is not None else serie.to_crs(self.crs_metrico).iloc[0]
+        shapely.prepare(self.poligono_metrico)
+        area_m2 = max(self.poligono_metrico.area, 1.0)
+        # Área de un hexágono = 3·√3/2 · lado²
+        lado_base = np.sqrt(2.0 * area_m2 / (3.0 * RAIZ3 * max(celdas_objetivo, 1)))
+        self.lados = [lado_base * factor ** k for k in range(max(niveles, 1))]
+        self.niveles = [self._construir_nivel(lado) for lado in self.lados]
+        self.padres = [self._indices_padre(k) for k in range(len(self.niveles) - 1)]
+        self.variables: List[str] = []
+        self._gdf_cache: Dict[int, gpd.GeoDataFrame] = {}
+
+    def _construir_nivel(self, lado: float) -> Dict:
+        minx, miny, maxx, maxy = self.poligono_metrico.bounds
+        r_min = int(np.floor(miny / (1.5 * lado))) - 1
+        r_max = int(np.ceil(maxy / (1.5 * lado))) + 1
+        r = np.arange(r_min, r_max + 1)
+        q_min = int(np.floor(minx / (lado * RAIZ3) - r_max / 2.0)) - 1
+        q_max = int(np.ceil(maxx / (lado * RAIZ3) - r_min / 2.0)) + 1
+        q = np.arange(q_min, q_max + 1)
+        qq, rr = np.meshgrid(q, r, indexing='ij')
+        qq, rr = qq.ravel(), rr.ravel()
+        cx, cy = centros_hexagonos(qq, rr, lado)
+        # Descartar candidatos lejos del rectángulo envolvente antes de construir geometrías
+        cerca = (cx >= minx - lado) & (cx <= maxx + lado) & (cy >= miny - lado) & (cy <= maxy + lado)
+        qq, rr, cx, cy = qq[cerca], rr[cerca], cx[cerca], cy[cerca]
+        hexagonos = poligonos_hexagonos(cx, cy, lado)
+        dentro = shapely.intersects(self.poligono_metrico, hexagonos)
+        qq, rr, cx, cy, hexagonos = qq[dentro], rr[dentro], cx[dentro], cy[dentro], hexagonos[dentro]
+        celdas = shapely.intersection(hexagonos, self.poligono_metrico)
+        con_area = shapely.area(celdas) > 0
+        qq, rr, cx, cy, celdas = qq[con_area], rr[con_area], cx[con_area], cy[con_area], celdas[con_area]
+        claves = _clave(qq, rr)
+        orden = np.argsort(claves)
+        return {
+            'lado_m': lado,
+            'q': qq[orden],
+            'r': rr[orden],
+            'claves': claves[orden],
+            'cx': cx[orden],
+            'cy': cy[orden],
+            'geometria': celdas[orden],
+            'area_ha': shapely.area(celdas[orden]) / 10000,
+            'stats': {}
+        }
+
+    def _buscar(self, nivel: Dict, q, r):
+        """Devuelve el índice de celda para cada (q, r), o -1 si cae fuera de la malla."""
+        claves = _clave(q, r)
+        if len(nivel['claves']) == 0:
+            return np.full(len(claves), -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(nivel['claves'], claves), 0, len(nivel['claves']) - 1)
+        return np.where(nivel['claves'][pos] == claves, pos, -1)
+
+    def _indices_padre(self, k: int):
+        fino, grueso = self.niveles[k], self.niveles[k + 1]
+        q, r = coordenadas_axiales(fino['cx'], fino['cy'], grueso['lado_m'])
+        padres = self._buscar(grueso, q, r)
+        # Celdas finas del borde cuyo hexágono padre no toca el lote: asignar al padre más cercano
+        huerfanas = padres < 0
+        if huerfanas.any() and len(grueso['claves']) > 0:
+            arbol = cKDTree(np.column_stack([grueso['cx'], grueso['cy']]))
+            _, vecino = arbol.query(np.column_stack([fino['cx'][huerfanas], fino['cy'][huerfanas]]))
+            padres[huerfanas] = vecino
+        return padres
+
+    def agregar(self, lons, lats, valores: Dict[str, List[float]]):
+        """
+        Acumula los valores de muestra en el nivel más fino y propaga conteo,
+        suma y suma de cuadrados hacia los niveles gruesos.
+        """
+        if not self.niveles or len(lons) == 0:
+            return self
+        puntos = gpd.GeoSeries.from_xy(lons, lats, crs='EPSG:4326').to_crs(self.crs_metrico)
+        xs, ys = puntos.x.to_numpy(), puntos.y.to_numpy()
+        q, r = coordenadas_axiales(xs, ys, self.lados[0])
+        idx = self._buscar(self.niveles[0], q, r)
+        validos = idx >= 0
+        for variable, vals in valores.items():
+            vals = np.asarray(vals, dtype=float)
+            n_celdas = len(self.niveles[0]['claves'])
+            conteo = np.bincount(idx[validos], minlength=n_celdas).astype(float)
+            suma = np.bincount(idx[validos], weights=vals[validos], minlength=n_celdas)
+            suma2 = np.bincount(idx[validos], weights=vals[validos] ** 2, minlength=n_celdas)
+            self.niveles[0]['stats'][variable] = (conteo, suma, suma2)
+            for k, padres in enumerate(self.padres):
+                n_gruesas = len(self.niveles[k + 1]['claves'])
+                ok = padres >= 0
+                conteo, suma, suma2 = [
+                    np.bincount(padres[ok], weights=a[ok], minlength=n_gruesas)
+                    for a in (conteo, suma, suma2)
+                ]
+                self.niveles[k + 1]['stats'][variable] = (conteo, suma, suma2)
+            if variable not in self.variables:
+                self.variables.append(variable)
+        self._gdf_cache.clear()
+        return self
+
+    def estadisticas(self, nivel: int, variable: str) -> Dict[str, np.ndarray]:
+        """
+        Media, desvío y conteo por celda. Las celdas sin muestras toman la media
+        de la celda con datos más cercana (con n_muestras = 0).
+        """
+        datos = self.niveles[nivel]
+        conteo, suma, suma2 = datos['stats'][variable]
+        con_datos = conteo > 0
+        media = np.zeros_like(suma)
+        desv = np.zeros_like(suma)
+        media[con_datos] = suma[con_datos] / conteo[con_datos]
+        varianza = suma2[con_datos] / conteo[con_datos] - media[con_datos] ** 2
+        desv[con_datos] = np.sqrt(np.maximum(varianza, 0.0))
+        if con_datos.any() and not con_datos.all():
+            arbol = cKDTree(np.column_stack([datos['cx'][con_datos], datos['cy'][con_datos]]))
+            _, vecino = arbol.query(np.column_stack([datos['cx'][~con_datos], datos['cy'][~con_datos]]))
+            media[~con_datos] = media[con_datos][vecino]
+        return {'media': media, 'desv': desv, 'n': conteo.astype(int)}
+
+    def gdf_nivel(self, nivel: int = 0) -> gpd.GeoDataFrame:
+        """GeoDataFrame (EPSG:4326) del nivel pedido con media/desvío/conteo de cada variable."""
+        if nivel in self._gdf_cache:
+            return self._gdf_cache[nivel]
+        datos = self.niveles[nivel]
+        columnas = {'celda_id': np.arange(1, len(datos['claves']) + 1), 'area_ha': np.round(datos['area_ha'], 2)}
+        for variable in self.variables:
+            est = self.estadisticas(nivel, variable)
+            columnas[variable] = np.round(est['media'], 2)
+            columnas[f'{variable}_desv'] = np.round(est['desv'], 2)
+            columnas['n_muestras'] = est['n']
+        gdf = gpd.GeoDataFrame(columnas, geometry=datos['geometria'], crs=self.crs_metrico).to_crs('EPSG:4326')
+        self._gdf_cache[nivel] = gdf
+        return gdf
+
+    def etiquetas_niveles(self) -> List[str]:
+        return [f"{len(n['claves'])} celdas (~{n['lado_m'] * 2:,.0f} m)" for n in self.niveles]
@@ -0,0 +1,76 @@
+# modules/parcela.py
+# ===============================
+# PARCELA CON DERIVADOS GEOMÉTRICOS EN CACHÉ
+# Geometría normalizada (EPSG:4326) del lote junto con su área geodésica,
+# límites, geometría preparada y copia proyectada, calculados una sola vez
+# y compartidos por la carga, el análisis y los mapas
+# ===============================
+
+from functools import cached_property
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+from modules.area_geodesica import areas_ha
+from modules.cache_geometrias import CacheGeometrias
+
+_parcelas = CacheGeometrias(maximo=16)
+
+
+class Parcela:
+    """
+    Lote ya normalizado a EPSG:4326. Cada derivado se calcula la primera vez
+    que se pide y queda guardado; la geometría queda preparada, así las
+    pruebas de contención no reconstruyen su índice en cada llamada.
+    """
+
+    def __init__(self, geometria):
+        self.geometria = geometria
+        shapely.prepare(self.geometria)
+
+    @cached_property
+    def gdf(self) -> gpd.GeoDataFrame:
+        return gpd.GeoDataFrame([{'geometry': self.geometria, 'id_zona': 1}], crs='EPSG:4326')
+
+    @cached_property
+    def bounds(self):
+        return self.geometria.bounds
+
+    @cached_property
+    def centroide(self):
+        return self.geometria.centroid
+
+    @cached_property
+    def area_ha(self) -> float:
+        """Área sobre el elipsoide WGS84, sin la deformación de una proyección."""
+        return float(areas_ha([self.geometria])[0])
+
+    @cached_property
+    def crs_metrico(self):
+        return gpd.GeoSeries([self.geometria], crs='EPSG:4326').estimate_utm_crs()
+
+    @cached_property
+    def geometria_metrica(self):
+        """Copia en la zona UTM del lote (preparada), para grillas y distancias en metros."""
+        geometria = gpd.GeoSeries([self.geometria], crs='EPSG:4326').to_crs(self.crs_metrico).iloc[0]
+        shapely.prepare(geometria)
+        return geometria
+
+    def contiene(self, lons, lats) -> np.ndarray:
+        """Máscara de los puntos (lon/lat) dentro del lote, vectorizada."""
+        return shapely.contains_xy(self.geometria, np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+
+
+def parcela_de(gdf: gpd.GeoDataFrame) -> Parcela:
+    """
+    Parcela de la primera geometría de `gdf` (ya en EPSG:4326). Se reutiliza
+    la misma instancia mientras la geometría no cambie, aunque el
+    GeoDataFrame sea una copia distinta.
+    """
+    geometria = gdf.geometry.iloc[0]
+    clave = CacheGeometrias.clave(geometria)
+    parcela = _parcelas.obtener(clave)
+    if parcela is None:
+        parcela = _parcelas.guardar(clave, Parcela(geometria))
+    return parcela
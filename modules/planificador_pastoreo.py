@@ -0,0 +1,152 @@
+# modules/planificador_pastoreo.py
+# ===============================
+# PLANIFICADOR DE ROTACIÓN PARA TODA LA TEMPORADA
+# Calendario día a día de ocupación de sublotes por uno o más rodeos,
+# con descanso mínimo, remanente de forraje y selección greedy con anticipación
+# ===============================
+
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+
+class PlanificadorRotacion:
+    """
+    Simula la temporada día por día. Cada rodeo pastorea un sublote hasta
+    que el forraje llega al remanente o se cumple la ocupación máxima; al
+    moverse elige, entre los sublotes libres y descansados, el de mayor
+    forraje disponible, penalizando las elecciones que dejan al siguiente
+    movimiento sin sublotes listos (anticipación de un paso).
+    """
+
+    def __init__(self, stock_inicial_kg, crecimiento_diario_kg, stock_maximo_kg,
+                 descanso_minimo: int = 21, ocupacion_maxima: int = 7, dias_minimos: int = 1,
+                 fraccion_remanente: float = 0.2, consumo_ev_diario: float = 12.0):
+        self.stock_inicial = np.asarray(stock_inicial_kg, dtype=float)
+        self.crecimiento = np.asarray(crecimiento_diario_kg, dtype=float)
+        self.stock_maximo = np.maximum(np.asarray(stock_maximo_kg, dtype=float), self.stock_inicial)
+        self.remanente = self.stock_maximo * fraccion_remanente
+        self.descanso_minimo = int(descanso_minimo)
+        self.ocupacion_maxima = max(int(ocupacion_maxima), 1)
+        self.dias_minimos = max(int(dias_minimos), 1)
+        self.consumo_ev_diario = consumo_ev_diario
+
+    def _elegir_sublote(self, dia, stock, libre, ultimo_uso, demanda, crecimiento):
+        """Índice del mejor sublote para un rodeo con la demanda diaria dada, o -1 si no hay ninguno listo."""
+        descansado = (dia - ultimo_uso) >= self.descanso_minimo
+        disponible = stock - self.remanente
+        candidatos = np.flatnonzero(libre & descansado & (disponible >= demanda * self.dias_minimos))
+        if len(candidatos) == 0:
+            return -1
+        # Estadía esperada de cada candidato (crecimiento neto durante la ocupación)
+        consumo_neto = np.maximum(demanda - crecimiento[candidatos], 1e-9)
+        estadia = np.clip(np.floor(disponible[candidatos] / consumo_neto), 1, self.ocupacion_maxima)
+        # Anticipación: cuántos otros sublotes estarán listos al salir (matriz candidatos × sublotes)
+        proyectado = np.minimum(self.stock_maximo[None, :], stock[None, :] + crecimiento[None, :] * estadia[:, None])
+        listos = (
+            libre[None, :]
+            & ((dia + estadia[:, None] - ultimo_uso[None, :]) >= self.descanso_minimo)
+            & (proyectado - self.remanente[None, :] >= demanda * self.dias_minimos)
+        )
+        listos[np.arange(len(candidatos)), candidatos] = False
+        puntaje = disponible[candidatos] * np.where(listos.any(axis=1), 1.0, 0.5)
+        return int(candidatos[np.argmax(puntaje)])
+
+    def planificar(self, rodeos_ev: List[float], dias: int = 365, fecha_inicio: Optional[date] = None,
+                   factor_estacional=None, ids_sublotes=None) -> Dict:
+        """
+        Genera el calendario. `factor_estacional` (largo `dias`) escala el
+        crecimiento diario; por defecto es constante.
+        """
+        n = len(self.stock_inicial)
+        fecha_inicio = fecha_inicio or date.today()
+        ids_sublotes = np.asarray(ids_sublotes if ids_sublotes is not None else np.arange(1, n + 1))
+        factor_estacional = np.ones(dias) if factor_estacional is None else np.asarray(factor_estacional, dtype=float)
+        demandas = np.asarray(rodeos_ev, dtype=float) * self.consumo_ev_diario
+        n_rodeos = len(demandas)
+
+        stock = self.stock_inicial.copy()
+        ultimo_uso = np.full(n, -10 ** 6)
+        libre = np.ones(n, dtype=bool)
+        ubicacion = np.full(n_rodeos, -1)
+        entrada = np.zeros(n_rodeos, dtype=int)
+
+        # Registros diarios por rodeo (columnas: sublote, stock al inicio, consumo, déficit)
+        reg_sublote = np.full((dias, n_rodeos), -1)
+        reg_stock = np.zeros((dias, n_rodeos))
+        reg_consumo = np.zeros((dias, n_rodeos))
+        reg_deficit = np.zeros((dias, n_rodeos))
+        movimientos = []
+        consumido_total = 0.0
+        crecido_total = 0.0
+
+        for dia in range(dias):
+            crecimiento = self.crecimiento * factor_estacional[dia]
+            for h in range(n_rodeos):
+                if ubicacion[h] < 0:
+                    destino = self._elegir_sublote(dia, stock, libre, ultimo_uso, demandas[h], crecimiento)
+                    if destino >= 0:
+                        ubicacion[h] = destino
+                        entrada[h] = dia
+                        libre[destino] = False
+                p = ubicacion[h]
+                if p < 0:
+                    reg_deficit[dia, h] = demandas[h]
+                    continue
+                reg_sublote[dia, h] = p
+                reg_stock[dia, h] = stock[p]
+                consumo = min(demandas[h], max(stock[p] - self.remanente[p], 0.0))
+                stock[p] -= consumo
+                consumido_total += consumo
+                reg_consumo[dia, h] = consumo
+                reg_deficit[dia, h] = demandas[h] - consumo
+                # Salida: no alcanza para otro día sin bajar del remanente, o se cumplió la ocupación máxima
+                agotado = stock[p] + crecimiento[p] - self.remanente[p] < demandas[h]
+                if agotado or dia - entrada[h] + 1 >= self.ocupacion_maxima:
+                    movimientos.append((h + 1, ids_sublotes[p], entrada[h], dia))
+                    ultimo_uso[p] = dia
+                    libre[p] = True
+                    ubicacion[h] = -1
+            nuevo_stock = np.minimum(self.stock_maximo, stock + crecimiento)
+            crecido_total += float((nuevo_stock - stock).sum())
+            stock = nuevo_stock
+
+        for h in range(n_rodeos):
+            if ubicacion[h] >= 0:
+                movimientos.append((h + 1, ids_sublotes[ubicacion[h]], entrada[h], dias - 1))
+
+        fechas = np.array([fecha_inicio + timedelta(days=d) for d in range(dias)])
+        ocupado = reg_sublote >= 0
+        ids_registro = np.where(ocupado, ids_sublotes[np.maximum(reg_sublote, 0)], -1)
+        df_diario = pd.DataFrame({
+            'dia': np.repeat(np.arange(1, dias + 1), n_rodeos),
+            'fecha': np.repeat(fechas, n_rodeos),
+            'rodeo': np.tile(np.arange(1, n_rodeos + 1), dias),
+            'sublote_id': ids_registro.ravel(),
+            'stock_inicio_kg': np.round(reg_stock.ravel(), 1),
+            'consumo_kg': np.round(reg_consumo.ravel(), 1),
+            'deficit_kg': np.round(reg_deficit.ravel(), 1),
+        })
+        df_diario['sublote_id'] = df_diario['sublote_id'].where(df_diario['sublote_id'] >= 0, None)
+        df_movimientos = pd.DataFrame(movimientos, columns=['rodeo', 'sublote_id', 'dia_entrada', 'dia_salida'])
+        df_movimientos['dias'] = df_movimientos['dia_salida'] - df_movimientos['dia_entrada'] + 1
+        df_movimientos['fecha_entrada'] = fechas[df_movimientos['dia_entrada'].to_numpy(dtype=int)]
+        df_movimientos['fecha_salida'] = fechas[df_movimientos['dia_salida'].to_numpy(dtype=int)]
+        df_movimientos[['dia_entrada', 'dia_salida']] += 1
+        df_movimientos = df_movimientos.sort_values(['dia_entrada', 'rodeo']).reset_index(drop=True)
+
+        oferta_total = float(self.stock_inicial.sum() - self.remanente.sum()) + crecido_total
+        demanda_total = float(demandas.sum() * dias)
+        return {
+            'calendario': df_diario,
+            'movimientos': df_movimientos,
+            'dias': dias,
+            'num_rodeos': n_rodeos,
+            'consumo_total_kg': round(float(consumido_total), 1),
+            'demanda_total_kg': round(demanda_total, 1),
+            'utilizacion_pct': round(float(100 * consumido_total / oferta_total), 1) if oferta_total > 0 else 0.0,
+            'cobertura_demanda_pct': round(float(100 * consumido_total / demanda_total), 1) if demanda_total > 0 else 0.0,
+            'dias_con_deficit': [int((reg_deficit[:, h] > 1e-6).sum()) for h in range(n_rodeos)],
+            'stock_final_kg': np.round(stock, 1)
+        }
@@ -0,0 +1,248 @@
+# modules/raster_local.py
+# ===============================
+# RASTER MULTIESPECTRAL LOCAL (DRON / SENTINEL-2 DESCARGADO)
+# Lectura por ventanas limitada al lote y cálculo vectorizado de
+# NDVI, NDWI, NDRE, MSAVI y EVI sin cargar el archivo completo
+# ===============================
+
+import os
+import shutil
+import weakref
+import tempfile
+import numpy as np
+from typing import Dict, List, Optional
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+    from rasterio.features import geometry_mask, geometry_window
+    from rasterio.warp import transform as transformar_coordenadas, transform_geom
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+
+from modules.extractor_gee import INDICES_ESPECTRALES
+
+# Orden de bandas (1-based) de los productos más comunes, según cantidad de bandas
+PRESETS_BANDAS = {
+    # Sentinel-2 L2A apilado: B2, B3, B4, B5, B6, B7, B8, B8A, B11, B12
+    10: {'azul': 1, 'verde': 2, 'rojo': 3, 'borde_rojo': 4, 'nir': 7, 'swir': 9},
+    # Sentinel-2 con las 12 bandas de superficie: B1..B9, B11, B12 (+ B8A)
+    12: {'azul': 2, 'verde': 3, 'rojo': 4, 'borde_rojo': 5, 'nir': 8, 'swir': 11},
+    # Cámaras de dron multiespectrales (MicaSense/Parrot): azul, verde, rojo, borde rojo, NIR
+    5: {'azul': 1, 'verde': 2, 'rojo': 3, 'borde_rojo': 4, 'nir': 5},
+    # Azul, verde, rojo, NIR (PlanetScope, aerofotos 4 bandas)
+    4: {'azul': 1, 'verde': 2, 'rojo': 3, 'nir': 4}
+}
+# Nombres de banda reconocidos en las descripciones del archivo
+_ALIAS_BANDAS = {
+    'azul': ('b2', 'blue', 'azul'),
+    'verde': ('b3', 'green', 'verde'),
+    'rojo': ('b4', 'red', 'rojo'),
+    'borde_rojo': ('b5', 'rededge', 'red_edge', 'red edge', 'borde_rojo'),
+    'nir': ('b8', 'nir', 'near infrared'),
+    'swir': ('b11', 'swir', 'swir1', 'swir16')
+}
+
+
+def detectar_bandas(descripciones: List[Optional[str]]) -> Dict[str, int]:
+    """Mapa banda -> índice 1-based a partir de las descripciones o, si no hay, del preset por cantidad."""
+    mapa = {}
+    normalizadas = [(d or '').strip().lower() for d in descripciones]
+    for banda, alias in _ALIAS_BANDAS.items():
+        for i, descripcion in enumerate(normalizadas, start=1):
+            if descripcion in alias:
+                mapa[banda] = i
+                break
+    if 'rojo' in mapa and 'nir' in mapa:
+        return mapa
+    return dict(PRESETS_BANDAS.get(len(descripciones), {}))
+
+
+def calcular_indices(bandas: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Índices espectrales vectorizados sobre arrays de reflectancia (NaN donde falta una banda)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        def diferencia_normalizada(a, b):
+            if a not in bandas or b not in bandas:
+                return None
+            return (bandas[a] - bandas[b]) / (bandas[a] + bandas[b])
+
+        forma = bandas['nir'].shape
+        n, r = bandas['nir'], bandas['rojo']
+        indices = {
+            'NDVI': diferencia_normalizada('nir', 'rojo'),
+            'NDWI': diferencia_normalizada('nir', 'swir'),
+            'NDRE': diferencia_normalizada('nir', 'borde_rojo'),
+            'MSAVI': (2 * n + 1 - np.sqrt(np.maximum((2 * n + 1) ** 2 - 8 * (n - r), 0))) / 2,
+            'EVI': 2.5 * (n - r) / (n + 6 * r - 7.5 * bandas['azul'] + 1) if 'azul' in bandas else None
+        }
+    return {k: (v if v is not None else np.full(forma, np.nan, dtype=np.float32)) for k, v in indices.items()}
+
+
+class RasterMultiespectral:
+    """
+    GeoTIFF multibanda local. Solo se leen las bandas necesarias y solo las
+    ventanas (de `tamano_ventana` píxeles de lado) que cubren el lote, así que
+    la memoria usada no depende del tamaño del archivo.
+    """
+
+    def __init__(self, ruta: str, bandas: Optional[Dict[str, int]] = None, factor_reflectancia: Optional[float] = None,
+                 tamano_ventana: int = 1024):
+        if not RASTERIO_AVAILABLE:
+            raise ImportError("rasterio no está instalado. Instale con: pip install rasterio")
+        self.ruta = ruta
+        self.tamano_ventana = tamano_ventana
+        with rasterio.open(ruta) as src:
+            self.bandas = bandas or detectar_bandas(list(src.descriptions))
+            self.es_entero = np.issubdtype(np.dtype(src.dtypes[0]), np.integer)
+        if 'rojo' not in self.bandas or 'nir' not in self.bandas:
+            raise ValueError("No se pudieron identificar las bandas roja y NIR del raster")
+        # Reflectancia escalada (p. ej. Sentinel-2 L2A en enteros × 10000)
+        self.factor_reflectancia = factor_reflectancia if factor_reflectancia is not None else (1e-4 if self.es_entero else 1.0)
+
+    def _ventanas(self, ventana_lote):
+        fila_fin = ventana_lote.row_off + ventana_lote.height
+        col_fin = ventana_lote.col_off + ventana_lote.width
+        for fila in range(int(ventana_lote.row_off), int(fila_fin), self.tamano_ventana):
+            for col in range(int(ventana_lote.col_off), int(col_fin), self.tamano_ventana):
+                yield Window(col, fila, min(self.tamano_ventana, col_fin - col), min(self.tamano_ventana, fila_fin - fila))
+
+    def resolucion_m(self) -> float:
+        """Lado aproximado del píxel en metros."""
+        with rasterio.open(self.ruta) as src:
+            if src.crs.is_geographic:
+                latitud = (src.bounds.top + src.bounds.bottom) / 2
+                return abs(src.transform.a) * 111320 * np.cos(np.radians(latitud))
+            return abs(src.transform.a) * src.crs.linear_units_factor[1]
+
+    @staticmethod
+    def _area_pixeles_ha(src, ventana) -> np.ndarray:
+        """Área de los píxeles de la ventana por fila (columna de forma (alto, 1))."""
+        t = src.window_transform(ventana)
+        if src.crs.is_geographic:
+            # Área esférica exacta de cada fila: R² · Δλ · |sen φ1 − sen φ2|
+            bordes = np.radians(t.f + t.e * np.arange(int(ventana.height) + 1))
+            area_m2 = 6371008.8 ** 2 * np.radians(abs(t.a)) * np.abs(np.diff(np.sin(bordes)))
+        else:
+            area_m2 = np.full(int(ventana.height), abs(t.a * t.e - t.b * t.d) * src.crs.linear_units_factor[1] ** 2)
+        return (area_m2 / 10000)[:, None]
+
+    def _bloques(self, src, geometria):
+        """Recorre las ventanas del lote: (ventana, índices, píxeles válidos, píxeles dentro del lote)."""
+        try:
+            ventana_lote = geometry_window(src, [geometria]).intersection(Window(0, 0, src.width, src.height))
+        except Exception:
+            raise ValueError("El raster no cubre el lote")
+        nombres = list(self.bandas)
+        nodata = src.nodata
+        for ventana in self._ventanas(ventana_lote):
+            datos = src.read([self.bandas[b] for b in nombres], window=ventana).astype(np.float32)
+            validos = np.ones(datos.shape[1:], dtype=bool)
+            if nodata is not None:
+                validos &= ~np.any(datos == nodata, axis=0)
+            datos *= self.factor_reflectancia
+            indices = calcular_indices(dict(zip(nombres, datos)))
+            dentro = validos & geometry_mask([geometria], out_shape=validos.shape,
+                                             transform=src.window_transform(ventana), invert=True)
+            yield ventana, indices, validos, dentro
+
+    def recorrer_lote(self, poligono):
+        """
+        Bloques de píxeles dentro del lote con NDVI válido: índices, centro de
+        cada píxel (en el CRS del raster) y su área en ha. Genera un bloque por
+        ventana, así la memoria queda acotada aunque el lote sea muy grande.
+        """
+        with rasterio.open(self.ruta) as src:
+            geometria = transform_geom('EPSG:4326', src.crs, poligono.__geo_interface__)
+            for ventana, indices, _, dentro in self._bloques(src, geometria):
+                dentro &= np.isfinite(indices['NDVI'])
+                if not dentro.any():
+                    continue
+                filas, cols = np.nonzero(dentro)
+                xs, ys = rasterio.transform.xy(src.window_transform(ventana), filas, cols)
+                area = np.broadcast_to(self._area_pixeles_ha(src, ventana), dentro.shape)[dentro]
+                yield {
+                    'indices': {indice: arr[dentro] for indice, arr in indices.items()},
+                    'x': np.asarray(xs), 'y': np.asarray(ys),
+                    'area_ha': area, 'crs': src.crs.to_wkt()
+                }
+
+    def extraer(self, poligono, lons: List[float], lats: List[float]) -> Dict:
+        """
+        Valores de cada índice en los puntos (píxel que los contiene) y media,
+        desvío y conteo de píxeles válidos dentro del lote.
+        """
+        n = len(lons)
+        valores = {indice: np.full(n, np.nan) for indice in INDICES_ESPECTRALES}
+        suma = dict.fromkeys(INDICES_ESPECTRALES, 0.0)
+        suma2 = dict.fromkeys(INDICES_ESPECTRALES, 0.0)
+        conteo = dict.fromkeys(INDICES_ESPECTRALES, 0)
+        with rasterio.open(self.ruta) as src:
+            geometria = transform_geom('EPSG:4326', src.crs, poligono.__geo_interface__)
+            xs, ys = transformar_coordenadas('EPSG:4326', src.crs, list(lons), list(lats))
+            filas, cols = rasterio.transform.rowcol(src.transform, xs, ys)
+            filas, cols = np.asarray(filas), np.asarray(cols)
+            for ventana, indices, validos, dentro in self._bloques(src, geometria):
+                for indice, arr in indices.items():
+                    ok = dentro & np.isfinite(arr)
+                    suma[indice] += float(arr[ok].sum(dtype=np.float64))
+                    suma2[indice] += float((arr[ok].astype(np.float64) ** 2).sum())
+                    conteo[indice] += int(ok.sum())
+                # Puntos de muestreo que caen en esta ventana
+                f0, c0 = int(ventana.row_off), int(ventana.col_off)
+                sel = (filas >= f0) & (filas < f0 + ventana.height) & (cols >= c0) & (cols < c0 + ventana.width)
+                if sel.any():
+                    fl, cl = filas[sel] - f0, cols[sel] - c0
+                    for indice, arr in indices.items():
+                        valores[indice][sel] = np.where(validos[fl, cl], arr[fl, cl], np.nan)
+        estadisticas = {}
+        for indice in INDICES_ESPECTRALES:
+            if conteo[indice]:
+                media = suma[indice] / conteo[indice]
+                desv = np.sqrt(max(suma2[indice] / conteo[indice] - media ** 2, 0.0))
+                estadisticas[indice] = {'media': round(media, 4), 'desv': round(float(desv), 4), 'pixeles': conteo[indice]}
+        return {'valores': valores, 'estadisticas': estadisticas}
+
+
+def ruta_permitida(ruta: str, directorio_base: str) -> Optional[str]:
+    """
+    Ruta absoluta de `ruta` (relativa a `directorio_base` o absoluta) si,
+    resueltos los enlaces, queda dentro de ese directorio y es un archivo;
+    None en cualquier otro caso, sin distinguir el motivo.
+    """
+    base = os.path.realpath(directorio_base)
+    resuelta = os.path.realpath(os.path.join(base, ruta))
+    if os.path.commonpath([base, resuelta]) != base or not os.path.isfile(resuelta):
+        return None
+    return resuelta
+
+
+def _borrar_archivo(ruta: str):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+class RasterSubido:
+    """
+    Copia en disco de un GeoTIFF subido, hecha por bloques para que rasterio
+    lo lea por ventanas. El archivo se borra con `borrar()`, cuando el objeto
+    se descarta (p. ej. al cerrarse la sesión que lo guarda) o al terminar
+    el proceso.
+    """
+
+    def __init__(self, archivo, clave):
+        self.clave = clave
+        archivo.seek(0)
+        descriptor, self.ruta = tempfile.mkstemp(suffix='.tif')
+        self._finalizador = weakref.finalize(self, _borrar_archivo, self.ruta)
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                shutil.copyfileobj(archivo, f, 16 * 1024 * 1024)
+        except Exception:
+            self.borrar()
+            raise
+
+    def borrar(self):
+        self._finalizador()
@@ -0,0 +1,137 @@
+# modules/renderizador_graficos.py
+# ===============================
+# RENDERIZADOR DE GRÁFICOS PERSISTENTE
+# Un navegador de kaleido abierto durante toda la vida del proceso, con
+# varias pestañas, que rasteriza lotes de figuras Plotly en paralelo
+# ===============================
+
+import asyncio
+import atexit
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import kaleido
+    KALEIDO_AVAILABLE = True
+except ImportError:
+    KALEIDO_AVAILABLE = False
+
+
+class RenderizadorGraficos:
+    """
+    `fig.to_image` lanza y serializa contra kaleido en cada llamada. Acá el
+    navegador se abre una vez (al primer lote) en un hilo con su propio
+    event loop y cada lote se reparte entre `pestanas` pestañas. Si el
+    navegador falla se cierra y se vuelve a abrir en el lote siguiente; las
+    figuras que no llegó a entregar (o todas, si no puede abrirse) se
+    renderizan con `fig.to_image` una por una.
+    """
+
+    def __init__(self, pestanas: int = 4, escala: float = 2.0, timeout_s: float = 90.0, kaleido_modulo=None):
+        self.kaleido = kaleido_modulo or (kaleido if KALEIDO_AVAILABLE else None)
+        self.pestanas = max(int(pestanas), 1)
+        self.escala = escala
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._navegador = None
+        self._error = None
+        self._lotes = 0
+        self._figuras = 0
+        atexit.register(self.cerrar)
+
+    @property
+    def activo(self) -> bool:
+        return self._navegador is not None
+
+    def _ejecutar(self, corrutina, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(corrutina, self._loop).result(timeout)
+
+    def _abrir(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._hilo = threading.Thread(target=self._loop.run_forever, name='renderizador-graficos', daemon=True)
+            self._hilo.start()
+        navegador = self.kaleido.Kaleido(n=self.pestanas, timeout=self.timeout_s)
+        self._ejecutar(navegador.open(), self.timeout_s)
+        self._navegador = navegador
+
+    def _cerrar_navegador(self, navegador=None):
+        """Cierra el navegador actual (o solo si sigue siendo `navegador`, cuando se indica)."""
+        if navegador is not None and navegador is not self._navegador:
+            return
+        navegador, self._navegador = self._navegador, None
+        if navegador is not None:
+            try:
+                self._ejecutar(navegador.close(), 30)
+            except Exception:
+                pass
+
+    def _navegador_listo(self):
+        """Navegador abierto, abriéndolo (o reabriéndolo) si hace falta; None si no se puede."""
+        with self._lock:
+            if self.kaleido is not None and self._navegador is None:
+                try:
+                    self._abrir()
+                    self._error = None
+                except Exception as e:
+                    self._error = repr(e)
+                    self._cerrar_navegador()
+            return self._navegador
+
+    async def _lote(self, navegador, figuras: Dict[str, Tuple], escala: float, salida: Dict[str, object]):
+        async def renderizar(nombre, fig, ancho, alto):
+            try:
+                salida[nombre] = await navegador.calc_fig(fig, opts={'format': 'png', 'width': ancho, 'height': alto,
+                                                                     'scale': escala})
+            except Exception as e:
+                salida[nombre] = e
+        await asyncio.gather(*[renderizar(nombre, *datos) for nombre, datos in figuras.items()])
+
+    def renderizar_lote(self, figuras: Dict[str, Tuple], escala: Optional[float] = None) -> Dict[str, object]:
+        """
+        `figuras`: nombre -> (figura, ancho, alto). Devuelve nombre -> bytes PNG
+        o la excepción de esa figura (las demás se renderizan igual). Lotes de
+        distintas sesiones comparten el navegador a la vez.
+        """
+        escala = escala or self.escala
+        if not figuras:
+            return {}
+        with self._lock:
+            self._lotes += 1
+            self._figuras += len(figuras)
+        salida = {}
+        navegador = self._navegador_listo()
+        if navegador is not None:
+            futuro = asyncio.run_coroutine_threadsafe(self._lote(navegador, figuras, escala, salida), self._loop)
+            try:
+                futuro.result(self.timeout_s * max(len(figuras) / self.pestanas, 1))
+            except Exception as e:
+                # Navegador caído o colgado: se cancelan las figuras pendientes y se reabre en el próximo lote
+                futuro.cancel()
+                with self._lock:
+                    self._error = repr(e)
+                    self._cerrar_navegador(navegador)
+            salida = dict(salida)
+        for nombre, (fig, ancho, alto) in figuras.items():
+            if nombre in salida:
+                continue
+            try:
+                salida[nombre] = fig.to_image(format='png', width=ancho, height=alto, scale=escala)
+            except Exception as e:
+                salida[nombre] = e
+        return salida
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrar_navegador()
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._hilo.join(5)
+                self._loop = None
+                self._hilo = None
+
+    def estado(self) -> Dict:
+        return {'activo': self.activo, 'pestanas': self.pestanas, 'escala': self.escala,
+                'lotes': self._lotes, 'figuras': self._figuras, 'error': self._error}
@@ -0,0 +1,135 @@
+# modules/sesion_gee.py
+# ===============================
+# SESIÓN DE EARTH ENGINE COMPARTIDA POR EL PROCESO
+# Inicialización perezosa única, verificación periódica de salud y
+# reinicialización ante credenciales vencidas, para todas las pestañas
+# ===============================
+
+import os
+import json
+import time
+import threading
+from typing import Dict, Optional
+
+# Mensajes con los que Earth Engine / google-auth informan credenciales inválidas o vencidas
+_MARCAS_CREDENCIALES = ('401', '403', 'unauthenticated', 'invalid_grant', 'invalid credentials', 'expired',
+                        'not initialized', 'please authorize', 'earthengine authenticate', 'permission denied')
+
+
+def es_error_credenciales(error: Exception) -> bool:
+    texto = str(error).lower()
+    return any(marca in texto for marca in _MARCAS_CREDENCIALES)
+
+
+class SesionGEE:
+    """
+    Una sola inicialización de `ee` por proceso. `asegurar()` inicializa la
+    primera vez, verifica la conexión con una consulta mínima como mucho cada
+    `intervalo_verificacion_s` y, si falla, vuelve a inicializar. Tras un fallo
+    no reintenta antes de `espera_reintento_s`, así las pestañas nuevas no
+    pagan cada una la latencia de un intento fallido. El límite por llamada
+    del cliente (`deadline_s`, global al proceso) se fija aquí, al inicializar.
+    """
+
+    def __init__(self, proyecto: str, ee_modulo=None, variable_credenciales: str = 'GEE_SERVICE_ACCOUNT',
+                 intervalo_verificacion_s: float = 300.0, espera_reintento_s: float = 60.0,
+                 deadline_s: Optional[float] = 300.0, reloj=time.monotonic):
+        if ee_modulo is None:
+            import ee as ee_modulo
+        self.ee = ee_modulo
+        self.proyecto = proyecto
+        self.variable_credenciales = variable_credenciales
+        self.intervalo_verificacion_s = intervalo_verificacion_s
+        self.espera_reintento_s = espera_reintento_s
+        self.deadline_s = deadline_s
+        self.reloj = reloj
+        self._lock = threading.Lock()
+        self._conectado = False
+        self._metodo = None
+        self._error = None
+        self._inicializado_en = None
+        self._ultima_verificacion = None
+        self._ultimo_fallo = None
+        self._inicializaciones = 0
+
+    @property
+    def conectado(self) -> bool:
+        return self._conectado
+
+    def _inicializar(self):
+        errores = []
+        secreto = os.environ.get(self.variable_credenciales)
+        if secreto:
+            try:
+                info = json.loads(secreto.strip())
+                credenciales = self.ee.ServiceAccountCredentials(info['client_email'], key_data=json.dumps(info))
+                self.ee.Initialize(credenciales, project=self.proyecto)
+                return 'cuenta de servicio'
+            except Exception as e:
+                errores.append(f'Service Account: {e}')
+        try:
+            self.ee.Initialize(project=self.proyecto)
+            return 'credenciales locales'
+        except Exception as e:
+            errores.append(f'local: {e}')
+        raise RuntimeError(' | '.join(errores))
+
+    def _fijar_deadline(self):
+        if self.deadline_s and hasattr(getattr(self.ee, 'data', None), 'setDeadline'):
+            self.ee.data.setDeadline(int(self.deadline_s * 1000))
+
+    def _verificar(self):
+        self.ee.Number(1).getInfo()
+
+    def asegurar(self) -> bool:
+        """Devuelve True si la sesión está lista, inicializando o reconectando solo cuando hace falta."""
+        ahora = self.reloj()
+        with self._lock:
+            if self._conectado:
+                if ahora - self._ultima_verificacion < self.intervalo_verificacion_s:
+                    return True
+                try:
+                    self._verificar()
+                    self._ultima_verificacion = ahora
+                    return True
+                except Exception as e:
+                    # Credenciales vencidas o sesión caída: reinicializar a continuación
+                    self._conectado = False
+                    self._error = str(e)
+            elif self._ultimo_fallo is not None and ahora - self._ultimo_fallo < self.espera_reintento_s:
+                return False
+            try:
+                self._metodo = self._inicializar()
+                self._fijar_deadline()
+                self._inicializaciones += 1
+                self._conectado = True
+                self._error = None
+                self._inicializado_en = time.time()
+                self._ultima_verificacion = ahora
+                self._ultimo_fallo = None
+            except Exception as e:
+                self._conectado = False
+                self._error = str(e)
+                self._ultimo_fallo = ahora
+            return self._conectado
+
+    def invalidar(self, error: Optional[Exception] = None):
+        """Marca la sesión para reinicializar en el próximo `asegurar()` (p. ej. tras un error de credenciales)."""
+        with self._lock:
+            self._conectado = False
+            self._ultimo_fallo = None
+            if error is not None:
+                self._error = str(error)
+
+    def estado(self) -> Dict:
+        with self._lock:
+            return {
+                'conectado': self._conectado,
+                'proyecto': self.proyecto,
+                'metodo': self._metodo,
+                'error': self._error,
+                'inicializado_en': self._inicializado_en,
+                'segundos_desde_verificacion': (round(self.reloj() - self._ultima_verificacion, 1)
+                                                if self._ultima_verificacion is not None else None),
+                'inicializaciones': self._inicializaciones
+            }
@@ -0,0 +1,354 @@
+# modules/zonificacion.py
+# ===============================
+# SUPERFICIE INTERPOLADA, ESTADÍSTICAS ZONALES Y DELINEACIÓN
+# Grilla regular (en metros) con los valores interpolados del muestreo,
+# estadísticas ponderadas por área para sublotes con geometría real y
+# delineación de sublotes contiguos por agrupamiento de la grilla
+# ===============================
+
+import heapq
+import numpy as np
+import geopandas as gpd
+import shapely
+from scipy import ndimage
+from scipy.spatial import cKDTree
+from typing import Dict, List, Optional
+
+# Variables interpoladas: variable -> (lista de puntos en resultados, mínimo, máximo)
+VARIABLES_SUPERFICIE = {
+    'productividad_kg_ms_ha': ('puntos_forraje', 0.0, None),
+    'carbono_ton_ha': ('puntos_carbono', 0.0, None),
+    'ndvi': ('puntos_ndvi', -1.0, 1.0),
+}
+
+
+class SuperficieInterpolada:
+    """
+    Grilla regular sobre el lote, en un CRS métrico, con los valores de las
+    variables interpolados por distancia inversa (k vecinos más cercanos).
+    Se calcula una vez por análisis y la reutilizan las estadísticas zonales
+    y la delineación de sublotes.
+    """
+
+    def __init__(self, poligono, crs_metrico=None, celdas_objetivo: int = 40000, poligono_metrico=None):
+        serie = gpd.GeoSeries([poligono], crs='EPSG:4326')
+        self.crs_metrico = crs_metrico or serie.estimate_utm_crs()
+        # El polígono ya proyectado (p. ej. de la Parcela) evita otra reproyección
+        self.poligono_metrico = poligono_metrico if poligono_metrico is not None else serie.to_crs(self.crs_metrico).iloc[0]
+        minx, miny, maxx, maxy = self.poligono_metrico.bounds
+        # Lado de celda para ~celdas_objetivo celdas dentro del polígono
+        self.lado_m = max(np.sqrt(self.poligono_metrico.area / max(celdas_objetivo, 1)), 1.0)
+        self.x = np.arange(minx + self.lado_m / 2, maxx, self.lado_m)
+        self.y = np.arange(miny + self.lado_m / 2, maxy, self.lado_m)
+        xx, yy = np.meshgrid(self.x, self.y)
+        self.mascara = shapely.contains_xy(self.poligono_metrico, xx, yy)
+        self.cx = xx[self.mascara]
+        self.cy = yy[self.mascara]
+        self.area_celda_ha = self.lado_m ** 2 / 10000
+        self.valores: Dict[str, np.ndarray] = {}
+        self._sumas_pixeles: Dict[str, np.ndarray] = {}
+        self._peso_pixeles = np.zeros(len(self.cx))
+
+    @property
+    def num_celdas(self) -> int:
+        return len(self.cx)
+
+    def interpolar(self, variable: str, lons, lats, valores, k: int = 8, minimo=None, maximo=None):
+        """Interpola una variable sobre las celdas interiores (IDW con k vecinos)."""
+        if len(valores) == 0 or self.num_celdas == 0:
+            return self
+        puntos = gpd.GeoSeries.from_xy(lons, lats, crs='EPSG:4326').to_crs(self.crs_metrico)
+        arbol = cKDTree(np.column_stack([puntos.x.to_numpy(), puntos.y.to_numpy()]))
+        k = min(k, len(valores))
+        dist, idx = arbol.query(np.column_stack([self.cx, self.cy]), k=k)
+        if k == 1:
+            dist, idx = dist[:, None], idx[:, None]
+        valores = np.asarray(valores, dtype=float)
+        pesos = 1.0 / np.maximum(dist, 1e-6)
+        interpolado = (valores[idx] * pesos).sum(axis=1) / pesos.sum(axis=1)
+        if minimo is not None or maximo is not None:
+            interpolado = np.clip(interpolado, minimo, maximo)
+        self.valores[variable] = interpolado
+        return self
+
+    def interpolar_resultados(self, resultados: Dict):
+        """Interpola todas las variables de VARIABLES_SUPERFICIE a partir de los puntos del análisis."""
+        for variable, (clave_puntos, minimo, maximo) in VARIABLES_SUPERFICIE.items():
+            puntos = resultados.get(clave_puntos, [])
+            if puntos:
+                self.interpolar(variable, [p['lon'] for p in puntos], [p['lat'] for p in puntos],
+                                [p[variable] for p in puntos], minimo=minimo, maximo=maximo)
+        return self
+
+    def agregar_pixeles(self, x, y, valores: Dict[str, np.ndarray], area_ha):
+        """
+        Acumula en cada celda los valores de píxeles (centros en crs_metrico)
+        ponderados por su área. Se llama una vez por bloque del raster y
+        reemplaza a la interpolación cuando se dispone de cobertura total.
+        """
+        if self.num_celdas == 0:
+            return self
+        if not hasattr(self, '_indice_celda'):
+            self._indice_celda = np.full(self.mascara.shape, -1)
+            self._indice_celda[self.mascara] = np.arange(self.num_celdas)
+        col = np.floor((np.asarray(x) - self.x[0]) / self.lado_m + 0.5).astype(int)
+        fila = np.floor((np.asarray(y) - self.y[0]) / self.lado_m + 0.5).astype(int)
+        dentro = (col >= 0) & (col < len(self.x)) & (fila >= 0) & (fila < len(self.y))
+        celda = np.full(len(col), -1)
+        celda[dentro] = self._indice_celda[fila[dentro], col[dentro]]
+        ok = celda >= 0
+        peso = np.asarray(area_ha, dtype=float)[ok]
+        self._peso_pixeles += np.bincount(celda[ok], weights=peso, minlength=self.num_celdas)
+        for variable, arr in valores.items():
+            suma = np.bincount(celda[ok], weights=np.asarray(arr, dtype=float)[ok] * peso, minlength=self.num_celdas)
+            self._sumas_pixeles[variable] = self._sumas_pixeles.get(variable, 0.0) + suma
+        return self
+
+    def cerrar_pixeles(self):
+        """Promedios por celda de lo acumulado; las celdas sin píxeles toman la celda con datos más cercana."""
+        con_datos = self._peso_pixeles > 0
+        if not con_datos.any():
+            return self
+        vecino = None
+        if not con_datos.all():
+            _, vecino = cKDTree(np.column_stack([self.cx[con_datos], self.cy[con_datos]])).query(
+                np.column_stack([self.cx[~con_datos], self.cy[~con_datos]]))
+        for variable, suma in self._sumas_pixeles.items():
+            media = np.divide(suma, self._peso_pixeles, out=np.zeros(self.num_celdas), where=con_datos)
+            if vecino is not None:
+                media[~con_datos] = media[con_datos][vecino]
+            self.valores[variable] = media
+        return self
+
+    def raster(self, variable: str) -> np.ndarray:
+        """Devuelve la variable como matriz (filas = y, columnas = x) con NaN fuera del lote."""
+        matriz = np.full(self.mascara.shape, np.nan)
+        matriz[self.mascara] = self.valores[variable]
+        return matriz
+
+
+def estadisticas_zonales(superficie: SuperficieInterpolada, zonas: gpd.GeoDataFrame, eficiencia_aprovechamiento: float = 0.5) -> gpd.GeoDataFrame:
+    """
+    Estadísticas por zona en una sola pasada sobre la grilla: cada celda se
+    asigna a su zona con una única consulta al índice espacial y los
+    acumulados se obtienen con bincount. Los promedios son ponderados por área
+    (celdas de igual superficie) y los totales usan el área exacta de la zona.
+    """
+    zonas = zonas.to_crs(superficie.crs_metrico).reset_index(drop=True)
+    geometrias = zonas.geometry.values
+    celdas = shapely.points(superficie.cx, superficie.cy)
+    idx_celda, idx_zona = shapely.STRtree(geometrias).query(celdas, predicate='within')
+    ids = zonas['sublote_id'].to_numpy() if 'sublote_id' in zonas.columns else np.arange(1, len(zonas) + 1)
+    return _resumir_zonas(superficie, geometrias, ids, idx_celda, idx_zona, eficiencia_aprovechamiento)
+
+
+def _resumir_zonas(superficie: SuperficieInterpolada, geometrias, ids, idx_celda, idx_zona, eficiencia_aprovechamiento: float) -> gpd.GeoDataFrame:
+    """Tabla de sublotes a partir de la asignación celda -> zona (geometrías en el CRS métrico)."""
+    n_zonas = len(geometrias)
+    area_zona_ha = shapely.area(geometrias) / 10000
+    conteo = np.bincount(idx_zona, minlength=n_zonas).astype(float)
+
+    # Zonas más chicas que una celda: tomar el valor de la celda más cercana a su centroide
+    sin_celdas = conteo == 0
+    vecino = None
+    if sin_celdas.any() and superficie.num_celdas > 0:
+        centroides = shapely.centroid(geometrias[sin_celdas])
+        _, vecino = cKDTree(np.column_stack([superficie.cx, superficie.cy])).query(
+            np.column_stack([shapely.get_x(centroides), shapely.get_y(centroides)]))
+
+    medias = {}
+    for variable, valores in superficie.valores.items():
+        suma = np.bincount(idx_zona, weights=valores[idx_celda], minlength=n_zonas)
+        media = np.divide(suma, conteo, out=np.zeros(n_zonas), where=conteo > 0)
+        if vecino is not None:
+            media[sin_celdas] = valores[vecino]
+        medias[variable] = media
+
+    salida = gpd.GeoDataFrame({
+        'sublote_id': ids,
+        'area_ha': np.round(area_zona_ha, 2),
+        'celdas': conteo.astype(int),
+    }, geometry=geometrias, crs=superficie.crs_metrico)
+    if 'productividad_kg_ms_ha' in medias:
+        prod = medias['productividad_kg_ms_ha']
+        forraje_total = prod * area_zona_ha
+        prod_media_lote = (forraje_total.sum() / area_zona_ha.sum()) if area_zona_ha.sum() > 0 else 0
+        salida['disponibilidad_kg_ms_ha'] = np.round(prod, 2)
+        salida['forraje_total_kg_ms'] = np.round(forraje_total, 2)
+        salida['forraje_aprovechable_kg_ms'] = np.round(forraje_total * eficiencia_aprovechamiento, 2)
+        salida['productividad_relativa'] = np.round(prod / prod_media_lote, 2) if prod_media_lote > 0 else 1.0
+    if 'carbono_ton_ha' in medias:
+        salida['carbono_ton_ha'] = np.round(medias['carbono_ton_ha'], 2)
+        salida['carbono_total_ton'] = np.round(medias['carbono_ton_ha'] * area_zona_ha, 2)
+    if 'ndvi' in medias:
+        salida['ndvi_medio'] = np.round(medias['ndvi'], 3)
+    return salida.to_crs('EPSG:4326')
+
+
+def _kmeans(datos: np.ndarray, k: int, semilla: int = 0, iteraciones: int = 15, max_ajuste: int = 20000) -> np.ndarray:
+    """
+    K-means (Lloyd) vectorizado con inicialización k-means++. Los centros se
+    ajustan sobre una submuestra y luego se asignan todas las filas.
+    """
+    rng = np.random.default_rng(semilla)
+    muestra = datos[rng.choice(len(datos), size=min(len(datos), max_ajuste), replace=False)]
+    centros = [muestra[rng.integers(len(muestra))]]
+    d2 = ((muestra - centros[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        prob = d2 / d2.sum() if d2.sum() > 0 else None
+        centros.append(muestra[rng.choice(len(muestra), p=prob)])
+        d2 = np.minimum(d2, ((muestra - centros[-1]) ** 2).sum(axis=1))
+    centros = np.array(centros)
+    for _ in range(iteraciones):
+        etiquetas = _centro_mas_cercano(muestra, centros)
+        conteo = np.bincount(etiquetas, minlength=k)
+        sumas = np.column_stack([np.bincount(etiquetas, weights=muestra[:, d], minlength=k) for d in range(muestra.shape[1])])
+        nuevos = np.where(conteo[:, None] > 0, sumas / np.maximum(conteo, 1)[:, None], centros)
+        if np.allclose(nuevos, centros):
+            break
+        centros = nuevos
+    return _centro_mas_cercano(datos, centros)
+
+
+def _centro_mas_cercano(datos: np.ndarray, centros: np.ndarray) -> np.ndarray:
+    # |x - c|² = |x|² - 2·x·c + |c|² (el término |x|² no cambia el argmin)
+    return ((centros ** 2).sum(axis=1)[None, :] - 2.0 * datos @ centros.T).argmin(axis=1)
+
+
+def _fusionar_fragmentos(componentes: np.ndarray, n_comp: int, valor_medio: np.ndarray, tamanos: np.ndarray, objetivo: int) -> np.ndarray:
+    """
+    Une componentes conexas vecinas (de la más chica a la más grande, con la
+    vecina de valor más parecido) hasta quedar con `objetivo` regiones.
+    Devuelve el destino final de cada componente.
+    """
+    izq, der = componentes[:, :-1].ravel(), componentes[:, 1:].ravel()
+    arr, aba = componentes[:-1, :].ravel(), componentes[1:, :].ravel()
+    a = np.concatenate([izq, arr])
+    b = np.concatenate([der, aba])
+    borde = (a >= 0) & (b >= 0) & (a != b)
+    pares = np.unique(np.sort(np.column_stack([a[borde], b[borde]]), axis=1), axis=0)
+    vecinos = [set() for _ in range(n_comp)]
+    for i, j in pares:
+        vecinos[i].add(j)
+        vecinos[j].add(i)
+    tamanos = tamanos.astype(float).copy()
+    suma = valor_medio * tamanos
+    destino = np.arange(n_comp)
+    activos = n_comp
+    monticulo = [(tamanos[i], i) for i in range(n_comp)]
+    heapq.heapify(monticulo)
+    while activos > objetivo and monticulo:
+        tam, i = heapq.heappop(monticulo)
+        if destino[i] != i or tam != tamanos[i] or not vecinos[i]:
+            continue
+        media_i = suma[i] / tamanos[i]
+        j = min(vecinos[i], key=lambda v: abs(suma[v] / tamanos[v] - media_i))
+        tamanos[j] += tamanos[i]
+        suma[j] += suma[i]
+        for v in vecinos[i]:
+            vecinos[v].discard(i)
+            if v != j:
+                vecinos[v].add(j)
+                vecinos[j].add(v)
+        vecinos[i] = set()
+        destino[i] = j
+        activos -= 1
+        heapq.heappush(monticulo, (tamanos[j], j))
+    # Resolver cadenas de fusiones
+    while True:
+        siguiente = destino[destino]
+        if np.array_equal(siguiente, destino):
+            return destino
+        destino = siguiente
+
+
+def _poligonizar(superficie: SuperficieInterpolada, etiquetas: np.ndarray, n_regiones: int):
+    """
+    Convierte la grilla de etiquetas en polígonos: cada fila se codifica en
+    tramos de etiqueta constante, cada tramo es un rectángulo y los
+    rectángulos de una región se unen y se recortan al lote.
+    """
+    filas, n_x = etiquetas.shape
+    borde = np.full((filas, n_x + 2), -2)
+    borde[:, 1:-1] = etiquetas
+    fila, col = np.nonzero(borde[:, 1:] != borde[:, :-1])
+    misma_fila = fila[:-1] == fila[1:]
+    fila, inicio, fin = fila[:-1][misma_fila], col[:-1][misma_fila], col[1:][misma_fila]
+    region = etiquetas[fila, inicio]
+    # Rectángulos en coordenadas enteras de la grilla (uniones exactas), luego a metros
+    tramos = shapely.box(inicio, fila, fin, fila + 1)
+    orden = np.argsort(region, kind='stable')
+    cortes = np.searchsorted(region[orden], np.arange(n_regiones + 1))
+    geometrias = np.array([
+        shapely.union_all(tramos[orden[cortes[r]:cortes[r + 1]]]) for r in range(n_regiones)
+    ], dtype=object)
+    lado = superficie.lado_m
+    x0 = superficie.x[0] - lado / 2
+    y0 = superficie.y[0] - lado / 2
+    geometrias = shapely.transform(geometrias, lambda c: c * lado + np.array([x0, y0]))
+    return shapely.intersection(geometrias, superficie.poligono_metrico)
+
+
+def delinear_sublotes(superficie: SuperficieInterpolada, num_sublotes: int, eficiencia_aprovechamiento: float = 0.5,
+                      variables=('productividad_kg_ms_ha', 'ndvi'), peso_espacial: float = 0.5, semilla: int = 0) -> gpd.GeoDataFrame:
+    """
+    Delinea `num_sublotes` sublotes contiguos agrupando la superficie
+    interpolada: k-means sobre las variables estandarizadas (más las
+    coordenadas con `peso_espacial` para favorecer zonas compactas), luego
+    componentes conexas por grupo y fusión de fragmentos chicos con su vecino
+    más parecido hasta cumplir la contigüidad. Devuelve polígonos con las
+    mismas estadísticas que estadisticas_zonales.
+    """
+    variables = [v for v in variables if v in superficie.valores]
+    if superficie.num_celdas == 0 or not variables:
+        return gpd.GeoDataFrame({'sublote_id': []}, geometry=[], crs='EPSG:4326')
+    num_sublotes = int(max(1, min(num_sublotes, superficie.num_celdas)))
+
+    columnas = [superficie.valores[v] for v in variables]
+    rasgos = np.column_stack(columnas)
+    rasgos = (rasgos - rasgos.mean(axis=0)) / np.where(rasgos.std(axis=0) > 0, rasgos.std(axis=0), 1.0)
+    coords = np.column_stack([superficie.cx, superficie.cy])
+    escala = max(coords.std(axis=0).max(), 1e-9)
+    rasgos = np.column_stack([rasgos, peso_espacial * (coords - coords.mean(axis=0)) / escala])
+    grupos = _kmeans(rasgos, num_sublotes, semilla=semilla)
+
+    # Componentes conexas (vecindad 4) de cada grupo sobre la grilla
+    matriz_grupos = np.full(superficie.mascara.shape, -1)
+    matriz_grupos[superficie.mascara] = grupos
+    componentes = np.full(superficie.mascara.shape, -1)
+    n_comp = 0
+    for g in range(num_sublotes):
+        etiquetas_g, n_g = ndimage.label(matriz_grupos == g)
+        dentro = etiquetas_g > 0
+        componentes[dentro] = etiquetas_g[dentro] - 1 + n_comp
+        n_comp += n_g
+    comp_celdas = componentes[superficie.mascara]
+    tamanos = np.bincount(comp_celdas, minlength=n_comp)
+    valor = np.bincount(comp_celdas, weights=rasgos[:, 0], minlength=n_comp) / np.maximum(tamanos, 1)
+    destino = _fusionar_fragmentos(componentes, n_comp, valor, tamanos, num_sublotes)
+
+    # Renumerar regiones de oeste a este para que los IDs sean estables y legibles
+    regiones, region_celdas = np.unique(destino[comp_celdas], return_inverse=True)
+    x_medio = np.bincount(region_celdas, weights=superficie.cx) / np.bincount(region_celdas)
+    rango = np.empty(len(regiones), dtype=int)
+    rango[np.argsort(x_medio)] = np.arange(len(regiones))
+    region_celdas = rango[region_celdas]
+
+    # Las celdas fuera del lote toman la región más cercana para cubrir el borde al recortar
+    etiquetas = np.full(superficie.mascara.shape, -1)
+    etiquetas[superficie.mascara] = region_celdas
+    _, (iy, ix) = ndimage.distance_transform_edt(etiquetas < 0, return_indices=True)
+    geometrias = _poligonizar(superficie, etiquetas[iy, ix], len(regiones))
+
+    return _resumir_zonas(superficie, geometrias, np.arange(1, len(regiones) + 1),
+                          np.arange(superficie.num_celdas), region_celdas, eficiencia_aprovechamiento)
+
+
+def sublotes_como_registros(gdf_sublotes: Optional[gpd.GeoDataFrame]) -> List[Dict]:
+    """Convierte el GeoDataFrame de sublotes a la lista de diccionarios que usan tablas e informes."""
+    if gdf_sublotes is None or gdf_sublotes.empty:
+        return []
+    registros = gdf_sublotes.drop(columns='geometry').to_dict('records')
+    for r in registros:
+        r['sublote_id'] = int(r['sublote_id'])
+    return registros
@@ -0,0 +1,9 @@
+# tests/conftest.py
+# ===============================
+# Raíz del repositorio en el path, para importar `modules` y `tests.ee_local`
+# ===============================
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,249 @@
+# tests/ee_local.py
+# ===============================
+# IMPLEMENTACIÓN LOCAL DE LA API DE EARTH ENGINE
+# Solo las operaciones que usa ExtractorIndicesGEE, evaluadas punto a
+# punto en Python sobre escenas sintéticas, con registro de consultas
+# y fallas programables
+# ===============================
+
+import math
+import threading
+import statistics
+from types import SimpleNamespace
+
+from shapely.geometry import Point, shape
+
+
+class _Imagen:
+    """Imagen como función (lon, lat) -> {banda: valor, o None si está enmascarado}."""
+
+    def __init__(self, pixel, propiedades=None):
+        self._pixel = pixel
+        self._propiedades = dict(propiedades or {})
+
+    def valores(self, lon, lat):
+        return self._pixel(lon, lat)
+
+    def _por_pixel(self, f):
+        return _Imagen(lambda lon, lat: f(self._pixel(lon, lat)))
+
+    def select(self, bandas):
+        bandas = [bandas] if isinstance(bandas, str) else list(bandas)
+        return self._por_pixel(lambda v: {b: v[b] for b in bandas})
+
+    def divide(self, divisor):
+        return self._por_pixel(lambda v: {b: None if x is None else x / divisor for b, x in v.items()})
+
+    def neq(self, valor):
+        return self._por_pixel(lambda v: {b: None if x is None else float(x != valor) for b, x in v.items()})
+
+    def And(self, otra):
+        def pixel(lon, lat):
+            a, b = self._pixel(lon, lat), otra.valores(lon, lat)
+            return {k: float(bool(x) and bool(y)) for (k, x), y in zip(a.items(), b.values())}
+        return _Imagen(pixel)
+
+    def updateMask(self, mascara):
+        def pixel(lon, lat):
+            valido = next(iter(mascara.valores(lon, lat).values()))
+            return {b: x if valido else None for b, x in self._pixel(lon, lat).items()}
+        return _Imagen(pixel)
+
+    def normalizedDifference(self, bandas):
+        a, b = bandas
+
+        def diferencia(v):
+            if v[a] is None or v[b] is None or v[a] + v[b] == 0:
+                return {'nd': None}
+            return {'nd': (v[a] - v[b]) / (v[a] + v[b])}
+        return self._por_pixel(diferencia)
+
+    def rename(self, nombre):
+        return self._por_pixel(lambda v: {nombre: next(iter(v.values()))})
+
+    def expression(self, expresion, bandas):
+        def pixel(lon, lat):
+            variables = {k: next(iter(img.valores(lon, lat).values())) for k, img in bandas.items()}
+            if any(x is None for x in variables.values()):
+                return {'constant': None}
+            try:
+                return {'constant': float(eval(expresion, {'sqrt': math.sqrt}, variables))}
+            except (ValueError, ZeroDivisionError):
+                return {'constant': None}
+        return _Imagen(pixel)
+
+    @staticmethod
+    def cat(imagenes):
+        def pixel(lon, lat):
+            salida = {}
+            for imagen in imagenes:
+                salida.update(imagen.valores(lon, lat))
+            return salida
+        return _Imagen(pixel)
+
+    def get(self, propiedad):
+        return self._propiedades.get(propiedad)
+
+    def date(self):
+        fecha = self._propiedades['fecha']
+        return SimpleNamespace(format=lambda formato: fecha)
+
+    def reduceRegion(self, reducer, geometry, scale=None, maxPixels=None):
+        muestras = [self._pixel(lon, lat) for lon, lat in geometry.muestras()]
+        estadisticas = {}
+        for banda in (muestras[0] if muestras else {}):
+            validos = [m[banda] for m in muestras if m[banda] is not None]
+            for tipo in reducer.tipos:
+                if tipo == 'count':
+                    estadisticas[f'{banda}_count'] = len(validos)
+                elif tipo == 'mean':
+                    estadisticas[f'{banda}_mean'] = statistics.fmean(validos) if validos else None
+                elif tipo == 'stdDev':
+                    estadisticas[f'{banda}_stdDev'] = statistics.pstdev(validos) if validos else None
+        return estadisticas
+
+    def reduceRegions(self, collection, reducer, scale=None):
+        def calcular():
+            elementos = []
+            for elemento in collection.elementos():
+                lon, lat = elemento.geometria.coordenadas
+                valores = {b: x for b, x in self._pixel(lon, lat).items() if x is not None}
+                elementos.append(_Elemento(elemento.geometria, {**elemento.propiedades, **valores}))
+            return elementos
+        return _ColeccionElementos(collection.ee, calcular, len(collection.elementos()))
+
+
+class _Geometria:
+    def __init__(self, geojson):
+        self.forma = shape(geojson)
+
+    @classmethod
+    def Point(cls, coordenadas):
+        return cls({'type': 'Point', 'coordinates': list(coordenadas)})
+
+    @property
+    def coordenadas(self):
+        return self.forma.x, self.forma.y
+
+    def muestras(self, n: int = 8):
+        """Centros de una grilla n x n sobre la geometría (los 'píxeles' de reduceRegion)."""
+        minx, miny, maxx, maxy = self.forma.bounds
+        puntos = [(minx + (maxx - minx) * (i + 0.5) / n, miny + (maxy - miny) * (j + 0.5) / n)
+                  for i in range(n) for j in range(n)]
+        return [p for p in puntos if self.forma.contains(Point(p))]
+
+
+class _Elemento:
+    def __init__(self, geometria, propiedades=None):
+        self.geometria = geometria
+        self.propiedades = dict(propiedades or {})
+
+    def set(self, propiedades):
+        return _Elemento(self.geometria, {**self.propiedades, **propiedades})
+
+
+class _ColeccionElementos:
+    """FeatureCollection; se evalúa en `getInfo`, que es la única llamada al 'servidor'."""
+
+    def __init__(self, ee, calcular, tamano):
+        self.ee = ee
+        self._calcular = calcular
+        self._tamano = tamano
+
+    def elementos(self):
+        return self._calcular()
+
+    def getInfo(self):
+        self.ee._consultar(self._tamano)
+        return {'type': 'FeatureCollection',
+                'features': [{'type': 'Feature', 'properties': e.propiedades} for e in self._calcular()]}
+
+
+class _Coleccion:
+    def __init__(self, ee, imagenes):
+        self.ee = ee
+        self.imagenes = list(imagenes)
+
+    def filterBounds(self, region):
+        return self
+
+    def filterDate(self, inicio, fin):
+        return _Coleccion(self.ee, [i for i in self.imagenes if inicio <= i.get('fecha') < fin])
+
+    def filter(self, condicion):
+        return _Coleccion(self.ee, [i for i in self.imagenes if condicion(i)])
+
+    def map(self, funcion):
+        return _Coleccion(self.ee, [funcion(i) for i in self.imagenes])
+
+    def median(self):
+        imagenes = self.imagenes
+
+        def pixel(lon, lat):
+            pixeles = [i.valores(lon, lat) for i in imagenes]
+            bandas = pixeles[0].keys() if pixeles else []
+            salida = {}
+            for banda in bandas:
+                validos = [p[banda] for p in pixeles if p[banda] is not None]
+                salida[banda] = statistics.median(validos) if validos else None
+            return salida
+        return _Imagen(pixel)
+
+
+class _Reductor:
+    def __init__(self, tipos):
+        self.tipos = list(tipos)
+
+    def combine(self, otro, sharedInputs=False):
+        return _Reductor(self.tipos + otro.tipos)
+
+
+def escena(fecha: str, nubosidad: float = 5.0, nubes=None, **reflectancias):
+    """
+    Escena Sentinel-2 sintética. Cada banda (B2, B3, B4, B5, B8, B11, en
+    unidades de reflectancia x 10000) es un número o una función (lon, lat);
+    `nubes(lon, lat)` marca los píxeles con SCL = 9 (nube de alta probabilidad).
+    """
+    bandas = {'B2': 500, 'B3': 700, 'B4': 800, 'B5': 1500, 'B8': 3000, 'B11': 2000, **reflectancias}
+
+    def pixel(lon, lat):
+        valores = {b: float(v(lon, lat) if callable(v) else v) for b, v in bandas.items()}
+        valores['SCL'] = 9.0 if nubes is not None and nubes(lon, lat) else 4.0
+        return valores
+    return _Imagen(pixel, {'fecha': fecha, 'CLOUDY_PIXEL_PERCENTAGE': nubosidad})
+
+
+class EELocal:
+    """
+    Reemplazo del módulo `ee` para pasar como `ee_modulo`. `consultas`
+    registra el tamaño de cada getInfo (puntos o escenas); `fallas` es una
+    cola de excepciones que lanzan los próximos getInfo (None responde bien).
+    """
+
+    def __init__(self, escenas, fallas=None):
+        self.escenas = list(escenas)
+        self.fallas = list(fallas or [])
+        self.consultas = []
+        self.deadline_ms = None
+        self._lock = threading.Lock()
+        self.Geometry = _Geometria
+        self.Image = SimpleNamespace(cat=_Imagen.cat)
+        self.ImageCollection = lambda coleccion: _Coleccion(self, self.escenas)
+        self.Filter = SimpleNamespace(lt=lambda propiedad, valor: lambda imagen: imagen.get(propiedad) < valor)
+        self.Reducer = SimpleNamespace(first=lambda: _Reductor(['first']), mean=lambda: _Reductor(['mean']),
+                                       stdDev=lambda: _Reductor(['stdDev']), count=lambda: _Reductor(['count']))
+        self.Feature = _Elemento
+        self.data = SimpleNamespace(setDeadline=lambda ms: setattr(self, 'deadline_ms', ms))
+
+    def FeatureCollection(self, elementos):
+        if isinstance(elementos, _Coleccion):
+            elementos = elementos.imagenes
+        elementos = list(elementos)
+        return _ColeccionElementos(self, lambda: elementos, len(elementos))
+
+    def _consultar(self, tamano: int):
+        with self._lock:
+            self.consultas.append(tamano)
+            falla = self.fallas.pop(0) if self.fallas else None
+        if falla is not None:
+            raise falla
@@ -0,0 +1,102 @@
+# tests/test_ejecutor_gee.py
+# ===============================
+# EjecutorGEE y LimitadorTasa con trabajos locales y reloj simulado
+# ===============================
+
+import threading
+
+from modules.ejecutor_gee import EjecutorGEE, LimitadorTasa, es_error_cuota, es_error_reintentable
+from tests.ee_local import EELocal
+
+
+def _trabajo_que_falla(veces, error):
+    llamadas = []
+
+    def trabajo():
+        llamadas.append(1)
+        if len(llamadas) <= veces:
+            raise error
+        return 'ok'
+    return trabajo, llamadas
+
+
+def _ejecutor(**kwargs):
+    parametros = dict(limitador=LimitadorTasa(1000), dormir=lambda s: None)
+    parametros.update(kwargs)
+    return EjecutorGEE(**parametros)
+
+
+def test_clasifica_errores():
+    assert es_error_cuota(RuntimeError('429 Too Many Requests'))
+    assert es_error_cuota(RuntimeError('Earth Engine memory capacity exceeded: Too many concurrent aggregations'))
+    assert es_error_reintentable(RuntimeError('503 Service Unavailable'))
+    assert es_error_reintentable(TimeoutError())
+    assert not es_error_reintentable(ValueError('Image.select: Band pattern B99 did not match any bands'))
+
+
+def test_reintenta_con_espera_exponencial_acotada():
+    esperas = []
+    trabajo, llamadas = _trabajo_que_falla(4, RuntimeError('503 Service Unavailable'))
+    ejecutor = _ejecutor(reintentos=5, espera_base_s=1.0, espera_maxima_s=4.0, dormir=esperas.append)
+    respuestas = ejecutor.ejecutar({'a': trabajo})
+    assert respuestas['a'] == {'ok': True, 'resultado': 'ok'}
+    assert len(llamadas) == 5
+    assert [0 <= e <= tope for e, tope in zip(esperas, [1, 2, 4, 4])] == [True] * 4
+    metricas = ejecutor.metricas()
+    assert metricas['reintentos'] == 4 and metricas['exitosos'] == 1 and metricas['intentos'] == 5
+
+
+def test_error_no_reintentable_falla_en_el_primer_intento():
+    trabajo, llamadas = _trabajo_que_falla(1, ValueError('geometría inválida'))
+    respuestas = _ejecutor(reintentos=5).ejecutar({'a': trabajo})
+    assert respuestas['a'] == {'ok': False, 'error': 'geometría inválida'}
+    assert len(llamadas) == 1
+
+
+def test_agota_los_reintentos_de_cuota():
+    trabajo, llamadas = _trabajo_que_falla(10, RuntimeError('429 Too Many Requests'))
+    ejecutor = _ejecutor(reintentos=2)
+    respuestas = ejecutor.ejecutar({'a': trabajo, 'b': lambda: 'ok'})
+    assert not respuestas['a']['ok'] and respuestas['b']['ok']
+    assert len(llamadas) == 3
+    metricas = ejecutor.metricas()
+    assert metricas['fallidos'] == 1 and metricas['exitosos'] == 1 and metricas['errores_cuota'] == 3
+
+
+def test_trabajo_que_no_termina_queda_vencido():
+    liberar = threading.Event()
+    ejecutor = _ejecutor(timeout_s=0.2)
+    try:
+        respuestas = ejecutor.ejecutar({'lento': lambda: liberar.wait(5), 'rapido': lambda: 1})
+    finally:
+        liberar.set()
+    assert respuestas['rapido'] == {'ok': True, 'resultado': 1}
+    assert not respuestas['lento']['ok'] and 'Tiempo agotado' in respuestas['lento']['error']
+    assert ejecutor.metricas()['vencidos'] == 1
+
+
+def test_respeta_el_maximo_de_hilos():
+    ejecutor = _ejecutor(max_hilos=2)
+    barrera = threading.Semaphore(0)
+
+    def trabajo():
+        barrera.acquire(timeout=0.05)
+        return 1
+    ejecutor.ejecutar({i: trabajo for i in range(6)})
+    assert ejecutor.metricas()['max_en_curso'] <= 2
+
+
+def test_limitador_espera_segun_la_tasa():
+    reloj = [0.0]
+    limitador = LimitadorTasa(tasa=2, capacidad=1, reloj=lambda: reloj[0],
+                              dormir=lambda s: reloj.__setitem__(0, reloj[0] + s))
+    esperas = [limitador.adquirir() for _ in range(3)]
+    assert esperas[0] == 0.0
+    assert esperas[1] == esperas[2] == 0.5
+    assert reloj[0] == 1.0
+
+
+def test_no_modifica_el_deadline_del_cliente():
+    ee = EELocal([])
+    _ejecutor(timeout_s=60).ejecutar({'a': lambda: ee.FeatureCollection([]).getInfo()})
+    assert ee.deadline_ms is None
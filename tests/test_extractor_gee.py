@@ -0,0 +1,117 @@
+# tests/test_extractor_gee.py
+# ===============================
+# ExtractorIndicesGEE contra la implementación local de Earth Engine
+# ===============================
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from modules.ejecutor_gee import EjecutorGEE, LimitadorTasa
+from modules.extractor_gee import ExtractorIndicesGEE
+from tests.ee_local import EELocal, escena
+
+LOTE = {'type': 'Polygon', 'coordinates': [[(-60.0, -34.0), (-59.9, -34.0), (-59.9, -34.1), (-60.0, -34.1), (-60.0, -34.0)]]}
+FIN = date(2026, 10, 1)
+LONS = [-59.99, -59.97, -59.95, -59.93, -59.91, -59.92, -59.96]
+LATS = [-34.01, -34.03, -34.05, -34.07, -34.09, -34.02, -34.08]
+
+
+def _nir(lon, lat):
+    return 3000 + 20000 * (lon + 60.0)
+
+
+def _ndvi(nir, rojo=800):
+    return (nir - rojo) / (nir + rojo)
+
+
+def _ejecutor(**kwargs):
+    parametros = dict(max_hilos=1, reintentos=0, dormir=lambda s: None, limitador=LimitadorTasa(1000))
+    parametros.update(kwargs)
+    return EjecutorGEE(**parametros)
+
+
+def test_extraer_calcula_indices_en_cada_punto():
+    ee = EELocal([escena('2026-09-10', B8=_nir)])
+    valores, fallidos = ExtractorIndicesGEE(ee).extraer(LONS, LATS, LOTE, FIN)
+    esperado = [_ndvi(_nir(lon, lat)) for lon, lat in zip(LONS, LATS)]
+    assert fallidos == 0
+    np.testing.assert_allclose(valores['NDVI'], esperado)
+    np.testing.assert_allclose(valores['NDWI'], [(_nir(lon, 0) - 2000) / (_nir(lon, 0) + 2000) for lon in LONS])
+    assert all(np.isfinite(valores[k]).all() for k in ('NDRE', 'MSAVI', 'EVI'))
+
+
+def test_extraer_hace_una_consulta_por_lote_de_puntos():
+    ee = EELocal([escena('2026-09-10')])
+    valores, _ = ExtractorIndicesGEE(ee, tamano_lote=3).extraer(LONS, LATS, LOTE, FIN)
+    assert ee.consultas == [3, 3, 1]
+    assert np.isfinite(valores['NDVI']).all()
+
+
+def test_compuesto_descarta_nubes_escenas_nubladas_y_fuera_de_ventana():
+    mitad_este = lambda lon, lat: lon > -59.95
+    ee = EELocal([
+        escena('2026-09-10'),
+        escena('2026-09-15', nubosidad=80, B8=9000),
+        escena('2026-09-20', nubes=mitad_este, B8=lambda lon, lat: 5000 if mitad_este(lon, lat) else 3000),
+        escena('2026-10-05', B8=9000)
+    ])
+    valores, _ = ExtractorIndicesGEE(ee).extraer(LONS, LATS, LOTE, FIN)
+    np.testing.assert_allclose(valores['NDVI'], _ndvi(3000))
+
+
+def test_punto_sin_pixeles_validos_queda_nan():
+    ee = EELocal([escena('2026-09-10', nubes=lambda lon, lat: lon < -59.95)])
+    valores, fallidos = ExtractorIndicesGEE(ee).extraer(LONS, LATS, LOTE, FIN)
+    nublados = np.array(LONS) < -59.95
+    assert fallidos == 0
+    assert np.isnan(valores['NDVI'][nublados]).all()
+    assert np.isfinite(valores['NDVI'][~nublados]).all()
+
+
+def test_extraer_con_un_lote_fallido_devuelve_resultado_parcial():
+    ee = EELocal([escena('2026-09-10')], fallas=[RuntimeError('Earth Engine: geometría inválida')])
+    valores, fallidos = ExtractorIndicesGEE(ee, tamano_lote=3).extraer(LONS, LATS, LOTE, FIN, ejecutor=_ejecutor())
+    assert fallidos == 1
+    assert np.isnan(valores['NDVI'][:3]).all()
+    assert np.isfinite(valores['NDVI'][3:]).all()
+
+
+def test_extraer_sin_ningun_lote_lanza_el_error():
+    ee = EELocal([escena('2026-09-10')], fallas=[RuntimeError('Earth Engine: geometría inválida')] * 3)
+    with pytest.raises(RuntimeError, match='geometría inválida'):
+        ExtractorIndicesGEE(ee, tamano_lote=3).extraer(LONS, LATS, LOTE, FIN, ejecutor=_ejecutor())
+
+
+def test_extraer_reintenta_errores_de_cuota():
+    esperas = []
+    ee = EELocal([escena('2026-09-10')], fallas=[RuntimeError('429 Too Many Requests')])
+    ejecutor = _ejecutor(reintentos=2, dormir=esperas.append)
+    valores, fallidos = ExtractorIndicesGEE(ee, tamano_lote=3).extraer(LONS, LATS, LOTE, FIN, ejecutor=ejecutor)
+    metricas = ejecutor.metricas()
+    assert fallidos == 0
+    assert np.isfinite(valores['NDVI']).all()
+    assert len(ee.consultas) == 4 and len(esperas) == 1
+    assert metricas['reintentos'] == 1 and metricas['errores_cuota'] == 1
+
+
+def test_serie_temporal_una_fila_por_escena_y_una_consulta_por_tramo():
+    ee = EELocal([
+        escena('2026-07-10', B8=4000),
+        escena('2026-08-20', nubosidad=80),
+        escena('2026-09-05', nubes=lambda lon, lat: lon > -59.95)
+    ])
+    filas = ExtractorIndicesGEE(ee).serie_temporal(LOTE, date(2026, 7, 1), date(2026, 10, 1), dias_por_solicitud=30)
+    assert len(ee.consultas) == 4
+    assert [f['fecha'] for f in filas] == ['2026-07-10', '2026-09-05']
+    assert filas[0]['NDVI_media'] == pytest.approx(_ndvi(4000))
+    assert filas[0]['NDVI_desv'] == pytest.approx(0.0)
+    assert 0 < filas[1]['pixeles'] < filas[0]['pixeles']
+
+
+def test_serie_temporal_con_un_tramo_fallido_lanza_el_error():
+    ee = EELocal([escena('2026-07-10')], fallas=[RuntimeError('Earth Engine: colección no encontrada')])
+    with pytest.raises(RuntimeError, match='colección no encontrada'):
+        ExtractorIndicesGEE(ee).serie_temporal(LOTE, date(2026, 7, 1), date(2026, 10, 1), ejecutor=_ejecutor(),
+                                               dias_por_solicitud=30)
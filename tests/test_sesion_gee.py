@@ -0,0 +1,35 @@
+# tests/test_sesion_gee.py
+# ===============================
+# SesionGEE con un módulo `ee` mínimo (sin red)
+# ===============================
+
+from types import SimpleNamespace
+
+from modules.sesion_gee import SesionGEE
+
+
+def _ee(fallar_inicializacion=False):
+    ee = SimpleNamespace(inicializaciones=0, deadlines=[])
+
+    def inicializar(*args, **kwargs):
+        ee.inicializaciones += 1
+        if fallar_inicializacion:
+            raise RuntimeError('Please authorize access to Earth Engine')
+    ee.Initialize = inicializar
+    ee.Number = lambda n: SimpleNamespace(getInfo=lambda: n)
+    ee.data = SimpleNamespace(setDeadline=ee.deadlines.append)
+    return ee
+
+
+def test_fija_el_deadline_del_cliente_al_inicializar():
+    ee = _ee()
+    sesion = SesionGEE('proyecto', ee_modulo=ee, deadline_s=60, variable_credenciales='SIN_CREDENCIALES_TEST')
+    assert sesion.asegurar() and sesion.asegurar()
+    assert ee.deadlines == [60000] and ee.inicializaciones == 1
+
+
+def test_sin_inicializacion_no_fija_el_deadline():
+    ee = _ee(fallar_inicializacion=True)
+    sesion = SesionGEE('proyecto', ee_modulo=ee, variable_credenciales='SIN_CREDENCIALES_TEST')
+    assert not sesion.asegurar()
+    assert ee.deadlines == [] and 'authorize' in sesion.estado()['error']